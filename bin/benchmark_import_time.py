@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+
+import argparse
+import subprocess
+import sys
+import time
+
+
+statements = {
+    "import": "import enasearch",
+    "import + get_results": "import enasearch; enasearch.get_results(verbose=False)",
+    "import + build_retrieve_url": "import enasearch; enasearch.build_retrieve_url('A00145', 'fasta')",
+    "import cli": "import enasearch.cli",
+}
+
+
+def time_statement(statement, repeat):
+    """Time the execution of a statement in new Python processes
+
+    statement: Python statement to execute
+    repeat: number of processes to run
+    """
+    timings = []
+    for i in range(repeat):
+        start = time.time()
+        subprocess.check_call([sys.executable, "-c", statement])
+        timings.append(time.time() - start)
+    timings.sort()
+    return timings[0], timings[len(timings) // 2]
+
+
+def benchmark_import_time(repeat):
+    """Print the time to start a Python process importing enasearch
+
+    repeat: number of processes to run for each statement
+    """
+    baseline = time_statement("pass", repeat)
+    print("statement\tmin (ms)\tmedian (ms)")
+    for name, statement in statements.items():
+        timings = time_statement(statement, repeat)
+        print("%s\t%.1f\t%.1f" % (
+            name,
+            1000 * (timings[0] - baseline[0]),
+            1000 * (timings[1] - baseline[1])))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the import time of enasearch")
+    parser.add_argument("--repeat", type=int, default=10, help="number of runs")
+    args = parser.parse_args()
+    benchmark_import_time(args.repeat)
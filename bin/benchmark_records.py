@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+import argparse
+import random
+import time
+import tracemalloc
+
+import enasearch
+
+
+def generate_fastq(read_nb, read_length):
+    """Generate the content of a FASTQ file with random reads
+
+    read_nb: number of reads
+    read_length: length of the reads
+    """
+    random.seed(0)
+    seq = "".join(random.choice("ACGT") for i in range(read_length))
+    quality = "".join(chr(33 + random.randint(2, 40)) for i in range(read_length))
+    entries = []
+    for i in range(read_nb):
+        entries.append("@SRR000001.%d %d length=%d\n%s\n+\n%s\n" % (
+            i, i, read_length, seq, quality))
+    return "".join(entries).encode("ascii")
+
+
+def benchmark_parsing(content, light, trace):
+    """Print the time (and the memory) to parse the reads
+
+    content: bytes with the FASTQ content
+    light: boolean to use the light records
+    trace: boolean to measure the memory with tracemalloc
+    """
+    if trace:
+        tracemalloc.start()
+    start = time.time()
+    reads = enasearch.format_content(content, "fastq", light=light)
+    duration = time.time() - start
+    if trace:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        memory = "%.1f" % (current / 1024.0 ** 2)
+    else:
+        memory = "-"
+    print("%s\t%d\t%.2f\t%s" % (
+        "light" if light else "seqrecord", len(reads), duration, memory))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the parsing of reads into SeqRecord and light records")
+    parser.add_argument("--reads", type=int, default=1000000, help="number of reads")
+    parser.add_argument("--length", type=int, default=100, help="length of the reads")
+    parser.add_argument("--memory", action="store_true", help="measure the memory of the records (slower)")
+    args = parser.parse_args()
+    content = generate_fastq(args.reads, args.length)
+    print("records\treads\ttime (s)\tmemory (MiB)")
+    for light in [False, True]:
+        benchmark_parsing(content, light, args.memory)
@@ -1,7 +1,13 @@
 #!/usr/bin/env python
 
 import csv
-import pickle
+import hashlib
+import json
+import os
+import sqlite3
+
+
+schema_version = 1
 
 
 def get_filters(filepath):
@@ -159,14 +165,56 @@ def get_taxonomy_results(filepath):
     return taxonomy_results
 
 
-def save_object(obj, filename):
-    """Serialize a Python object into a file
+def get_result_descriptor(results):
+    """Replace the description of the filter fields of each result by the
+    list of their names (the descriptions are stored once in the filters
+    descriptor)
 
-    objects: list of Python object to serialize
-    filepath: path to a file
+    results: dictionary with the result description
     """
-    with open(filename, 'wb') as output:
-        pickle.dump(obj, output, protocol=2)
+    result_descriptor = {}
+    for result_id, result in results.items():
+        result_descriptor[result_id] = {
+            "description": result["description"],
+            "filter_fields": list(result["filter_fields"]),
+            "returnable_fields": result["returnable_fields"]
+        }
+    return result_descriptor
+
+
+def save_descriptors(descriptors, filepath):
+    """Save the descriptors in a SQLite file
+
+    Each descriptor is stored as compact JSON in its own row, along with the
+    SHA-256 checksum of the JSON, and the file contains the version of the
+    schema
+
+    descriptors: dictionary with the descriptor names as keys and the descriptors as values
+    filepath: path to the SQLite file (replaced if it exists)
+    """
+    tmp_filepath = filepath + ".tmp"
+    if os.path.exists(tmp_filepath):
+        os.remove(tmp_filepath)
+    connection = sqlite3.connect(tmp_filepath)
+    connection.execute("PRAGMA page_size = 1024")
+    with connection:
+        connection.execute(
+            "CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT)")
+        connection.execute(
+            "INSERT INTO metadata VALUES ('schema_version', ?)",
+            (str(schema_version),))
+        connection.execute(
+            "CREATE TABLE descriptors "
+            "(name TEXT PRIMARY KEY, checksum TEXT, data TEXT)")
+        for name in sorted(descriptors):
+            data = json.dumps(descriptors[name], separators=(",", ":"))
+            checksum = hashlib.sha256(data.encode("utf-8")).hexdigest()
+            connection.execute(
+                "INSERT INTO descriptors VALUES (?, ?, ?)",
+                (name, checksum, data))
+    connection.execute("VACUUM")
+    connection.close()
+    os.replace(tmp_filepath, filepath)
 
 
 def serialize_ena_data_descriptors():
@@ -178,19 +226,17 @@ def serialize_ena_data_descriptors():
         "enasearch_data/ena_domain_results.csv",
         filter_fields,
         return_fields)
-    save_object(results, "enasearch_data/result_description")
-
-    filter_types = get_filter_types()
-    save_object(filter_types, "enasearch_data/filter_types")
-
-    display_options = get_options("enasearch_data/display_options.csv")
-    save_object(display_options, "enasearch_data/display_options")
-
-    download_options = get_options("enasearch_data/download_options.csv")
-    save_object(download_options, "enasearch_data/download_options")
-
-    taxonomy_results = get_taxonomy_results("enasearch_data/taxonomy_results.csv")
-    save_object(taxonomy_results, "enasearch_data/taxonomy_results")
+    descriptors = {}
+    descriptors["results"] = get_result_descriptor(results)
+    descriptors["filters"] = filter_fields
+    descriptors["filter_types"] = get_filter_types()
+    descriptors["display_options"] = get_options(
+        "enasearch_data/display_options.csv")
+    descriptors["download_options"] = get_options(
+        "enasearch_data/download_options.csv")
+    descriptors["taxonomy_results"] = get_taxonomy_results(
+        "enasearch_data/taxonomy_results.csv")
+    save_descriptors(descriptors, "enasearch_data/descriptors.sqlite")
 
 
 if __name__ == "__main__":
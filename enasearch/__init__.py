@@ -1,38 +1,478 @@
 #!/usr/bin/env python
 
 import requests
-import pickle
+from requests.adapters import HTTPAdapter
 from pprint import pprint
+import functools
 import gzip
-import xmltodict
-from Bio import SeqIO
-import tempfile
-import pkg_resources
+import hashlib
+import json
+import io
+import shutil
+import sqlite3
+import os
+import enasearch_data
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+from types import MappingProxyType
+from urllib.request import pathname2url
+from concurrent.futures import ThreadPoolExecutor
+
+# Bio.SeqIO and xmltodict are imported in the functions parsing the content
+# to keep the import of enasearch fast
 
 
 baseUrl = 'http://www.ebi.ac.uk/ena/'
 lengthLimit = 100000
+maxWorkers = 4
+resultNumberTTL = 60
+resultNumberMaxSize = 10000
+defaultEncoding = "utf-8"
+decodeErrors = "replace"
+bufferSize = 1024 * 1024
+urlLengthLimit = 2000
 
 
 def get_data(filename):
-    return pkg_resources.resource_filename('enasearch_data', filename)
+    """Return the path to a file in the enasearch_data package
 
+    :param filename: name of the file
 
-def load_object(filepath):
-    """Load object from a pickle file
+    :return: path to the file
+    """
+    return os.path.join(
+        os.path.dirname(os.path.abspath(enasearch_data.__file__)),
+        filename)
+
+
+descriptorsFile = "descriptors.sqlite"
+descriptorsSchemaVersion = 1
+descriptor_names = [
+    "results",
+    "filters",
+    "filter_types",
+    "download_options",
+    "display_options",
+    "taxonomy_results",
+]
+descriptors = {}
+descriptors_lock = threading.RLock()
+
+
+descriptors_connection = None
+
+
+def open_descriptors(filepath):
+    """Open the SQLite file with the ENA data descriptors
+
+    This function raises an error if the version of the file schema is not
+    supported
+
+    :param filepath: path to the SQLite file (generated by bin/serialize_ena_data_descriptors.py)
+
+    :return: a (read-only) sqlite3 Connection object
+    """
+    connection = sqlite3.connect(
+        "file:%s?mode=ro" % pathname2url(filepath),
+        uri=True,
+        check_same_thread=False)
+    schema_version = connection.execute(
+        "SELECT value FROM metadata WHERE key = 'schema_version'").fetchone()
+    if schema_version is None or int(schema_version[0]) != descriptorsSchemaVersion:
+        connection.close()
+        err_str = "The schema version of %s is not " % (filepath)
+        err_str += "supported (expected %s)" % (descriptorsSchemaVersion)
+        raise ValueError(err_str)
+    return connection
+
+
+def load_descriptor(connection, name):
+    """Load a descriptor from the SQLite file with the ENA data descriptors
+
+    This function raises an error if the checksum of the descriptor does not
+    match
+
+    :param connection: sqlite3 Connection object (returned by open_descriptors)
+    :param name: name of the descriptor
+
+    :return: the descriptor (dictionary)
+    """
+    row = connection.execute(
+        "SELECT checksum, data FROM descriptors WHERE name = ?",
+        (name,)).fetchone()
+    if row is None:
+        err_str = "The descriptor %s is not in the descriptor file" % (name)
+        raise ValueError(err_str)
+    checksum, data = row
+    if hashlib.sha256(data.encode("utf-8")).hexdigest() != checksum:
+        err_str = "The checksum of the descriptor %s does not match" % (name)
+        raise ValueError(err_str)
+    return json.loads(data)
+
+
+def get_descriptor(name):
+    """Return an ENA data descriptor, loaded from its file at the first call
+
+    :param name: name of the descriptor (results, filters, filter_types, download_options, display_options or taxonomy_results)
+
+    :return: the descriptor (dictionary)
+    """
+    global descriptors_connection
+    descriptor = descriptors.get(name)
+    if descriptor is None:
+        with descriptors_lock:
+            if name not in descriptors:
+                if descriptors_connection is None:
+                    descriptors_connection = open_descriptors(
+                        get_data(descriptorsFile))
+                descriptor = load_descriptor(descriptors_connection, name)
+                if name == "results":
+                    # the filter fields are stored by name
+                    filters = get_descriptor("filters")
+                    for result_info in descriptor.values():
+                        result_info["filter_fields"] = {
+                            field: filters[field]
+                            for field in result_info["filter_fields"]}
+                descriptors[name] = descriptor
+            descriptor = descriptors[name]
+    return descriptor
+
+
+def __getattr__(name):
+    """Give access to the descriptors as module attributes (loaded at the
+    first access)"""
+    if name in descriptor_names:
+        return get_descriptor(name)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+Registry = namedtuple("Registry", [
+    "results",
+    "taxonomy_results",
+    "display_options",
+    "download_options",
+    "returnable_fields",
+    "filter_fields",
+    "field_results",
+])
+registry = None
+
+
+def build_registry():
+    """Build an indexed (and immutable) view of the ENA data descriptors
+
+    The registry contains:
+
+    - results, taxonomy_results, display_options, download_options: frozensets with the possible ids
+    - returnable_fields, filter_fields: mappings between the result ids and frozensets with their returnable or filter (and sortable) fields
+    - field_results: mapping between each field and a frozenset with the results for which it is a returnable or filter field
+
+    :return: a Registry object
+    """
+    results = get_descriptor("results")
+    returnable_fields = {}
+    filter_fields = {}
+    field_results = {}
+    for result, result_info in results.items():
+        returnable_fields[result] = frozenset(result_info["returnable_fields"])
+        filter_fields[result] = frozenset(result_info["filter_fields"])
+        for field in returnable_fields[result] | filter_fields[result]:
+            field_results.setdefault(field, set()).add(result)
+    return Registry(
+        results=frozenset(results),
+        taxonomy_results=frozenset(get_descriptor("taxonomy_results")),
+        display_options=frozenset(get_descriptor("display_options")),
+        download_options=frozenset(get_descriptor("download_options")),
+        returnable_fields=MappingProxyType(returnable_fields),
+        filter_fields=MappingProxyType(filter_fields),
+        field_results=MappingProxyType(dict(
+            (field, frozenset(res)) for field, res in field_results.items())))
+
+
+def get_registry():
+    """Return the indexed view of the ENA data descriptors (built at the first call)
+
+    :return: a Registry object
+    """
+    global registry
+    if registry is None:
+        with descriptors_lock:
+            if registry is None:
+                registry = build_registry()
+    return registry
+
+
+def get_range_start(content_range):
+    """Return the first byte of a partial content
 
-    :param filepath: path to pickle file with serialized data
+    :param content_range: value of the Content-Range header (e.g. bytes 100-999/1000)
+
+    :return: an integer or None if the header is missing or invalid
+    """
+    if content_range is None:
+        return None
+    try:
+        return int(content_range.split()[1].split("-")[0])
+    except (IndexError, ValueError):
+        return None
+
+
+def get_range_total(content_range):
+    """Return the total size of a content given its Content-Range header
+
+    :param content_range: value of the Content-Range header (e.g. bytes */1000)
+
+    :return: an integer or None if the header is missing or invalid
     """
-    with open(filepath, 'rb') as f:
-        obj = pickle.load(f)
-    return obj
+    if content_range is None:
+        return None
+    try:
+        return int(content_range.split("/")[1])
+    except (IndexError, ValueError):
+        return None
+
+
+class Client(object):
+    """HTTP client used to send the requests to ENA
+
+    The client wraps a requests session with a pool of keep-alive connections
+    so that successive requests (pages of a search, reports, etc) reuse the
+    connections instead of opening a new one for each request.
+
+    :param pool_connections: number of connection pools to cache (one per host)
+    :param pool_maxsize: maximum number of connections kept alive per host
+    :param pool_block: boolean to block when no connection is free in the pool of a host, instead of opening a new (not kept) connection
+    :param keep_alive: boolean to keep the connections alive between requests
+    :param headers: dictionary with default headers to add to each request
+    :param timeout: timeout (in seconds or as a (connect, read) tuple) of the requests
+    :param max_retries: maximum number of retries for failed connections
+    :param cache: enasearch.cache.DiskCache object to keep the responses on disk (no cache if None)
+    """
+    def __init__(
+        self, pool_connections=10, pool_maxsize=10, pool_block=False,
+        keep_alive=True, headers=None, timeout=None, max_retries=0,
+        cache=None
+    ):
+        self.timeout = timeout
+        self.cache = cache
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=max_retries)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if headers is not None:
+            self.session.headers.update(headers)
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+
+    def get(self, url, **kwargs):
+        """Send a GET request using the pool of connections
+
+        :param url: URL to request
+        :param kwargs: extra arguments for requests (stream, headers, etc)
+
+        :return: a requests Response object
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def fetch(self, url, headers=None, store=True):
+        """Return the content of the response to a GET request
+
+        The content is taken from the cache if the client has one and the
+        response is in it, and stored in the cache otherwise
+
+        :param url: URL to request
+        :param headers: dictionary with extra headers for this request
+        :param store: boolean to store the response in the cache (False for the contents saved in a file)
+
+        :return: bytes with the content of the response
+        """
+        if self.cache is not None:
+            content = self.cache.get(url)
+            if content is not None:
+                return content
+        r = self.get(url, headers=headers)
+        r.raise_for_status()
+        content = r.content
+        if self.cache is not None and store:
+            self.cache.set(url, content)
+        return content
+
+    def open(self, url):
+        """Send a GET request and return the content of the response as a stream
+
+        The content is taken from the cache if the client has one and the
+        response is in it (the streamed responses are not stored in the cache)
+
+        :param url: URL to request
+
+        :return: a binary file object with the (decompressed) content of the response
+        """
+        if self.cache is not None:
+            fd = self.cache.open(url)
+            if fd is not None:
+                return fd
+        r = self.get(url, stream=True)
+        r.raise_for_status()
+        return ResponseStream(r)
+
+    def get_content_length(self, url):
+        """Return the size of the content of a response (without downloading it)
+
+        :param url: URL to request
+
+        :return: the size (in bytes) given in the Content-Length header of a HEAD request or None if it is not given
+        """
+        r = self.session.head(
+            url,
+            headers={"Accept-Encoding": "identity"},
+            allow_redirects=True,
+            timeout=self.timeout)
+        if r.status_code != 200 or "Content-Length" not in r.headers:
+            return None
+        return int(r.headers["Content-Length"])
+
+    def download(self, url, file, chunk_size=None, resume=True):
+        """Save the content of the response to a GET request in a file
+
+        The content is not stored in the cache (the files, e.g. FASTQ files,
+        can be large). It is written to <file>.part, which is renamed to <file>
+        once the download is complete. If the download is interrupted, the next
+        call requests only the missing bytes (with a Range header) when the
+        server supports it. If <file> exists and has the size given by the
+        server (Content-Length of a HEAD request), it is not downloaded again.
+
+        :param url: URL to request
+        :param file: filepath to save the content
+        :param chunk_size: size of the chunks written to the file (<bufferSize> if None)
+        :param resume: boolean to skip complete files and resume the partial downloads
+        """
+        if chunk_size is None:
+            chunk_size = bufferSize
+        part = file + ".part"
+        if resume and os.path.exists(file):
+            if self.get_content_length(url) == os.path.getsize(file):
+                return
+        start = 0
+        if resume and os.path.exists(part):
+            start = os.path.getsize(part)
+        headers = {"Accept-Encoding": "identity"}
+        if start > 0:
+            headers["Range"] = "bytes=%s-" % start
+        r = self.get(url, stream=True, headers=headers)
+        try:
+            if start > 0 and r.status_code == 416:
+                if get_range_total(r.headers.get("Content-Range")) == start:
+                    os.replace(part, file)
+                    return
+                start = 0
+                r.close()
+                r = self.get(url, stream=True, headers={
+                    "Accept-Encoding": "identity"})
+            r.raise_for_status()
+            mode = "wb"
+            if r.status_code == 206:
+                if get_range_start(r.headers.get("Content-Range")) != start:
+                    err_str = "Unexpected range in the response to %s" % url
+                    raise IOError(err_str)
+                mode = "ab"
+            with open(part, mode) as fd:
+                for chunk in r.iter_content(chunk_size=chunk_size):
+                    fd.write(chunk)
+        finally:
+            r.close()
+        os.replace(part, file)
+
+    def close(self):
+        """Close the connections of the client"""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ResponseStream(io.RawIOBase):
+    """Binary file object reading the content of a streamed response
+
+    The connection is given back to the pool of the client when the stream is
+    closed after reading the whole content
+
+    :param response: requests Response object (requested with stream=True)
+    :param chunk_size: size of the chunks read from the response
+    """
+    def __init__(self, response, chunk_size=65536):
+        self.response = response
+        self.chunks = response.iter_content(chunk_size=chunk_size)
+        self.chunk = b""
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while self.position >= len(self.chunk):
+            try:
+                self.chunk = next(self.chunks)
+            except StopIteration:
+                return 0
+            self.position = 0
+        size = min(len(b), len(self.chunk) - self.position)
+        b[:size] = self.chunk[self.position:self.position + size]
+        self.position += size
+        return size
+
+    def close(self):
+        if not self.closed:
+            self.response.close()
+        super(ResponseStream, self).close()
+
+
+default_client = None
+default_client_lock = threading.Lock()
 
 
-results = load_object(get_data("result_description.p"))
-filter_types = load_object(get_data("filter_types.p"))
-download_options = load_object(get_data("download_options.p"))
-display_options = load_object(get_data("display_options.p"))
-taxonomy_results = load_object(get_data("taxonomy_results.p"))
+def get_default_client():
+    """Return the client used when no client is given to the functions
+
+    The default client is created at the first call
+
+    :return: the default Client object
+    """
+    global default_client
+    with default_client_lock:
+        if default_client is None:
+            default_client = Client()
+    return default_client
+
+
+def set_default_client(client):
+    """Define the client used when no client is given to the functions
+
+    :param client: Client object (None to go back to a client with the default configuration)
+    """
+    global default_client
+    with default_client_lock:
+        default_client = client
+
+
+def get_client(client=None):
+    """Return the client to use for a request
+
+    :param client: Client object or None to use the default client
+
+    :return: a Client object
+    """
+    if client is None:
+        return get_default_client()
+    return client
 
 
 def get_results(verbose=True):
@@ -46,6 +486,7 @@ def get_results(verbose=True):
 
     :return: a dictionary with the keys being the result ids and the values dictionary to describe the results
     """
+    results = get_descriptor("results")
     if verbose:
         for result in results:
             print("%s\t%s" % (result, results[result]["description"]))
@@ -61,6 +502,7 @@ def get_taxonomy_results(verbose=False):
 
     :return: a dictionary with the keys being the result ids and the values dictionary to describe the results
     """
+    taxonomy_results = get_descriptor("taxonomy_results")
     if verbose:
         pprint(taxonomy_results)
     return taxonomy_results
@@ -74,8 +516,7 @@ def check_result(result):
 
     :param result: id of result to check
     """
-    possible_results = get_results(verbose=False)
-    if result not in possible_results:
+    if result not in get_registry().results:
         err_str = "The result od (%s) does not correspond to a " % (result)
         err_str += "possible result id in ENA"
         raise ValueError(err_str)
@@ -89,8 +530,7 @@ def check_taxonomy_result(result):
 
     :param result: id of result to check
     """
-    taxonomy_results = get_taxonomy_results(verbose=False)
-    if result not in taxonomy_results:
+    if result not in get_descriptor("taxonomy_results"):
         err_str = "The result id (%s) does not correspond to a " % (result)
         err_str += "possible taxonomy result id in ENA"
         raise ValueError(err_str)
@@ -104,9 +544,8 @@ def get_result(result, verbose=False):
 
     :return: dictionary with a description of the result, the list of returnable fields and a dictionnary with the filter fields
     """
-    results = get_results(verbose=False)
     check_result(result)
-    result_info = results[result]
+    result_info = get_descriptor("results")[result]
     if verbose:
         pprint(result_info)
     return result_info
@@ -142,7 +581,6 @@ def get_returnable_fields(result, verbose=False):
 
     :return: list of fields that can be extracted for a result
     """
-    check_result(result)
     result_info = get_result(result)
     returnable_fields = result_info["returnable_fields"]
     if verbose:
@@ -159,7 +597,10 @@ def check_returnable_fields(fields, result):
     :param fields: list of fields to check
     :param result: id of the result (partition of ENA db), accessible with get_results
     """
-    returnable_fields = get_returnable_fields(result, verbose=False)
+    check_result(result)
+    returnable_fields = get_registry().returnable_fields[result]
+    if returnable_fields.issuperset(fields):
+        return
     for field in fields:
         if field not in returnable_fields:
             err_str = "The field %s is not a returnable field for " % (field)
@@ -179,7 +620,6 @@ def get_sortable_fields(result, verbose=False):
 
     :return: dictionary with the keys being the fields ids and the values dictionary to describe the fields
     """
-    check_result(result)
     sortable_fields = get_filter_fields(result, verbose=False)
     if verbose:
         pprint(sortable_fields)
@@ -192,10 +632,15 @@ def check_sortable_fields(fields, result):
     This function raises an error if one of the ids is not in the list of possible
     sortable fields for the given result
 
-    :param fields: list of fields to check
+    :param fields: list (or comma-separated string) of fields to check
     :param result: id of the result (partition of ENA db), accessible with get_results
     """
-    sortable_fields = get_sortable_fields(result, verbose=False)
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    check_result(result)
+    sortable_fields = get_registry().filter_fields[result]
+    if sortable_fields.issuperset(fields):
+        return
     for field in fields:
         if field not in sortable_fields:
             err_str = "The field %s is not a sortable field for " % (field)
@@ -203,6 +648,20 @@ def check_sortable_fields(fields, result):
             raise ValueError(err_str)
 
 
+def get_field_results(field, verbose=False):
+    """Return the results for which a field is a returnable or filter field
+
+    :param field: id of the field
+    :param verbose: boolean to define the printing info
+
+    :return: frozenset with the result ids (empty if the field is unknown)
+    """
+    field_results = get_registry().field_results.get(field, frozenset())
+    if verbose:
+        pprint(sorted(field_results))
+    return field_results
+
+
 def get_filter_types(verbose=False):
     """Return the filters that can be used for the different type of data in a query on ENA
 
@@ -216,6 +675,7 @@ def get_filter_types(verbose=False):
 
     :return: dictionary with the keys being the type of data and the values dictionary to describe the filters for this type of data
     """
+    filter_types = get_descriptor("filter_types")
     if verbose:
         pprint(filter_types)
     return filter_types
@@ -228,6 +688,7 @@ def get_display_options(verbose=False):
 
     :return: dictionary with the keys being the formats and the values a description of the formats
     """
+    display_options = get_descriptor("display_options")
     if verbose:
         pprint(display_options)
     return display_options
@@ -241,8 +702,7 @@ def check_display_option(display):
 
     :param display: display to check
     """
-    display_options = get_display_options(verbose=False)
-    if display not in display_options:
+    if display not in get_descriptor("display_options"):
         err_str = "The display value (%s) does not correspond to a possible \
         display value in ENA" % (display)
         raise ValueError(err_str)
@@ -255,6 +715,7 @@ def get_download_options(verbose=False):
 
     :return: dictionary with the options and the values a description of the options
     """
+    download_options = get_descriptor("download_options")
     if verbose:
         pprint(download_options)
     return download_options
@@ -268,8 +729,7 @@ def check_download_option(download):
 
     :param download: download format to check
     """
-    download_options = get_download_options(verbose=False)
-    if download not in download_options:
+    if download not in get_descriptor("download_options"):
         err_str = "The download value does not correspond to a possible "
         err_str += "display value in ENA"
         raise ValueError(err_str)
@@ -330,24 +790,191 @@ def check_subseq_range(subseq_range):
         raise ValueError(err_str)
 
 
-def format_seq_content(seq_str, out_format):
+def format_seq_content(seq_str, out_format, light=False):
     """Format a string with sequences into a list of BioPython sequence objects (SeqRecord)
 
     :param seq_str: string with sequences to format
     :param out_format: fasta or fastq
+    :param light: boolean to return light Record objects (see enasearch.records) instead of SeqRecord objects
 
     :return: a list of SeqRecord objects with the sequences in the input string
     """
-    sequences = []
-    with tempfile.TemporaryFile(mode='w+') as fp:
-        fp.write(seq_str)
-        fp.seek(0)
-        for record in SeqIO.parse(fp, out_format):
-            sequences.append(record)
-    return sequences
+    if light:
+        return list(iter_seq_content(
+            io.BytesIO(seq_str.encode(defaultEncoding)), out_format,
+            light=True))
+    from Bio import SeqIO
+    return list(SeqIO.parse(io.StringIO(seq_str), out_format))
+
+
+def iter_seq_content(fd, out_format, encoding=defaultEncoding, light=False):
+    """Parse the sequences in a binary stream one at a time
+
+    The stream is read as the records are consumed and closed once all the
+    records are parsed
+
+    :param fd: binary file object (e.g. the raw stream of a response)
+    :param out_format: fasta or fastq
+    :param encoding: encoding of the content
+    :param light: boolean to return light Record objects (see enasearch.records) instead of SeqRecord objects
+
+    :return: a generator of SeqRecord objects
+    """
+    if light:
+        from enasearch.records import iter_records
+        return iter_records(fd, out_format, encoding)
+    return iter_seqrecords(fd, out_format, encoding)
+
+
+def iter_seqrecords(fd, out_format, encoding=defaultEncoding):
+    """Parse the sequences in a binary stream into SeqRecord objects
+
+    :param fd: binary file object (e.g. the raw stream of a response)
+    :param out_format: fasta or fastq
+    :param encoding: encoding of the content
+
+    :return: a generator of SeqRecord objects
+    """
+    from Bio import SeqIO
+    with io.TextIOWrapper(
+            fd, encoding=encoding, errors=decodeErrors) as handle:
+        for record in SeqIO.parse(handle, out_format):
+            yield record
+
+
+def format_xml_element(element):
+    """Format an XML element into a dictionary (as xmltodict does)
+
+    The attributes are keys prefixed by @, the children are keys (with a list
+    as value if a child tag is repeated) and the text is the value (or the
+    #text key if the element has attributes or children)
+
+    :param element: ElementTree Element object
+
+    :return: a dictionary, a string (element with only text) or None (empty element)
+    """
+    formatted = {}
+    for key, value in element.attrib.items():
+        formatted["@" + key] = value
+    for child in element:
+        value = format_xml_element(child)
+        if child.tag not in formatted:
+            formatted[child.tag] = value
+        elif isinstance(formatted[child.tag], list):
+            formatted[child.tag].append(value)
+        else:
+            formatted[child.tag] = [formatted[child.tag], value]
+    text = (element.text or "") + "".join([c.tail or "" for c in element])
+    text = text.strip()
+    if len(formatted) == 0:
+        return text if text != "" else None
+    if text != "":
+        formatted["#text"] = text
+    return formatted
+
+
+def iter_xml_content(fd):
+    """Parse the records in a binary stream with a XML document one at a time
+
+    The records are the children of the root element of the document (e.g.
+    RUN, SAMPLE or PROJECT elements). Each record is formatted as a dictionary
+    with its tag as key and its content (formatted as xmltodict does) as value.
+    The parsed records are removed from the tree, so the memory used does not
+    depend on the number of records. The stream is closed once all the records
+    are parsed.
+
+    :param fd: binary file object (e.g. the raw stream of a response)
+
+    :return: a generator of dictionaries
+    """
+    from xml.etree.ElementTree import iterparse
+    with fd:
+        depth = 0
+        root = None
+        for event, element in iterparse(fd, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if root is None:
+                    root = element
+                continue
+            depth -= 1
+            if depth == 1:
+                yield {element.tag: format_xml_element(element)}
+                root.clear()
+
+
+def format_content(content, display, encoding=defaultEncoding, light=False):
+    """Format the content of a request given the display format
+
+    The content can be given as bytes: the xml is then given as is to the XML
+    parser (which uses the encoding declared in the document), the sequences
+    are decoded while being parsed and the other displays are decoded once
+    with the given encoding (the invalid bytes being replaced, see
+    <decodeErrors>)
+
+    :param content: string or bytes with the content returned by ENA
+    :param display: display option
+    :param encoding: encoding of the content (if given as bytes)
+    :param light: boolean to return light Record objects (see enasearch.records) instead of SeqRecord objects for fasta and fastq
+
+    :return: a dictionary for xml, a list of SeqRecord objects for fasta and fastq and the string otherwise
+    """
+    if display == "xml":
+        import xmltodict
+        return xmltodict.parse(content)
+    elif display == "fasta" or display == "fastq":
+        if isinstance(content, str):
+            return format_seq_content(content, display, light)
+        return list(iter_seq_content(
+            io.BytesIO(content), display, encoding, light))
+    elif isinstance(content, str):
+        return content
+    else:
+        return content.decode(encoding, decodeErrors)
+
+
+def check_stream_options(display, file):
+    """Check that the results can be streamed
+
+    This function raises an error if the display is not fasta, fastq or xml or
+    if a file is given
+
+    :param display: display option
+    :param file: filepath to save the content of the search
+    """
+    if display not in ["fasta", "fastq", "xml"]:
+        err_str = "The results can be streamed only for fasta, fastq and xml"
+        err_str += " display"
+        raise ValueError(err_str)
+    if file is not None:
+        err_str = "The results can not be streamed when saved in a file"
+        raise ValueError(err_str)
+
+
+def check_columnar_options(file, stream, raw):
+    """Check that the results can be returned as typed columns
+
+    This function raises an error if a file is given or if the results are
+    streamed or returned as bytes
+
+    :param file: filepath to save the content of the search
+    :param stream: boolean to parse the records as they are received
+    :param raw: boolean to return the content as bytes
+    """
+    if file is not None:
+        err_str = "The results can not be returned as columns when saved in"
+        err_str += " a file"
+        raise ValueError(err_str)
+    if stream or raw:
+        err_str = "The results can not be returned as columns when streamed"
+        err_str += " or returned as bytes"
+        raise ValueError(err_str)
 
 
-def request_url(url, display, file=None):
+def request_url(
+    url, display, file=None, client=None, stream=False, raw=False,
+    encoding=defaultEncoding, light=False
+):
     """Run the URL request and return content or status
 
     This function tooks an URL built to query or extract data from ENA and apply
@@ -360,25 +987,26 @@ def request_url(url, display, file=None):
     :param display: display option
     :param length: number of records to retrieve
     :param file: filepath to save the content of the search
+    :param client: Client object used to send the request (default client if None)
+    :param stream: boolean to parse the records as they are received and return them in a generator (only for fasta, fastq and xml)
+    :param raw: boolean to return the content as bytes, without decoding nor parsing it
+    :param encoding: encoding of the content
+    :param light: boolean to return light Record objects (see enasearch.records) instead of SeqRecord objects for fasta and fastq
 
     :return: status of the request or the result of the request (in different format)
     """
+    client = get_client(client)
+    if stream:
+        check_stream_options(display, file)
+        if display == "xml":
+            return iter_xml_content(client.open(url))
+        return iter_seq_content(client.open(url), display, encoding, light)
     if file is not None:
-        r = requests.get(url, stream=True)
-        r.raise_for_status()
-        with open(file, "wb") as fd:
-            for chunk in r.iter_content(chunk_size=128):
-                fd.write(chunk)
-        return r.raise_for_status()
+        client.download(url, file)
+    elif raw:
+        return client.fetch(url)
     else:
-        r = requests.get(url)
-        r.raise_for_status()
-        if display == "xml":
-            return xmltodict.parse(r.text)
-        elif display == "fasta" or display == "fastq":
-            return format_seq_content(r.text, display)
-        else:
-            return r.text
+        return format_content(client.fetch(url), display, encoding, light)
 
 
 def build_retrieve_url(
@@ -425,9 +1053,200 @@ def build_retrieve_url(
     return url
 
 
+def format_ids(ids):
+    """Format identifiers given as a comma-separated string or an iterable
+
+    :param ids: comma-separated identifiers or iterable of identifiers
+
+    :return: a list of identifiers
+    """
+    if isinstance(ids, str):
+        return ids.split(",")
+    return [str(one_id) for one_id in ids]
+
+
+def split_ids(ids, max_length):
+    """Split identifiers into batches of bounded length
+
+    :param ids: list of identifiers
+    :param max_length: maximum length of the comma-separated identifiers of a batch (an identifier longer than it is in a batch alone)
+
+    :return: a list of strings with comma-separated identifiers
+    """
+    batches = []
+    batch = []
+    length = -1
+    for one_id in ids:
+        if len(batch) > 0 and length + 1 + len(one_id) > max_length:
+            batches.append(",".join(batch))
+            batch = []
+            length = -1
+        batch.append(one_id)
+        length += 1 + len(one_id)
+    if len(batch) > 0:
+        batches.append(",".join(batch))
+    return batches
+
+
+def merge_xml_contents(contents):
+    """Merge XML documents by adding the records of all documents under the root of the first one
+
+    :param contents: list of bytes with XML documents
+
+    :return: bytes with the merged XML document
+    """
+    from xml.etree import ElementTree
+    root = None
+    for content in contents:
+        element = ElementTree.fromstring(content)
+        if root is None:
+            root = element
+        else:
+            root.extend(list(element))
+    return ElementTree.tostring(root, encoding="UTF-8")
+
+
+def iter_batch_records(urls, display, client, max_workers, encoding, light):
+    """Fetch batches of records concurrently and iterate over the records in order
+
+    :param urls: list of URLs to the batches
+    :param display: display option (fasta, fastq or xml)
+    :param client: Client object used to send the requests
+    :param max_workers: number of batches requested at the same time
+    :param encoding: encoding of the content
+    :param light: boolean to return light Record objects instead of SeqRecord objects
+
+    :return: a generator of records
+    """
+    for content in ordered_map(client.fetch, urls, max_workers):
+        if display == "xml":
+            records = iter_xml_content(io.BytesIO(content))
+        else:
+            records = iter_seq_content(
+                io.BytesIO(content), display, encoding, light)
+        for record in records:
+            yield record
+
+
+def request_batches(
+    urls, display, download=None, file=None, client=None, stream=False,
+    raw=False, max_workers=maxWorkers, encoding=defaultEncoding, light=False
+):
+    """Request URLs to batches of records and merge the results in order
+
+    The batches are requested concurrently (at most <max_workers> at the same
+    time). The XML documents are merged under the root of the first one; the
+    other contents are concatenated.
+
+    :param urls: list of URLs to the batches
+    :param display: display option
+    :param download: download option (gzip to compress the file on the fly)
+    :param file: filepath to save the merged content
+    :param client: Client object used to send the requests (default client if None)
+    :param stream: boolean to parse the records as they are received and return them in a generator (only for fasta, fastq and xml)
+    :param raw: boolean to return the content as bytes, without decoding nor parsing it
+    :param max_workers: number of batches requested at the same time
+    :param encoding: encoding of the content
+    :param light: boolean to return light Record objects (see enasearch.records) instead of SeqRecord objects for fasta and fastq
+
+    :return: None if a file is given or the merged results (in different format)
+    """
+    client = get_client(client)
+    if stream:
+        check_stream_options(display, file)
+        return iter_batch_records(
+            urls, display, client, max_workers, encoding, light)
+    fetch = client.fetch
+    if file is not None:
+        fetch = functools.partial(client.fetch, store=False)
+    contents = ordered_map(fetch, urls, max_workers)
+    if display == "xml":
+        contents = [merge_xml_contents(list(contents))]
+    if file is not None:
+        with open_search_output(file, download) as output:
+            for content in contents:
+                output.write(content)
+        return
+    if raw:
+        return b"".join(contents)
+    if display == "fasta" or display == "fastq":
+        results = []
+        for content in contents:
+            results += format_content(content, display, encoding, light)
+        return results
+    return format_content(b"".join(contents), display, encoding)
+
+
+def retrieve_ids(
+    ids, display, result=None, download=None, file=None, offset=None,
+    length=None, subseq_range=None, expanded=False, header=False, client=None,
+    stream=False, raw=False, light=False, max_workers=maxWorkers
+):
+    """Retrieve records on ENA, with the identifiers split into batches if needed
+
+    The identifiers are split into batches so that the URLs are shorter than
+    <urlLengthLimit> characters. With one batch, the URL is requested as is;
+    with several batches, the batches are requested concurrently and the
+    results merged in the order of the identifiers (see request_batches).
+
+    :param ids: comma-separated identifiers or iterable of identifiers
+    :param display: display option to specify the display format (accessible with get_display_options)
+    :param result: taxonomy result to display (accessible with result)
+    :param download: download option to specify that records are to be saved in a file (used with file option, accessible with get_download_options)
+    :param file: filepath to save the content of the search (used with download option)
+    :param offset: first record to get (only if the identifiers fit in one batch)
+    :param length: number of records to retrieve (only if the identifiers fit in one batch)
+    :param subseq_range: range for subsequences (limit separated by a -)
+    :param expanded: boolean to determine if a CON record is expanded
+    :param header: boolean to obtain only the header of a record
+    :param client: Client object used to send the requests (default client if None)
+    :param stream: boolean to parse the records as they are received and return them in a generator (only for fasta, fastq and xml)
+    :param raw: boolean to return the content as bytes, without decoding nor parsing it
+    :param light: boolean to return light Record objects (see enasearch.records) instead of SeqRecord objects for fasta and fastq
+    :param max_workers: number of batches requested at the same time
+
+    :return: data corresponding to the requested ids and formatted given the parameters
+    """
+    def build_url(batch, download=None, file=None):
+        return build_retrieve_url(
+            ids=batch,
+            display=display,
+            result=result,
+            download=download,
+            file=file,
+            offset=offset,
+            length=length,
+            subseq_range=subseq_range,
+            expanded=expanded,
+            header=header)
+    if download is not None or file is not None:
+        check_download_file_options(download, file)
+    max_length = urlLengthLimit - len(build_url(""))
+    batches = split_ids(format_ids(ids), max_length)
+    if len(batches) <= 1:
+        url = build_url(batches[0] if batches else "", download, file)
+        return request_url(
+            url, display, file, client, stream, raw, light=light)
+    if offset is not None or length is not None:
+        err_str = "Offset and length can not be used with identifiers split"
+        err_str += " in several batches"
+        raise ValueError(err_str)
+    return request_batches(
+        urls=[build_url(batch) for batch in batches],
+        display=display,
+        download=download,
+        file=file,
+        client=client,
+        stream=stream,
+        raw=raw,
+        max_workers=max_workers,
+        light=light)
+
+
 def retrieve_data(
     ids, display, download=None, file=None, offset=None, length=None,
-    subseq_range=None, expanded=False, header=False
+    subseq_range=None, expanded=False, header=False, client=None,
+    stream=False, raw=False, light=False, max_workers=maxWorkers
 ):
     """Retrieve ENA data (other than taxon)
 
@@ -436,7 +1255,7 @@ def retrieve_data(
     - Building the URL based on the ids to retrieve and some parameters to format the results
     - Requesting the URL to extract the data
 
-    :param ids: comma-separated identifiers for records other than Taxon
+    :param ids: comma-separated identifiers (or iterable of identifiers) for records other than Taxon, split into batches if needed (see retrieve_ids)
     :param display: display option to specify the display format (accessible with get_display_options)
     :param offset: first record to get
     :param length: number of records to retrieve
@@ -445,10 +1264,15 @@ def retrieve_data(
     :param subseq_range: range for subsequences (limit separated by a -)
     :param expanded: boolean to determine if a CON record is expanded
     :param header: boolean to obtain only the header of a record
+    :param client: Client object used to send the requests (default client if None)
+    :param stream: boolean to parse the records as they are received and return them in a generator (only for fasta, fastq and xml)
+    :param raw: boolean to return the content as bytes, without decoding nor parsing it
+    :param light: boolean to return light Record objects (see enasearch.records) instead of SeqRecord objects for fasta and fastq
+    :param max_workers: number of batches of ids requested at the same time
 
     :return: data corresponding to the requested ids and formatted given the parameters
     """
-    url = build_retrieve_url(
+    return retrieve_ids(
         ids=ids,
         display=display,
         result=None,
@@ -458,13 +1282,28 @@ def retrieve_data(
         length=length,
         subseq_range=subseq_range,
         expanded=expanded,
-        header=header)
-    return request_url(url, display, file)
+        header=header,
+        client=client,
+        stream=stream,
+        raw=raw,
+        light=light,
+        max_workers=max_workers)
+
+
+def format_taxon_ids(ids):
+    """Format taxon ids to query them on the Taxon Portal
+
+    :param ids: comma-separated taxon identifiers or iterable of identifiers
+
+    :return: a string with the comma-separated ids prefixed by Taxon:
+    """
+    return ",".join(["Taxon:%s" % (one_id) for one_id in format_ids(ids)])
 
 
 def retrieve_taxons(
     ids, display, result=None, download=None, file=None, offset=None,
-    length=None, subseq_range=None, expanded=False, header=False
+    length=None, subseq_range=None, expanded=False, header=False, client=None,
+    stream=False, raw=False, light=False, max_workers=maxWorkers
 ):
     """Retrieve data from the ENA Taxon Portal
 
@@ -474,7 +1313,7 @@ def retrieve_taxons(
     - Building the URL based on the ids to retrieve and some parameters to format the results
     - Requesting the URL to extract the data
 
-    :param ids: comma-separated taxon identifiers
+    :param ids: comma-separated taxon identifiers (or iterable of identifiers), split into batches if needed (see retrieve_ids)
     :param display: display option to specify the display format (accessible with get_display_options)
     :param result: taxonomy result to display (accessible with result)
     :param offset: first record to get
@@ -484,17 +1323,18 @@ def retrieve_taxons(
     :param subseq_range: range for subsequences (limit separated by a -)
     :param expanded: boolean to determine if a CON record is expanded
     :param header: boolean to obtain only the header of a record
+    :param client: Client object used to send the requests (default client if None)
+    :param stream: boolean to parse the records as they are received and return them in a generator (only for fasta, fastq and xml)
+    :param raw: boolean to return the content as bytes, without decoding nor parsing it
+    :param light: boolean to return light Record objects (see enasearch.records) instead of SeqRecord objects for fasta and fastq
+    :param max_workers: number of batches of ids requested at the same time
 
     :return: data corresponding to the requested ids and formatted given the parameters
     """
-    id_list = ids.split(",")
-    modified_ids = []
-    for one_id in id_list:
-        modified_ids.append("Taxon:%s" % (one_id))
     if result is not None:
         check_taxonomy_result(result)
-    url = build_retrieve_url(
-        ids=",".join(modified_ids),
+    return retrieve_ids(
+        ids=format_taxon_ids(ids).split(","),
         display=display,
         result=result,
         download=download,
@@ -503,8 +1343,12 @@ def retrieve_taxons(
         length=length,
         subseq_range=subseq_range,
         expanded=expanded,
-        header=header)
-    return request_url(url, display, file)
+        header=header,
+        client=client,
+        stream=stream,
+        raw=raw,
+        light=light,
+        max_workers=max_workers)
 
 
 def get_search_url(free_text_search):
@@ -521,19 +1365,17 @@ def get_search_url(free_text_search):
     return url
 
 
-def get_search_result_number(
+def build_search_result_number_url(
     free_text_search, query, result, need_check_result=True
 ):
-    """Get the number of results for a query on a result
-
-    This function builds a query on ENA to extract the number of results
-    matching the query on ENA
+    """Build the URL to get the number of results for a query on a result
 
     :param free_text_search: boolean to describe the type of query
     :param query: query string, made up of filtering conditions, joined by logical ANDs, ORs and NOTs and bound by double quotes
     :param result: id of the result (partition of ENA db), accessible with get_results
+    :param need_check_result: boolean to check the result id before building the URL
 
-    :return: an integer corresponding to the number of results of a query on ENA
+    :return: a string with the build URL
     """
     url = get_search_url(free_text_search)
     url += "query=%s" % (query)
@@ -543,26 +1385,156 @@ def get_search_result_number(
     url += "&result=%s" % (result)
 
     url += "&resultcount"
-    r = requests.get(
+    return url
+
+
+def parse_search_result_number(content):
+    """Extract the number of results from the content returned by ENA
+
+    :param content: string returned by a resultcount request
+
+    :return: an integer corresponding to the number of results
+    """
+    nb = content.split("\n")[0].split(": ")[1].replace(",", "")
+    return int(nb)
+
+
+search_result_numbers = OrderedDict()
+search_result_numbers_lock = threading.Lock()
+
+
+def get_memoized_search_result_number(free_text_search, query, result):
+    """Return the number of results for a query if it was recently requested
+
+    :param free_text_search: boolean to describe the type of query
+    :param query: query string
+    :param result: id of the result (partition of ENA db)
+
+    :return: the number of results or None if not known or older than <resultNumberTTL> seconds (the expired number is then forgotten)
+    """
+    key = (bool(free_text_search), query, result)
+    with search_result_numbers_lock:
+        memoized = search_result_numbers.get(key)
+        if memoized is None:
+            return None
+        timestamp, result_nb = memoized
+        if time.time() - timestamp > resultNumberTTL:
+            del search_result_numbers[key]
+            return None
+    return result_nb
+
+
+def memoize_search_result_number(free_text_search, query, result, result_nb):
+    """Keep the number of results for a query for <resultNumberTTL> seconds
+
+    The numbers are kept in the order they were memoized: the expired ones
+    and, beyond <resultNumberMaxSize> numbers, the oldest ones are forgotten
+
+    :param free_text_search: boolean to describe the type of query
+    :param query: query string
+    :param result: id of the result (partition of ENA db)
+    :param result_nb: number of results for the query
+    """
+    key = (bool(free_text_search), query, result)
+    now = time.time()
+    with search_result_numbers_lock:
+        search_result_numbers.pop(key, None)
+        search_result_numbers[key] = (now, result_nb)
+        while len(search_result_numbers) > 0:
+            timestamp, oldest_nb = next(iter(search_result_numbers.values()))
+            if now - timestamp <= resultNumberTTL and (
+                    len(search_result_numbers) <= resultNumberMaxSize):
+                break
+            search_result_numbers.popitem(last=False)
+
+
+def clear_memoized_search_result_numbers():
+    """Forget all the memoized numbers of results"""
+    with search_result_numbers_lock:
+        search_result_numbers.clear()
+
+
+def get_search_result_number(
+    free_text_search, query, result, need_check_result=True, client=None,
+    use_memoized=True
+):
+    """Get the number of results for a query on a result
+
+    This function builds a query on ENA to extract the number of results
+    matching the query on ENA
+
+    :param free_text_search: boolean to describe the type of query
+    :param query: query string, made up of filtering conditions, joined by logical ANDs, ORs and NOTs and bound by double quotes
+    :param result: id of the result (partition of ENA db), accessible with get_results
+    :param need_check_result: boolean to check the result id before the request
+    :param client: Client object used to send the requests (default client if None)
+    :param use_memoized: boolean to reuse the number of results if it was requested less than <resultNumberTTL> seconds ago
+
+    :return: an integer corresponding to the number of results of a query on ENA
+    """
+    url = build_search_result_number_url(
+        free_text_search, query, result, need_check_result)
+    if use_memoized:
+        result_nb = get_memoized_search_result_number(
+            free_text_search, query, result)
+        if result_nb is not None:
+            return result_nb
+    content = get_client(client).fetch(
         url,
         headers={"accept": "application/json"})
-    r.raise_for_status()
-    nb = r.text.split("\n")[0].split(": ")[1].replace(",", "")
-    return int(nb)
+    result_nb = parse_search_result_number(content.decode(defaultEncoding, decodeErrors))
+    memoize_search_result_number(free_text_search, query, result, result_nb)
+    return result_nb
 
 
-def search_data(
+def check_offset(offset, result_nb):
+    """Check that an offset is below the number of results for a query
+
+    This function raises an error if the offset is higher than the number of
+    results
+
+    :param offset: first record to get
+    :param result_nb: number of results for the query
+    """
+    if offset > result_nb:
+        err_str = "The offset value must be lower than the possible number"
+        err_str += " of results for the query"
+        raise ValueError(err_str)
+
+
+def compile_search_query(free_text_search, query, result, validate=True):
+    """Validate and normalize the query of a search before any request
+
+    The query is parsed and checked against the filter fields of the result,
+    the operators and values of their types and the parameters of the
+    taxonomy and geospatial functions (see enasearch.query.compile_query), so
+    an invalid query raises an error without a round trip to ENA. Without
+    validation, only the syntax of the query is checked. Free text queries
+    are returned unchanged.
+
+    :param free_text_search: boolean to describe the type of query
+    :param query: query string, made up of filtering conditions, joined by logical ANDs, ORs and NOTs and bound by double quotes
+    :param result: id of the result (partition of ENA db), accessible with get_results
+    :param validate: boolean to check the fields, operators, values and functions of the query against the descriptors (otherwise only its syntax is checked, e.g. for fields more recent than the descriptors)
+
+    :return: the normalized URL-encoded query string
+    """
+    if free_text_search:
+        return query
+    check_result(result)
+    from enasearch.query import compile_query
+    return compile_query(query, result, validate=validate)
+
+
+def build_search_url(
     free_text_search, query, result, display, offset=None, length=None,
     download=None, file=None, fields=None, sortfields=None
 ):
-    """Search ENA data
-
-    This function
+    """Build the URL to search data on ENA
 
-    - Builds the URL for a given query to search/extract data on ENA database
-    - Formats the results given the option defined
-
-    The number of results for the query is limited at <lengthLimit>
+    This function builds the URL to search data on ENA. It takes several
+    arguments, check their validity (except the offset which needs the number
+    of results) before combining them to build the URL.
 
     :param free_text_search: boolean to describe the type of query
     :param query: query string, made up of filtering conditions, joined by logical ANDs, ORs and NOTs and bound by double quotes
@@ -575,7 +1547,7 @@ def search_data(
     :param fields: comma-separated list of fields to return (only if display=report)
     :param sortfields: comma-separated list of fields to sort the results (only if display=report)
 
-    :return: results of the request in a format defined in the parameters
+    :return: a string with the build URL
     """
     url = get_search_url(free_text_search)
     url += "query=%s" % (query)
@@ -591,11 +1563,6 @@ def search_data(
         url += "&length=%s" % (length)
 
     if offset is not None:
-        result_nb = get_search_result_number(free_text_search, query, result)
-        if offset > result_nb:
-            err_str = "The offset value must be lower than the possible number"
-            err_str += " of results for the query"
-            raise ValueError(err_str)
         url += "&offset=%s" % (offset)
 
     if display == "report":
@@ -611,11 +1578,507 @@ def search_data(
     if download is not None or file is not None:
         check_download_file_options(download, file)
         url += "&download=%s" % (download)
-    return request_url(url, display, file)
+    return url
+
+
+def search_data(
+    free_text_search, query, result, display, offset=None, length=None,
+    download=None, file=None, fields=None, sortfields=None, client=None,
+    result_nb=None, stream=False, raw=False, columnar=False, light=False,
+    validate=True
+):
+    """Search ENA data
+
+    This function
+
+    - Builds the URL for a given query to search/extract data on ENA database
+    - Formats the results given the option defined
+
+    The number of results for the query is limited at <lengthLimit>
+
+    :param free_text_search: boolean to describe the type of query
+    :param query: query string, made up of filtering conditions, joined by logical ANDs, ORs and NOTs and bound by double quotes
+    :param result: id of the result (partition of ENA db), accessible with get_results
+    :param display: display option to specify the display format (accessible with get_display_options)
+    :param offset: first record to get
+    :param length: number of records to retrieve
+    :param download: download option to specify that records are to be saved in a file (used with file option)
+    :param file: filepath to save the content of the search (used with download option)
+    :param fields: comma-separated list of fields to return (only if display=report)
+    :param sortfields: comma-separated list of fields to sort the results (only if display=report)
+    :param client: Client object used to send the requests (default client if None)
+    :param result_nb: number of results for the query if already known (to check the offset without requesting it)
+    :param stream: boolean to parse the records as they are received and return them in a generator (only for fasta, fastq and xml)
+    :param raw: boolean to return the content as bytes, without decoding nor parsing it
+    :param columnar: boolean to return the report as a dictionary of typed columns (only if display=report, see enasearch.table.parse_report)
+    :param light: boolean to return light Record objects (see enasearch.records) instead of SeqRecord objects for fasta and fastq
+    :param validate: boolean to check the fields, operators, values and functions of the query against the descriptors before any request (otherwise only its syntax is checked, e.g. for fields more recent than the descriptors)
+
+    :return: results of the request in a format defined in the parameters
+    """
+    if columnar:
+        if display != "report":
+            err_str = "The results can be returned as columns only for report"
+            err_str += " display"
+            raise ValueError(err_str)
+        check_columnar_options(file, stream, raw)
+    query = compile_search_query(free_text_search, query, result, validate)
+    url = build_search_url(
+        free_text_search=free_text_search,
+        query=query,
+        result=result,
+        display=display,
+        offset=offset,
+        length=length,
+        download=download,
+        file=file,
+        fields=fields,
+        sortfields=sortfields)
+    if offset is not None:
+        if result_nb is None:
+            result_nb = get_search_result_number(
+                free_text_search, query, result, client=client)
+        check_offset(offset, result_nb)
+    if columnar:
+        from enasearch.table import parse_report
+        return parse_report(request_url(url, display, client=client, raw=True), result)
+    return request_url(
+        url, display, file, client, stream, raw, light=light)
+
+
+def ordered_map(function, items, max_workers=maxWorkers):
+    """Apply a function on items using a pool of threads and yield the results in order
+
+    At most <max_workers> items are processed at the same time and the results
+    are yielded in the order of the items as soon as they are available, so
+    that at most <max_workers> results are kept in memory.
+
+    :param function: function to apply on each item
+    :param items: iterable with the items
+    :param max_workers: number of threads (the function is applied sequentially if 1)
+
+    :return: a generator with the results of the function on the items
+    """
+    if max_workers is None or max_workers <= 1:
+        for item in items:
+            yield function(item)
+        return
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = deque()
+        try:
+            for item in items:
+                if len(futures) >= max_workers:
+                    yield futures.popleft().result()
+                futures.append(executor.submit(function, item))
+            while futures:
+                yield futures.popleft().result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def iter_search_data(
+    free_text_search, query, result, display, offset=None, length=None,
+    client=None, result_nb=None, light=False
+):
+    """Search ENA data and iterate over the records as they are received
+
+    The records are parsed from the response stream one at a time, so the
+    memory used does not depend on the number of results
+
+    :param free_text_search: boolean to describe the type of query
+    :param query: query string, made up of filtering conditions, joined by logical ANDs, ORs and NOTs and bound by double quotes
+    :param result: id of the result (partition of ENA db), accessible with get_results
+    :param display: display option (fasta or fastq)
+    :param offset: first record to get
+    :param length: number of records to retrieve
+    :param client: Client object used to send the requests (default client if None)
+    :param result_nb: number of results for the query if already known (to check the offset without requesting it)
+    :param light: boolean to return light Record objects (see enasearch.records) instead of SeqRecord objects
+
+    :return: a generator of SeqRecord objects
+    """
+    return search_data(
+        free_text_search=free_text_search,
+        query=query,
+        result=result,
+        display=display,
+        offset=offset,
+        length=length,
+        client=client,
+        result_nb=result_nb,
+        stream=True,
+        light=light)
+
+
+class SearchCursor(object):
+    """Iterator over the results of a search, requested page by page
+
+    The pages of <page_size> records are requested one after the other, by
+    advancing the offset. While the records of a page are consumed, the next
+    page is requested in a background thread, so the network and the
+    processing of the records overlap. The progress is given by the number of
+    records fetched and the total number of results.
+
+    :param free_text_search: boolean to describe the type of query
+    :param query: query string, made up of filtering conditions, joined by logical ANDs, ORs and NOTs and bound by double quotes
+    :param result: id of the result (partition of ENA db), accessible with get_results
+    :param display: display option (fasta, fastq, xml or report)
+    :param page_size: number of records per page (<lengthLimit> if None)
+    :param fields: comma-separated list of fields to return (only if display=report)
+    :param sortfields: comma-separated list of fields to sort the results (only if display=report)
+    :param client: Client object used to send the requests (default client if None)
+    :param light: boolean to return light Record objects (see enasearch.records) instead of SeqRecord objects
+    :param prefetch: boolean to request the next page in a background thread
+    :param validate: boolean to check the fields, operators, values and functions of the query against the descriptors before any request (otherwise only its syntax is checked, e.g. for fields more recent than the descriptors)
+    """
+    def __init__(
+        self, free_text_search, query, result, display, page_size=None,
+        fields=None, sortfields=None, client=None, light=False, prefetch=True,
+        validate=True
+    ):
+        if display not in ["fasta", "fastq", "xml", "report"]:
+            err_str = "The results can be iterated only for fasta, fastq, xml"
+            err_str += " and report display"
+            raise ValueError(err_str)
+        if page_size is None:
+            page_size = lengthLimit
+        check_length(page_size)
+        if page_size <= 0:
+            err_str = "The page size must be positive"
+            raise ValueError(err_str)
+        self.free_text_search = free_text_search
+        self.query = compile_search_query(
+            free_text_search, query, result, validate)
+        self.result = result
+        self.display = display
+        self.page_size = page_size
+        self.fields = fields
+        self.sortfields = sortfields
+        self.client = get_client(client)
+        self.light = light
+        self.total = get_search_result_number(
+            free_text_search, self.query, result, client=self.client)
+        self.fetched = 0
+        self.executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        self.next_page = None
+        self.records = self.iter_records()
+
+    @property
+    def progress(self):
+        """Fraction of the results already fetched"""
+        if self.total == 0:
+            return 1.0
+        return float(self.fetched) / self.total
+
+    def fetch_page(self, offset):
+        """Request the page of results starting at an offset
+
+        :param offset: first record of the page
+
+        :return: bytes with the content of the page
+        """
+        url = build_search_url(
+            free_text_search=self.free_text_search,
+            query=self.query,
+            result=self.result,
+            display=self.display,
+            offset=offset,
+            length=min(self.page_size, self.total - offset),
+            fields=self.fields,
+            sortfields=self.sortfields)
+        return self.client.fetch(url)
+
+    def parse_page(self, content):
+        """Parse the records of a page
+
+        :param content: bytes with the content of a page
+
+        :return: list of records (SeqRecord or Record objects for fasta and fastq, dictionaries for xml and report)
+        """
+        if self.display == "xml":
+            return list(iter_xml_content(io.BytesIO(content)))
+        if self.display == "report":
+            lines = content.decode(defaultEncoding, decodeErrors).splitlines()
+            if len(lines) == 0:
+                return []
+            header = lines[0].split("\t")
+            return [
+                dict(zip(header, line.split("\t")))
+                for line in lines[1:] if line != ""]
+        return format_content(content, self.display, light=self.light)
+
+    def request_page(self, offset):
+        """Request a page (in the background thread if prefetch is enabled)
+
+        :param offset: first record of the page
+
+        :return: a Future object (or the content of the page without prefetch)
+        """
+        if self.executor is None:
+            return self.fetch_page(offset)
+        return self.executor.submit(self.fetch_page, offset)
+
+    def iter_pages(self):
+        """Iterate over the pages of results
+
+        :return: a generator of lists of records
+        """
+        offsets = list(range(0, self.total, self.page_size))
+        try:
+            for i, offset in enumerate(offsets):
+                if self.next_page is None:
+                    self.next_page = self.request_page(offset)
+                page = self.next_page
+                self.next_page = None
+                if self.executor is not None:
+                    page = page.result()
+                if i + 1 < len(offsets):
+                    self.next_page = self.request_page(offsets[i + 1])
+                records = self.parse_page(page)
+                self.fetched += len(records)
+                yield records
+        finally:
+            self.close()
+
+    def iter_records(self):
+        """Iterate over the records
+
+        :return: a generator of records
+        """
+        for page in self.iter_pages():
+            for record in page:
+                yield record
+
+    def close(self):
+        """Cancel the prefetched page and stop the background thread"""
+        if self.executor is not None:
+            if self.next_page is not None:
+                self.next_page.cancel()
+                self.next_page = None
+            self.executor.shutdown(wait=False)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.records)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def iter_search(
+    query, result, display, page_size=None, free_text_search=False,
+    fields=None, sortfields=None, client=None, light=False, prefetch=True,
+    validate=True
+):
+    """Search ENA data and iterate over the results page by page
+
+    The next page is requested in a background thread while the records of
+    the current page are consumed (see SearchCursor). The progress is
+    accessible with the fetched, total and progress attributes of the
+    returned cursor.
+
+    :param query: query string, made up of filtering conditions, joined by logical ANDs, ORs and NOTs and bound by double quotes
+    :param result: id of the result (partition of ENA db), accessible with get_results
+    :param display: display option (fasta, fastq, xml or report)
+    :param page_size: number of records per page (<lengthLimit> if None)
+    :param free_text_search: boolean to describe the type of query
+    :param fields: comma-separated list of fields to return (only if display=report)
+    :param sortfields: comma-separated list of fields to sort the results (only if display=report)
+    :param client: Client object used to send the requests (default client if None)
+    :param light: boolean to return light Record objects (see enasearch.records) instead of SeqRecord objects
+    :param prefetch: boolean to request the next page in a background thread
+    :param validate: boolean to check the fields, operators, values and functions of the query against the descriptors before any request (otherwise only its syntax is checked, e.g. for fields more recent than the descriptors)
+
+    :return: a SearchCursor object (iterator over the records)
+    """
+    return SearchCursor(
+        free_text_search=free_text_search,
+        query=query,
+        result=result,
+        display=display,
+        page_size=page_size,
+        fields=fields,
+        sortfields=sortfields,
+        client=client,
+        light=light,
+        prefetch=prefetch,
+        validate=validate)
+
+
+def get_search_windows(result_nb):
+    """Split the results of a query into windows of at most <lengthLimit> records
+
+    If all the results fit in one window, the offset and length are None (the
+    whole results are requested at once)
+
+    :param result_nb: number of results for the query
+
+    :return: list of (offset, length) tuples
+    """
+    if result_nb <= lengthLimit:
+        return [(None, None)] if result_nb > 0 else []
+    windows = []
+    for start in range(0, result_nb, lengthLimit):
+        windows.append((start, min(lengthLimit, result_nb - start)))
+    return windows
+
+
+def open_search_output(file, download, compresslevel=6):
+    """Open the file to write the results of a search
+
+    :param file: filepath to save the results
+    :param download: download option (gzip to compress the file on the fly)
+    :param compresslevel: gzip compression level (used only with gzip download option)
+
+    :return: a binary file object
+    """
+    if download == "gzip":
+        return gzip.open(file, "wb", compresslevel=compresslevel)
+    return open(file, "wb")
+
+
+def write_search_pages(urls, file, download, compresslevel, client, max_workers):
+    """Write the content of search pages in a file, one page after the other
+
+    With one worker, the content of each page is copied from the response
+    stream to the file by blocks of <bufferSize> bytes. With several workers,
+    the pages are requested concurrently and written in order as soon as they
+    are received (at most <max_workers> pages are kept in memory)
+
+    :param urls: list of URLs to the pages of results
+    :param file: filepath to save the results
+    :param download: download option (gzip to compress the file on the fly)
+    :param compresslevel: gzip compression level (used only with gzip download option)
+    :param client: Client object used to send the requests
+    :param max_workers: number of pages requested at the same time
+    """
+    with open_search_output(file, download, compresslevel) as output:
+        if max_workers is None or max_workers <= 1:
+            for url in urls:
+                with client.open(url) as fd:
+                    shutil.copyfileobj(fd, output, bufferSize)
+        else:
+            fetch = functools.partial(client.fetch, store=False)
+            for content in ordered_map(fetch, urls, max_workers):
+                output.write(content)
+
+
+def load_search_checkpoint(checkpoint, state, file):
+    """Load the positions of the pages already written in the output of a search
+
+    The checkpoint is ignored if it does not exist, if it was written for
+    other pages (different query, result, display, number of results, etc) or
+    if the output file is shorter than the position of the last page.
+
+    :param checkpoint: path to the checkpoint file
+    :param state: dictionary with the URLs of the pages and the download option
+    :param file: filepath of the output
+
+    :return: list with the position in the output file after each written page
+    """
+    if not os.path.exists(checkpoint):
+        return []
+    with open(checkpoint) as fd:
+        try:
+            content = json.load(fd)
+        except ValueError:
+            return []
+    if content.get("state") != state:
+        return []
+    positions = content.get("positions", [])
+    if len(positions) > 0:
+        if not os.path.exists(file) or os.path.getsize(file) < positions[-1]:
+            return []
+    return positions
+
+
+def save_search_checkpoint(checkpoint, state, positions):
+    """Write atomically the positions of the pages written in the output of a search
+
+    :param checkpoint: path to the checkpoint file
+    :param state: dictionary with the URLs of the pages and the download option
+    :param positions: list with the position in the output file after each written page
+    """
+    tmp_checkpoint = checkpoint + ".tmp"
+    with open(tmp_checkpoint, "w") as fd:
+        json.dump({"state": state, "positions": positions}, fd)
+    os.replace(tmp_checkpoint, checkpoint)
+
+
+def write_search_page(output, page, download, compresslevel):
+    """Write a page of results at the end of a file
+
+    With the gzip download option, the page is written as a separate gzip
+    member (a file with several members is a valid gzip file)
+
+    :param output: binary file object
+    :param page: bytes or binary file object with the content of the page
+    :param download: download option (gzip to compress the page)
+    :param compresslevel: gzip compression level (used only with gzip download option)
+    """
+    if download == "gzip":
+        output = gzip.GzipFile(
+            fileobj=output, mode="wb", compresslevel=compresslevel)
+    if isinstance(page, bytes):
+        output.write(page)
+    else:
+        with page:
+            shutil.copyfileobj(page, output, bufferSize)
+    if download == "gzip":
+        output.close()
+
+
+def write_search_pages_with_checkpoint(
+    urls, file, download, compresslevel, client, max_workers, checkpoint
+):
+    """Write the content of search pages in a file and record the progress in a checkpoint
+
+    After each page, the position in the output file is saved in the
+    checkpoint file. If the checkpoint matches the pages, the pages already
+    written are skipped: the output is truncated after the last complete page
+    and the next pages are appended. The checkpoint is removed once all pages
+    are written.
+
+    :param urls: list of URLs to the pages of results
+    :param file: filepath to save the results
+    :param download: download option (gzip to compress each page)
+    :param compresslevel: gzip compression level (used only with gzip download option)
+    :param client: Client object used to send the requests
+    :param max_workers: number of pages requested at the same time
+    :param checkpoint: path to the checkpoint file
+    """
+    state = {"urls": urls, "download": download}
+    positions = load_search_checkpoint(checkpoint, state, file)
+    position = positions[-1] if len(positions) > 0 else 0
+    remaining_urls = urls[len(positions):]
+    if max_workers is None or max_workers <= 1:
+        pages = (client.open(url) for url in remaining_urls)
+    else:
+        fetch = functools.partial(client.fetch, store=False)
+        pages = ordered_map(fetch, remaining_urls, max_workers)
+    with open(file, "r+b" if len(positions) > 0 else "wb") as output:
+        output.truncate(position)
+        output.seek(position)
+        for page in pages:
+            write_search_page(output, page, download, compresslevel)
+            output.flush()
+            os.fsync(output.fileno())
+            positions.append(output.tell())
+            save_search_checkpoint(checkpoint, state, positions)
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
 
 
 def search_all_data(
-    free_text_search, query, result, display, download=None, file=None
+    free_text_search, query, result, display, download=None, file=None,
+    client=None, max_workers=maxWorkers, compresslevel=6, light=False,
+    checkpoint=None, split=False, validate=True
 ):
     """Search ENA data and get all results (not size limited)
 
@@ -623,7 +2086,18 @@ def search_all_data(
 
     - Extracts the number of possible results for the query
     - Extracts the all the results of the query (by potentially running several
-      times the search function)
+      times the search function, concurrently on <max_workers> threads)
+
+    If a file is given, the pages are written to the file (and compressed on
+    the fly with the gzip download option) as they are received, without
+    keeping all the results in memory. With a checkpoint file, the progress is
+    recorded after each page and a new call with the same parameters resumes
+    after the last complete page (see write_search_pages_with_checkpoint).
+
+    With the split option, the query is split into sub-queries on the dates
+    of a date filter field, each with at most <lengthLimit> results (see
+    enasearch.split.split_query), which are requested concurrently without
+    deep offsets. The results are then in the order of the dates.
 
     :param free_text_search: boolean to describe the type of query
     :param query: query string, made up of filtering conditions, joined by logical ANDs, ORs and NOTs and bound by double quotes
@@ -631,6 +2105,13 @@ def search_all_data(
     :param display: display option to specify the display format
     :param download: download option to specify that records are to be saved in a file (used with file option)
     :param file: filepath to save the content of the search (used with download option)
+    :param client: Client object used to send the requests (default client if None)
+    :param max_workers: number of pages of results requested at the same time
+    :param compresslevel: gzip compression level of the file (used only with gzip download option)
+    :param light: boolean to return light Record objects (see enasearch.records) instead of SeqRecord objects
+    :param checkpoint: path to a checkpoint file to resume an interrupted search (used only with file option)
+    :param split: boolean to split the query into sub-queries of at most <lengthLimit> results instead of requesting pages with offsets (not for free text queries)
+    :param validate: boolean to check the fields, operators, values and functions of the query against the descriptors before any request (otherwise only its syntax is checked, e.g. for fields more recent than the descriptors)
 
     :return: all results of the request in a format defined in the parameters
     """
@@ -638,70 +2119,83 @@ def search_all_data(
         err_str = "This function is not possible for this display option"
         raise ValueError(err_str)
 
+    if checkpoint is not None and file is None:
+        err_str = "A checkpoint can be used only when the results are saved"
+        err_str += " in a file"
+        raise ValueError(err_str)
+
     if download is not None or file is not None:
         check_download_file_options(download, file)
 
-    result_nb = get_search_result_number(free_text_search, query, result)
-    quotient = int(result_nb / float(lengthLimit))
-    start = 0
-    all_results = []
-    for i in range(quotient):
-        start = lengthLimit * i
-        all_results += search_data(
-            free_text_search=free_text_search,
-            query=query,
-            result=result,
-            display=display,
-            offset=start,
-            length=lengthLimit,
-            fields=None,
-            sortfields=None)
-    if (result_nb % lengthLimit) > 0:
-        if quotient > 0:
-            start = lengthLimit * quotient
-            remainder = result_nb - start
+    if split and free_text_search:
+        err_str = "A free text query can not be split"
+        raise ValueError(err_str)
+
+    query = compile_search_query(free_text_search, query, result, validate)
+    client = get_client(client)
+    result_nb = get_search_result_number(
+        free_text_search, query, result, client=client)
+    if split:
+        from enasearch.split import split_query
+        parts = split_query(
+            query, result, result_nb=result_nb, client=client,
+            max_workers=max_workers, validate=validate)
+    else:
+        parts = [(query, result_nb)]
+    windows = [
+        (part_query, part_nb, offset, length)
+        for part_query, part_nb in parts
+        for offset, length in get_search_windows(part_nb)]
+
+    if file:
+        urls = []
+        for part_query, part_nb, offset, length in windows:
+            urls.append(build_search_url(
+                free_text_search=free_text_search,
+                query=part_query,
+                result=result,
+                display=display,
+                offset=offset,
+                length=length))
+        if checkpoint is not None:
+            write_search_pages_with_checkpoint(
+                urls, file, download, compresslevel, client, max_workers,
+                checkpoint)
         else:
-            start = None
-            remainder = None
-        all_results += search_data(
+            write_search_pages(
+                urls, file, download, compresslevel, client, max_workers)
+        return
+
+    def search_window(window):
+        part_query, part_nb, offset, length = window
+        return search_data(
             free_text_search=free_text_search,
-            query=query,
+            query=part_query,
             result=result,
             display=display,
-            offset=start,
-            length=remainder,
+            offset=offset,
+            length=length,
             fields=None,
-            sortfields=None)
-    if file:
-        if display in ['fasta', 'fastq']:
-            SeqIO.write(all_results, file, display)
-            if download == "gzip":
-                with open(file, "r") as fd:
-                    all_results = fd.read()
-                with gzip.open(file, 'wb') as fd:
-                    fd.write(all_results)
-        elif download == "gzip":
-            with gzip.open(file, 'wb') as fd:
-                fd.write(all_results)
-        else:
-            with open(file, "w") as fd:
-                fd.write(all_results)
-    else:
-        return all_results
+            sortfields=None,
+            client=client,
+            result_nb=part_nb,
+            light=light,
+            validate=validate)
 
+    all_results = []
+    for page in ordered_map(search_window, windows, max_workers):
+        all_results += page
+    return all_results
 
-def retrieve_filereport(accession, result, fields=None, file=None):
-    """Retrieve a file (run or analysis) report
 
-    This function builds an URL to retrieve file (run or analysis) report from
-    ENA and return the result of the request.
+def build_filereport_url(accession, result, fields=None):
+    """Build the URL to retrieve a file (run or analysis) report
 
     :param accession: accession id
     :param result: read_run for a run report or analysis for an analysis report
     :param fields: comma-separated list of fields to have in the report
-    :param file: filepath to save the content of the report
 
-    :return: requested file report
+    :return: a string with the build URL
     """
     url = baseUrl + "data/warehouse/filereport?"
     url += "accession=%s" % (accession)
@@ -717,16 +2211,48 @@ def retrieve_filereport(accession, result, fields=None, file=None):
     else:
         check_returnable_fields(fields.split(","), result)
     url += "&fields=%s" % (fields)
+    return url
 
-    return request_url(url, "text", file)
 
+def retrieve_filereport(
+    accession, result, fields=None, file=None, client=None, raw=False,
+    columnar=False
+):
+    """Retrieve a file (run or analysis) report
 
-def retrieve_run_report(accession, fields=None, file=None):
+    This function builds an URL to retrieve file (run or analysis) report from
+    ENA and return the result of the request.
+
+    :param accession: accession id
+    :param result: read_run for a run report or analysis for an analysis report
+    :param fields: comma-separated list of fields to have in the report
+    :param file: filepath to save the content of the report
+    :param client: Client object used to send the requests (default client if None)
+    :param raw: boolean to return the content as bytes, without decoding nor parsing it
+    :param columnar: boolean to return the report as a dictionary of typed columns (see enasearch.table.parse_report)
+
+    :return: requested file report
+    """
+    if columnar:
+        check_columnar_options(file, False, raw)
+    url = build_filereport_url(accession, result, fields)
+    if columnar:
+        from enasearch.table import parse_report
+        return parse_report(request_url(url, "text", client=client, raw=True), result)
+    return request_url(url, "text", file, client, raw=raw)
+
+
+def retrieve_run_report(
+    accession, fields=None, file=None, client=None, raw=False, columnar=False
+):
     """Retrieve run report from ENA
 
     :param accession: accession id
     :param fields: comma-separated list of fields to have in the report (accessible with get_returnable_fields with result=read_run)
     :param file: filepath to save the content of the report
+    :param client: Client object used to send the requests (default client if None)
+    :param raw: boolean to return the content as bytes, without decoding nor parsing it
+    :param columnar: boolean to return the report as a dictionary of typed columns (see enasearch.table.parse_report)
 
     :return: requested run report
     """
@@ -734,15 +2260,23 @@ def retrieve_run_report(accession, fields=None, file=None):
         accession=accession,
         result="read_run",
         fields=fields,
-        file=file)
+        file=file,
+        client=client,
+        raw=raw,
+        columnar=columnar)
 
 
-def retrieve_analysis_report(accession, fields=None, file=None):
+def retrieve_analysis_report(
+    accession, fields=None, file=None, client=None, raw=False, columnar=False
+):
     """Retrieve analysis report from ENA
 
     :param accession: accession id
     :param fields: comma-separated list of fields to have in the report (accessible with get_returnable_fields with result=analysis)
     :param file: filepath to save the content of the report
+    :param client: Client object used to send the requests (default client if None)
+    :param raw: boolean to return the content as bytes, without decoding nor parsing it
+    :param columnar: boolean to return the report as a dictionary of typed columns (see enasearch.table.parse_report)
 
     :return: requested run repor
     """
@@ -750,4 +2284,174 @@ def retrieve_analysis_report(accession, fields=None, file=None):
         accession=accession,
         result="analysis",
         fields=fields,
-        file=file)
+        file=file,
+        client=client,
+        raw=raw,
+        columnar=columnar)
+
+
+def merge_report_contents(contents):
+    """Merge reports with the same header into one report
+
+    :param contents: iterable of bytes with the reports (header line and rows)
+
+    :return: a generator of bytes (the header line once, then the rows of each report)
+    """
+    header = None
+    for content in contents:
+        if content == b"":
+            continue
+        if not content.endswith(b"\n"):
+            content += b"\n"
+        header_line, sep, rows = content.partition(b"\n")
+        if header is None:
+            header = header_line
+            yield header_line + b"\n"
+        elif header_line != header:
+            err_str = "The reports have different headers: %s and %s" % (
+                header.decode(defaultEncoding, decodeErrors),
+                header_line.decode(defaultEncoding, decodeErrors))
+            raise ValueError(err_str)
+        if rows != b"":
+            yield rows
+
+
+def iter_filereport_contents(
+    accessions, result, fields=None, client=None, max_workers=maxWorkers
+):
+    """Retrieve file reports concurrently and iterate over the merged report
+
+    The reports are requested concurrently (at most <max_workers> at the same
+    time, on the connections of the client) and merged in the order of the
+    accessions, with the header line only once (see merge_report_contents).
+
+    :param accessions: comma-separated accessions or iterable of accessions
+    :param result: read_run for run reports or analysis for analysis reports
+    :param fields: comma-separated list of fields to have in the reports
+    :param client: Client object used to send the requests (default client if None)
+    :param max_workers: number of reports requested at the same time
+
+    :return: a generator of bytes (the header line, then the rows of each report)
+    """
+    client = get_client(client)
+    urls = [
+        build_filereport_url(accession, result, fields)
+        for accession in format_ids(accessions)]
+    return merge_report_contents(
+        ordered_map(client.fetch, urls, max_workers))
+
+
+def iter_report_lines(contents, encoding=defaultEncoding):
+    """Iterate over the lines of a report given by chunks of complete lines
+
+    :param contents: iterable of bytes with complete lines
+    :param encoding: encoding of the report
+
+    :return: a generator of strings (lines with their end of line)
+    """
+    for content in contents:
+        for line in content.decode(encoding, decodeErrors).splitlines(True):
+            yield line
+
+
+def retrieve_filereports(
+    accessions, result, fields=None, file=None, client=None,
+    max_workers=maxWorkers, stream=False, raw=False, columnar=False
+):
+    """Retrieve the file (run or analysis) reports of several accessions as one report
+
+    This function retrieves the reports concurrently and merges them, in the
+    order of the accessions, into a single report with one header line (see
+    iter_filereport_contents).
+
+    :param accessions: comma-separated accessions or iterable of accessions
+    :param result: read_run for run reports or analysis for analysis reports
+    :param fields: comma-separated list of fields to have in the report
+    :param file: filepath to save the merged report (written as the reports are received)
+    :param client: Client object used to send the requests (default client if None)
+    :param max_workers: number of reports requested at the same time
+    :param stream: boolean to return the lines of the merged report in a generator
+    :param raw: boolean to return the merged report as bytes
+    :param columnar: boolean to return the merged report as a dictionary of typed columns (see enasearch.table.parse_report)
+
+    :return: None if a file is given or the merged report (string, bytes, generator of lines or dictionary of columns)
+    """
+    if columnar:
+        check_columnar_options(file, stream, raw)
+    if stream and file is not None:
+        err_str = "The report can not be streamed when saved in a file"
+        raise ValueError(err_str)
+    contents = iter_filereport_contents(
+        accessions, result, fields, client, max_workers)
+    if file is not None:
+        with open(file, "wb") as output:
+            for content in contents:
+                output.write(content)
+        return
+    if stream:
+        return iter_report_lines(contents)
+    content = b"".join(contents)
+    if columnar:
+        from enasearch.table import parse_report
+        return parse_report(content, result)
+    if raw:
+        return content
+    return content.decode(defaultEncoding, decodeErrors)
+
+
+def retrieve_run_reports(
+    accessions, fields=None, file=None, client=None, max_workers=maxWorkers,
+    stream=False, raw=False, columnar=False
+):
+    """Retrieve the run reports of several accessions as one report
+
+    :param accessions: comma-separated accessions or iterable of accessions
+    :param fields: comma-separated list of fields to have in the report (accessible with get_returnable_fields with result=read_run)
+    :param file: filepath to save the merged report
+    :param client: Client object used to send the requests (default client if None)
+    :param max_workers: number of reports requested at the same time
+    :param stream: boolean to return the lines of the merged report in a generator
+    :param raw: boolean to return the merged report as bytes
+    :param columnar: boolean to return the merged report as a dictionary of typed columns (see enasearch.table.parse_report)
+
+    :return: merged run report
+    """
+    return retrieve_filereports(
+        accessions=accessions,
+        result="read_run",
+        fields=fields,
+        file=file,
+        client=client,
+        max_workers=max_workers,
+        stream=stream,
+        raw=raw,
+        columnar=columnar)
+
+
+def retrieve_analysis_reports(
+    accessions, fields=None, file=None, client=None, max_workers=maxWorkers,
+    stream=False, raw=False, columnar=False
+):
+    """Retrieve the analysis reports of several accessions as one report
+
+    :param accessions: comma-separated accessions or iterable of accessions
+    :param fields: comma-separated list of fields to have in the report (accessible with get_returnable_fields with result=analysis)
+    :param file: filepath to save the merged report
+    :param client: Client object used to send the requests (default client if None)
+    :param max_workers: number of reports requested at the same time
+    :param stream: boolean to return the lines of the merged report in a generator
+    :param raw: boolean to return the merged report as bytes
+    :param columnar: boolean to return the merged report as a dictionary of typed columns (see enasearch.table.parse_report)
+
+    :return: merged analysis report
+    """
+    return retrieve_filereports(
+        accessions=accessions,
+        result="analysis",
+        fields=fields,
+        file=file,
+        client=client,
+        max_workers=max_workers,
+        stream=stream,
+        raw=raw,
+        columnar=columnar)
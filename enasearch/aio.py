@@ -0,0 +1,539 @@
+#!/usr/bin/env python
+
+import asyncio
+from collections import deque
+import functools
+import os
+import weakref
+
+import aiohttp
+
+import enasearch
+
+
+async def run_blocking(function, *args, **kwargs):
+    """Run a blocking function (file or cache access, parsing) in the default executor of the running loop
+
+    :param function: function to run
+    :param args: positional arguments of the function
+    :param kwargs: keyword arguments of the function
+
+    :return: the value returned by the function
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None, functools.partial(function, *args, **kwargs))
+
+
+class Client(object):
+    """Asynchronous HTTP client used to send the requests to ENA
+
+    The client wraps an aiohttp session (created at the first request, inside
+    the running event loop) and a semaphore bounding the number of requests in
+    flight, so that thousands of coroutines can be started at once without
+    opening thousands of connections.
+
+    :param max_concurrency: maximum number of requests in flight
+    :param limit: maximum number of connections in the pool
+    :param limit_per_host: maximum number of connections per host
+    :param keep_alive: boolean to keep the connections alive between requests
+    :param headers: dictionary with default headers to add to each request
+    :param timeout: total timeout (in seconds) of the requests
+    :param cache: enasearch.cache.DiskCache object to keep the responses on disk (no cache if None)
+    """
+    def __init__(
+        self, max_concurrency=100, limit=100, limit_per_host=10,
+        keep_alive=True, headers=None, timeout=None, cache=None
+    ):
+        self.max_concurrency = max_concurrency
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keep_alive = keep_alive
+        self.headers = headers
+        self.timeout = timeout
+        self.cache = cache
+        self.session = None
+        self.semaphore = None
+
+    def get_session(self):
+        """Return the aiohttp session of the client (created if needed)
+
+        :return: an aiohttp ClientSession object
+        """
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                force_close=not self.keep_alive)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self.session
+
+    async def get_content(self, url, headers=None, store=True):
+        """Send a GET request and return the content of the response
+
+        The content is taken from the cache if the client has one and the
+        response is in it, and stored in the cache otherwise
+
+        :param url: URL to request
+        :param headers: dictionary with extra headers for this request
+        :param store: boolean to store the response in the cache (False for the contents saved in a file)
+
+        :return: bytes with the content of the response
+        """
+        if self.cache is not None:
+            content = await run_blocking(self.cache.get, url)
+            if content is not None:
+                return content
+        session = self.get_session()
+        async with self.semaphore:
+            async with session.get(url, headers=headers) as r:
+                r.raise_for_status()
+                content = await r.read()
+        if self.cache is not None and store:
+            await run_blocking(self.cache.set, url, content)
+        return content
+
+    async def get_text(self, url, headers=None):
+        """Send a GET request and return the decoded content of the response
+
+        :param url: URL to request
+        :param headers: dictionary with extra headers for this request
+
+        :return: a string with the content of the response
+        """
+        content = await self.get_content(url, headers)
+        return content.decode(
+            enasearch.defaultEncoding, enasearch.decodeErrors)
+
+    async def get_content_length(self, url):
+        """Return the size of the content of an URL given by a HEAD request
+
+        :param url: URL to request
+
+        :return: an integer or None if the server does not give it
+        """
+        session = self.get_session()
+        async with self.semaphore:
+            async with session.head(
+                url,
+                headers={"Accept-Encoding": "identity"},
+                allow_redirects=True
+            ) as r:
+                if r.status != 200 or "Content-Length" not in r.headers:
+                    return None
+                return int(r.headers["Content-Length"])
+
+    async def download(self, url, file, chunk_size=65536, resume=True):
+        """Send a GET request and save the content of the response in a file
+
+        Asynchronous version of enasearch.Client.download: the content is not
+        stored in the cache, it is written to <file>.part (renamed to <file>
+        once complete) and an interrupted download is resumed with a Range
+        header when the server supports it. The file is written in the
+        default executor of the loop.
+
+        :param url: URL to request
+        :param file: filepath to save the content
+        :param chunk_size: size of the chunks read from the response
+        :param resume: boolean to skip complete files and resume the partial downloads
+        """
+        part = file + ".part"
+        if resume and os.path.exists(file):
+            if await self.get_content_length(url) == os.path.getsize(file):
+                return
+        start = 0
+        if resume and os.path.exists(part):
+            start = os.path.getsize(part)
+        headers = {"Accept-Encoding": "identity"}
+        if start > 0:
+            headers["Range"] = "bytes=%s-" % start
+        session = self.get_session()
+        async with self.semaphore:
+            r = await session.get(url, headers=headers)
+            try:
+                if start > 0 and r.status == 416:
+                    content_range = r.headers.get("Content-Range")
+                    if enasearch.get_range_total(content_range) == start:
+                        await run_blocking(os.replace, part, file)
+                        return
+                    start = 0
+                    r.release()
+                    r = await session.get(url, headers={
+                        "Accept-Encoding": "identity"})
+                r.raise_for_status()
+                mode = "wb"
+                if r.status == 206:
+                    content_range = r.headers.get("Content-Range")
+                    if enasearch.get_range_start(content_range) != start:
+                        err_str = "Unexpected range in the response to %s" % (
+                            url)
+                        raise IOError(err_str)
+                    mode = "ab"
+                fd = await run_blocking(open, part, mode)
+                try:
+                    async for chunk in r.content.iter_chunked(chunk_size):
+                        await run_blocking(fd.write, chunk)
+                finally:
+                    await run_blocking(fd.close)
+            finally:
+                r.release()
+        await run_blocking(os.replace, part, file)
+
+    async def close(self):
+        """Close the connections of the client"""
+        if self.session is not None:
+            await self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+
+default_clients = weakref.WeakKeyDictionary()
+
+
+async def aclose():
+    """Close the session of the default client of the running event loop
+
+    The default client is removed, so a new one is created at the next request
+    """
+    loop = asyncio.get_running_loop()
+    client = default_clients.pop(loop, None)
+    if client is not None:
+        await client.close()
+
+
+def get_client(client=None):
+    """Return the client to use for a request
+
+    A default client is created for each event loop
+
+    :param client: Client object or None to use the default client
+
+    :return: a Client object
+    """
+    if client is not None:
+        return client
+    loop = asyncio.get_running_loop()
+    if loop not in default_clients:
+        default_clients[loop] = Client()
+    return default_clients[loop]
+
+
+async def request_url(
+    url, display, file=None, client=None, raw=False,
+    encoding=enasearch.defaultEncoding, light=False
+):
+    """Run the URL request and return content or status
+
+    Asynchronous version of enasearch.request_url
+
+    :param url: URL to request on ENA
+    :param display: display option
+    :param file: filepath to save the content of the search
+    :param client: Client object used to send the request (default client if None)
+    :param raw: boolean to return the content as bytes, without decoding nor parsing it
+    :param encoding: encoding of the content
+    :param light: boolean to return light Record objects (see enasearch.records) instead of SeqRecord objects for fasta and fastq
+
+    :return: None if a file is given or the result of the request (in different format)
+    """
+    client = get_client(client)
+    if file is not None:
+        await client.download(url, file)
+    else:
+        content = await client.get_content(url)
+        if raw:
+            return content
+        return await run_blocking(
+            enasearch.format_content, content, display, encoding, light)
+
+
+async def retrieve_data(
+    ids, display, download=None, file=None, offset=None, length=None,
+    subseq_range=None, expanded=False, header=False, client=None,
+    light=False, raw=False
+):
+    """Retrieve ENA data (other than taxon)
+
+    Asynchronous version of enasearch.retrieve_data
+
+    :param ids: comma-separated identifiers for records other than Taxon
+    :param display: display option to specify the display format (accessible with get_display_options)
+    :param offset: first record to get
+    :param length: number of records to retrieve
+    :param download: download option to specify that records are to be saved in a file (used with file option, accessible with get_download_options)
+    :param file: filepath to save the content of the search (used with download option)
+    :param subseq_range: range for subsequences (limit separated by a -)
+    :param expanded: boolean to determine if a CON record is expanded
+    :param header: boolean to obtain only the header of a record
+    :param client: Client object used to send the requests (default client if None)
+    :param light: boolean to return light Record objects (see enasearch.records) instead of SeqRecord objects for fasta and fastq
+    :param raw: boolean to return the content as bytes, without decoding nor parsing it
+
+    :return: data corresponding to the requested ids and formatted given the parameters
+    """
+    url = enasearch.build_retrieve_url(
+        ids=ids,
+        display=display,
+        result=None,
+        download=download,
+        file=file,
+        offset=offset,
+        length=length,
+        subseq_range=subseq_range,
+        expanded=expanded,
+        header=header)
+    return await request_url(
+        url, display, file, client, raw=raw, light=light)
+
+
+async def retrieve_taxons(
+    ids, display, result=None, download=None, file=None, offset=None,
+    length=None, subseq_range=None, expanded=False, header=False, client=None,
+    raw=False, light=False
+):
+    """Retrieve data from the ENA Taxon Portal
+
+    Asynchronous version of enasearch.retrieve_taxons
+
+    :param ids: comma-separated taxon identifiers
+    :param display: display option to specify the display format (accessible with get_display_options)
+    :param result: taxonomy result to display (accessible with result)
+    :param offset: first record to get
+    :param length: number of records to retrieve
+    :param download: download option to specify that records are to be saved in a file (used with file option, accessible with get_download_options)
+    :param file: filepath to save the content of the search (used with download option)
+    :param subseq_range: range for subsequences (limit separated by a -)
+    :param expanded: boolean to determine if a CON record is expanded
+    :param header: boolean to obtain only the header of a record
+    :param client: Client object used to send the requests (default client if None)
+    :param raw: boolean to return the content as bytes, without decoding nor parsing it
+    :param light: boolean to return light Record objects (see enasearch.records) instead of SeqRecord objects for fasta and fastq
+
+    :return: data corresponding to the requested ids and formatted given the parameters
+    """
+    if result is not None:
+        enasearch.check_taxonomy_result(result)
+    url = enasearch.build_retrieve_url(
+        ids=enasearch.format_taxon_ids(ids),
+        display=display,
+        result=result,
+        download=download,
+        file=file,
+        offset=offset,
+        length=length,
+        subseq_range=subseq_range,
+        expanded=expanded,
+        header=header)
+    return await request_url(
+        url, display, file, client, raw=raw, light=light)
+
+
+async def get_search_result_number(
+    free_text_search, query, result, need_check_result=True, client=None,
+    use_memoized=True
+):
+    """Get the number of results for a query on a result
+
+    Asynchronous version of enasearch.get_search_result_number
+
+    :param free_text_search: boolean to describe the type of query
+    :param query: query string, made up of filtering conditions, joined by logical ANDs, ORs and NOTs and bound by double quotes
+    :param result: id of the result (partition of ENA db), accessible with get_results
+    :param need_check_result: boolean to check the result id before the request
+    :param client: Client object used to send the requests (default client if None)
+    :param use_memoized: boolean to reuse the number of results if it was requested less than <resultNumberTTL> seconds ago
+
+    :return: an integer corresponding to the number of results of a query on ENA
+    """
+    url = enasearch.build_search_result_number_url(
+        free_text_search, query, result, need_check_result)
+    if use_memoized:
+        result_nb = enasearch.get_memoized_search_result_number(
+            free_text_search, query, result)
+        if result_nb is not None:
+            return result_nb
+    content = await get_client(client).get_text(
+        url,
+        headers={"accept": "application/json"})
+    result_nb = enasearch.parse_search_result_number(content)
+    enasearch.memoize_search_result_number(
+        free_text_search, query, result, result_nb)
+    return result_nb
+
+
+async def search_data(
+    free_text_search, query, result, display, offset=None, length=None,
+    download=None, file=None, fields=None, sortfields=None, client=None,
+    result_nb=None, light=False, validate=True, raw=False
+):
+    """Search ENA data
+
+    Asynchronous version of enasearch.search_data
+
+    :param free_text_search: boolean to describe the type of query
+    :param query: query string, made up of filtering conditions, joined by logical ANDs, ORs and NOTs and bound by double quotes
+    :param result: id of the result (partition of ENA db), accessible with get_results
+    :param display: display option to specify the display format (accessible with get_display_options)
+    :param offset: first record to get
+    :param length: number of records to retrieve
+    :param download: download option to specify that records are to be saved in a file (used with file option)
+    :param file: filepath to save the content of the search (used with download option)
+    :param fields: comma-separated list of fields to return (only if display=report)
+    :param sortfields: comma-separated list of fields to sort the results (only if display=report)
+    :param client: Client object used to send the requests (default client if None)
+    :param result_nb: number of results for the query if already known (to check the offset without requesting it)
+    :param light: boolean to return light Record objects (see enasearch.records) instead of SeqRecord objects for fasta and fastq
+    :param validate: boolean to check the fields, operators, values and functions of the query against the descriptors before any request (otherwise only its syntax is checked, e.g. for fields more recent than the descriptors)
+    :param raw: boolean to return the content as bytes, without decoding nor parsing it
+
+    :return: results of the request in a format defined in the parameters
+    """
+    query = enasearch.compile_search_query(
+        free_text_search, query, result, validate)
+    url = enasearch.build_search_url(
+        free_text_search=free_text_search,
+        query=query,
+        result=result,
+        display=display,
+        offset=offset,
+        length=length,
+        download=download,
+        file=file,
+        fields=fields,
+        sortfields=sortfields)
+    if offset is not None:
+        if result_nb is None:
+            result_nb = await get_search_result_number(
+                free_text_search, query, result, client=client)
+        enasearch.check_offset(offset, result_nb)
+    return await request_url(
+        url, display, file, client, raw=raw, light=light)
+
+
+async def ordered_map(function, items, max_workers=enasearch.maxWorkers):
+    """Apply a coroutine function on items concurrently and yield the results in order
+
+    Asynchronous version of enasearch.ordered_map: at most <max_workers> items
+    are processed at the same time and the results are yielded in the order
+    of the items as soon as they are available, so that at most
+    <max_workers> results are kept in memory.
+
+    :param function: coroutine function to apply on each item
+    :param items: iterable with the items
+    :param max_workers: number of items processed at the same time
+
+    :return: an asynchronous generator with the results of the function on the items
+    """
+    if max_workers is None or max_workers < 1:
+        max_workers = 1
+    tasks = deque()
+    try:
+        for item in items:
+            if len(tasks) >= max_workers:
+                yield await tasks.popleft()
+            tasks.append(asyncio.ensure_future(function(item)))
+        while tasks:
+            yield await tasks.popleft()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def search_all_data(
+    free_text_search, query, result, display, download=None, file=None,
+    client=None, compresslevel=6, light=False, validate=True,
+    max_workers=enasearch.maxWorkers
+):
+    """Search ENA data and get all results (not size limited)
+
+    Asynchronous version of enasearch.search_all_data: the pages of results
+    are requested concurrently (at most <max_workers> pages in flight, within
+    the limits of the client) and, if a file is given, written in order as
+    they are received
+
+    :param free_text_search: boolean to describe the type of query
+    :param query: query string, made up of filtering conditions, joined by logical ANDs, ORs and NOTs and bound by double quotes
+    :param result: id of the result (partition of ENA db), accessible with get_results
+    :param display: display option to specify the display format
+    :param download: download option to specify that records are to be saved in a file (used with file option)
+    :param file: filepath to save the content of the search (used with download option)
+    :param client: Client object used to send the requests (default client if None)
+    :param compresslevel: gzip compression level of the file (used only with gzip download option)
+    :param light: boolean to return light Record objects (see enasearch.records) instead of SeqRecord objects
+    :param validate: boolean to check the fields, operators, values and functions of the query against the descriptors before any request (otherwise only its syntax is checked, e.g. for fields more recent than the descriptors)
+    :param max_workers: number of pages of results requested at the same time
+
+    :return: all results of the request in a format defined in the parameters
+    """
+    if display not in ["fasta", "fastq"]:
+        err_str = "This function is not possible for this display option"
+        raise ValueError(err_str)
+
+    if download is not None or file is not None:
+        enasearch.check_download_file_options(download, file)
+
+    query = enasearch.compile_search_query(
+        free_text_search, query, result, validate)
+    client = get_client(client)
+    result_nb = await get_search_result_number(
+        free_text_search, query, result, client=client)
+    urls = []
+    for offset, length in enasearch.get_search_windows(result_nb):
+        urls.append(enasearch.build_search_url(
+            free_text_search=free_text_search,
+            query=query,
+            result=result,
+            display=display,
+            offset=offset,
+            length=length))
+    get_content = client.get_content
+    if file:
+        get_content = functools.partial(client.get_content, store=False)
+    pages = ordered_map(get_content, urls, max_workers)
+
+    if file:
+        try:
+            output = await run_blocking(
+                enasearch.open_search_output, file, download, compresslevel)
+            try:
+                async for content in pages:
+                    await run_blocking(output.write, content)
+            finally:
+                await run_blocking(output.close)
+        finally:
+            await pages.aclose()
+        return
+
+    all_results = []
+    async for content in pages:
+        all_results += await run_blocking(
+            enasearch.format_content, content, display, light=light)
+    return all_results
+
+
+async def retrieve_filereport(
+    accession, result, fields=None, file=None, client=None, raw=False
+):
+    """Retrieve a file (run or analysis) report
+
+    Asynchronous version of enasearch.retrieve_filereport
+
+    :param accession: accession id
+    :param result: read_run for a run report or analysis for an analysis report
+    :param fields: comma-separated list of fields to have in the report
+    :param file: filepath to save the content of the report
+    :param client: Client object used to send the requests (default client if None)
+    :param raw: boolean to return the report as bytes
+
+    :return: requested file report
+    """
+    url = enasearch.build_filereport_url(accession, result, fields)
+    return await request_url(url, "text", file, client, raw=raw)
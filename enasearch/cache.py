@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+
+defaultTTL = {
+    "view": 7 * 24 * 3600,
+    "search": 24 * 3600,
+    "filereport": 24 * 3600,
+    "resultcount": 3600,
+    "other": 24 * 3600,
+}
+defaultMaxBytes = 1024 ** 3
+
+
+def normalize_url(url):
+    """Normalize an URL to use it as a cache key
+
+    The scheme and host are lower-cased and the parameters (after ? or & in
+    the URL) are sorted, so that two URLs with the same parameters in a
+    different order correspond to the same key
+
+    :param url: URL to normalize
+
+    :return: a string with the normalized URL
+    """
+    scheme, sep, rest = url.partition("://")
+    if not sep:
+        scheme, rest = "", url
+    host, sep, path = rest.partition("/")
+    tokens = path.replace("?", "&").split("&")
+    params = sorted([token for token in tokens[1:] if token != ""])
+    normalized = "%s://%s/%s" % (scheme.lower(), host.lower(), tokens[0])
+    if len(params) > 0:
+        normalized += "?" + "&".join(params)
+    return normalized
+
+
+def get_endpoint_type(url):
+    """Return the type of ENA endpoint targeted by an URL
+
+    :param url: URL to a ENA endpoint
+
+    :return: view, search, filereport, resultcount or other
+    """
+    normalized = normalize_url(url)
+    path, sep, params = normalized.partition("?")
+    if "resultcount" in params.split("&"):
+        return "resultcount"
+    if "/data/view/" in path:
+        return "view"
+    if path.endswith("/filereport"):
+        return "filereport"
+    if path.endswith("/search"):
+        return "search"
+    return "other"
+
+
+class DiskCache(object):
+    """Cache of the content of ENA responses on disk
+
+    Each response is stored compressed in a file named after the hash of its
+    normalized URL. The entries expire after a time depending on the type of
+    endpoint and the least recently used entries are removed when the total
+    size of the cache is above <max_bytes>. The files are written to a
+    temporary file and then renamed, so several processes can share the same
+    cache directory.
+
+    :param directory: path to the directory of the cache (created if needed)
+    :param max_bytes: maximum total size (in bytes) of the compressed entries
+    :param ttl: dictionary with the time to live (in seconds) of the entries for each type of endpoint (view, search, filereport, resultcount, other)
+    :param compresslevel: gzip compression level of the entries
+    """
+    def __init__(
+        self, directory, max_bytes=defaultMaxBytes, ttl=None, compresslevel=6
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = dict(defaultTTL)
+        if ttl is not None:
+            self.ttl.update(ttl)
+        self.compresslevel = compresslevel
+        self.size = None
+        self.lock = threading.Lock()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def get_path(self, url):
+        """Return the path to the file storing the entry for an URL
+
+        :param url: URL of the entry
+
+        :return: path to the file of the entry
+        """
+        key = hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key[:2], key + ".gz")
+
+    def is_expired(self, url, path):
+        """Check if the entry for an URL is older than its time to live
+
+        :param url: URL of the entry
+        :param path: path to the file of the entry
+
+        :return: boolean
+        """
+        ttl = self.ttl[get_endpoint_type(url)]
+        return time.time() - os.path.getmtime(path) > ttl
+
+    def open(self, url):
+        """Open the entry for an URL
+
+        The access time of the entry is updated (for the LRU eviction)
+
+        :param url: URL of the entry
+
+        :return: a binary file object with the uncompressed content or None if the entry is missing or expired
+        """
+        path = self.get_path(url)
+        try:
+            if self.is_expired(url, path):
+                return None
+            os.utime(path, (time.time(), os.path.getmtime(path)))
+            return gzip.open(path, "rb")
+        except (IOError, OSError):
+            return None
+
+    def get(self, url):
+        """Return the content of the entry for an URL
+
+        :param url: URL of the entry
+
+        :return: bytes with the content or None if the entry is missing or expired
+        """
+        fd = self.open(url)
+        if fd is None:
+            return None
+        try:
+            with fd:
+                return fd.read()
+        except (IOError, OSError, EOFError):
+            return None
+
+    def get_file(self, url, file):
+        """Copy the content of the entry for an URL in a file
+
+        :param url: URL of the entry
+        :param file: filepath to save the content
+
+        :return: boolean to indicate if the entry was found
+        """
+        fd = self.open(url)
+        if fd is None:
+            return False
+        try:
+            with fd:
+                with open(file, "wb") as output:
+                    shutil.copyfileobj(fd, output)
+        except (IOError, OSError, EOFError):
+            return False
+        return True
+
+    def write_entry(self, url, write):
+        """Write atomically the entry for an URL
+
+        :param url: URL of the entry
+        :param write: function writing the content in a binary file object
+        """
+        path = self.get_path(url)
+        subdir = os.path.dirname(path)
+        if not os.path.isdir(subdir):
+            try:
+                os.makedirs(subdir)
+            except OSError:
+                if not os.path.isdir(subdir):
+                    raise
+        fd, tmp_path = tempfile.mkstemp(dir=subdir, suffix=".tmp")
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+        try:
+            with os.fdopen(fd, "wb") as raw:
+                with gzip.GzipFile(
+                    fileobj=raw, mode="wb", compresslevel=self.compresslevel
+                ) as output:
+                    write(output)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self.add_size(os.path.getsize(path) - old_size)
+
+    def set(self, url, content):
+        """Store the content of the response for an URL
+
+        :param url: URL of the entry
+        :param content: bytes with the content
+        """
+        self.write_entry(url, lambda output: output.write(content))
+
+    def set_file(self, url, file):
+        """Store the content of a file as the response for an URL
+
+        :param url: URL of the entry
+        :param file: filepath with the content
+        """
+        def write(output):
+            with open(file, "rb") as fd:
+                shutil.copyfileobj(fd, output)
+        self.write_entry(url, write)
+
+    def get_entries(self):
+        """Return the entries of the cache
+
+        :return: list of (access time, size, path) tuples
+        """
+        entries = []
+        for root, dirs, files in os.walk(self.directory):
+            for filename in files:
+                if not filename.endswith(".gz"):
+                    continue
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_atime, stat.st_size, path))
+        return entries
+
+    def add_size(self, size):
+        """Update the total size of the cache and evict entries if needed
+
+        :param size: size of a new entry (minus the size of the entry it replaces)
+        """
+        with self.lock:
+            if self.size is None:
+                self.size = sum([e[1] for e in self.get_entries()])
+            else:
+                self.size += size
+            if self.size > self.max_bytes:
+                self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the total size of the
+        cache is below <max_bytes>"""
+        entries = sorted(self.get_entries())
+        size = sum([e[1] for e in entries])
+        for atime, entry_size, path in entries:
+            if size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            size -= entry_size
+        self.size = size
+
+    def clear(self):
+        """Remove all the entries of the cache"""
+        with self.lock:
+            for atime, size, path in self.get_entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.size = 0
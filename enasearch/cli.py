@@ -240,10 +240,24 @@ def get_download_options():
     type=click.IntRange(min=0, max=lengthLimit),
     required=False,
     help='Number of records to retrieve (used only for display different of fasta and fastq')
+@click.option(
+    '--max_workers',
+    type=click.IntRange(min=1),
+    default=enasearch.maxWorkers,
+    help='Number of pages of results requested at the same time (used only for fasta and fastq display)')
+@click.option(
+    '--checkpoint',
+    required=False,
+    type=click.Path(dir_okay=False, writable=True),
+    help='Checkpoint file to resume an interrupted search (used only for fasta and fastq display with file option)')
+@click.option(
+    '--split',
+    is_flag=True,
+    help='Split the query on dates into sub-queries instead of requesting pages with offsets (used only for fasta and fastq display, not for free text search)')
 @exception_handler
 def search_data(
     free_text_search, query, result, display, download, file, fields,
-    sortfields, offset, length
+    sortfields, offset, length, max_workers, checkpoint, split
 ):
     """Search data given a query.
 
@@ -269,7 +283,10 @@ def search_data(
             result=result,
             display=display,
             download=download,
-            file=file)
+            file=file,
+            max_workers=max_workers,
+            checkpoint=checkpoint,
+            split=split)
     else:
         results = enasearch.search_data(
             free_text_search=free_text_search,
@@ -451,8 +468,9 @@ def retrieve_taxons(
 @click.command('retrieve_run_report')
 @click.option(
     '--accession',
+    multiple=True,
     required=True,
-    help='Accession id (study accessions (ERP, SRP, DRP, PRJ prefixes), experiment accessions (ERX, SRX, DRX prefixes), sample accessions (ERS, SRS, DRS, SAM prefixes) and run accessions))')
+    help='Accession id (study accessions (ERP, SRP, DRP, PRJ prefixes), experiment accessions (ERX, SRX, DRX prefixes), sample accessions (ERS, SRS, DRS, SAM prefixes) and run accessions)) [multiple or comma-separated]')
 @click.option(
     '--fields',
     multiple=True,
@@ -467,13 +485,16 @@ def retrieve_taxons(
 def retrieve_run_report(accession, fields, file):
     """Retrieve run report from ENA.
 
+    The reports of several accessions are retrieved concurrently and merged
+    into one report (with one header line).
+
     The output can be redirected to a file and directly display to the standard
     output given the display chosen.
     """
     fields = None if not fields else ",".join(fields)
     file = None if not file else file
-    report = enasearch.retrieve_run_report(
-        accession=accession,
+    report = enasearch.retrieve_run_reports(
+        accessions=",".join(accession),
         fields=fields,
         file=file)
     if file is None:
@@ -483,8 +504,9 @@ def retrieve_run_report(accession, fields, file):
 @click.command('retrieve_analysis_report')
 @click.option(
     '--accession',
+    multiple=True,
     required=True,
-    help='Accession id (study accessions (ERP, SRP, DRP, PRJ prefixes), experiment accessions (ERX, SRX, DRX prefixes), sample accessions (ERS, SRS, DRS, SAM prefixes) and run accessions))')
+    help='Accession id (study accessions (ERP, SRP, DRP, PRJ prefixes), experiment accessions (ERX, SRX, DRX prefixes), sample accessions (ERS, SRS, DRS, SAM prefixes) and run accessions)) [multiple or comma-separated]')
 @click.option(
     '--fields',
     multiple=True,
@@ -499,19 +521,65 @@ def retrieve_run_report(accession, fields, file):
 def retrieve_analysis_report(accession, fields, file):
     """Retrieve analysis report from ENA.
 
+    The reports of several accessions are retrieved concurrently and merged
+    into one report (with one header line).
+
     The output can be redirected to a file and directly display to the standard
     output given the display chosen.
     """
     fields = None if not fields else ",".join(fields)
     file = None if not file else file
-    report = enasearch.retrieve_analysis_report(
-        accession=accession,
+    report = enasearch.retrieve_analysis_reports(
+        accessions=",".join(accession),
         fields=fields,
         file=file)
     if file is None:
         print_display(report, 'report')
 
 
+@click.command('download_files')
+@click.option(
+    '--accession',
+    multiple=True,
+    required=True,
+    help='Accession id (study, experiment, sample, run or analysis accessions) [multiple or comma-separated]')
+@click.option(
+    '--directory',
+    required=True,
+    type=click.Path(file_okay=False, writable=True),
+    help='Directory to save the files')
+@click.option(
+    '--file_type',
+    type=click.Choice(['fastq', 'submitted', 'sra']),
+    default='fastq',
+    help='Type of files to download')
+@click.option(
+    '--result',
+    type=click.Choice(['read_run', 'analysis']),
+    default='read_run',
+    help='read_run for the files of runs or analysis for the files of analyses')
+@click.option(
+    '--max_workers',
+    type=click.IntRange(min=1),
+    default=enasearch.maxWorkers,
+    help='Number of files (or segments of files) downloaded at the same time')
+@exception_handler
+def download_files(accession, directory, file_type, result, max_workers):
+    """Download the files listed in run or analysis reports.
+
+    The files already downloaded with the md5 checksum given in the report are
+    skipped. The paths to the files are displayed on the standard output.
+    """
+    from enasearch.download import download_files
+    paths = download_files(
+        accessions=",".join(accession),
+        directory=directory,
+        file_type=file_type,
+        result=result,
+        max_workers=max_workers)
+    print_list(paths)
+
+
 cli.add_command(get_results)
 cli.add_command(get_taxonomy_results)
 cli.add_command(get_filter_fields)
@@ -527,3 +595,4 @@ cli.add_command(retrieve_data)
 cli.add_command(retrieve_taxons)
 cli.add_command(retrieve_run_report)
 cli.add_command(retrieve_analysis_report)
+cli.add_command(download_files)
@@ -0,0 +1,340 @@
+#!/usr/bin/env python
+
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import enasearch
+from enasearch.table import split_report
+
+
+fileTypes = ["fastq", "submitted", "sra"]
+fileScheme = "http://"
+segmentSize = 64 * 1024 * 1024
+
+
+def check_file_type(file_type, result):
+    """Check if a file type can be downloaded for a result
+
+    This function raises an error if the file type is not fastq, submitted or
+    sra or if the files are not returnable fields of the result
+
+    :param file_type: type of files (fastq, submitted or sra)
+    :param result: read_run for the files of runs or analysis for the files of analyses
+    """
+    if file_type not in fileTypes:
+        err_str = "The file type must be one of %s" % ", ".join(fileTypes)
+        raise ValueError(err_str)
+    enasearch.check_returnable_fields(
+        ["%s_ftp" % file_type, "%s_md5" % file_type, "%s_bytes" % file_type],
+        result)
+
+
+def format_accessions(accessions):
+    """Format accessions given as a comma-separated string or a list
+
+    :param accessions: comma-separated string or list of accessions
+
+    :return: a list of accessions
+    """
+    if isinstance(accessions, str):
+        accessions = accessions.split(",")
+    return [accession.strip() for accession in accessions if accession.strip()]
+
+
+def format_file_url(url):
+    """Format an URL given in a report (e.g. ftp.sra.ebi.ac.uk/vol1/...)
+
+    :param url: URL of a file in a report
+
+    :return: the URL prefixed by <fileScheme> if it has no scheme
+    """
+    if "://" in url:
+        return url
+    return fileScheme + url
+
+
+def get_files(accession, file_type="fastq", result="read_run", client=None):
+    """Get the files listed in the file report of an accession
+
+    :param accession: accession id
+    :param file_type: type of files (fastq, submitted or sra)
+    :param result: read_run for the files of runs or analysis for the files of analyses
+    :param client: Client object used to send the requests (default client if None)
+
+    :return: list of dictionaries with the accession, the URL, the md5 and the size (None if not given) of each file
+    """
+    check_file_type(file_type, result)
+    accession_field = "run_accession" if result == "read_run" else "analysis_accession"
+    fields = [
+        accession_field,
+        "%s_ftp" % file_type,
+        "%s_md5" % file_type,
+        "%s_bytes" % file_type]
+    report = enasearch.retrieve_filereport(
+        accession=accession,
+        result=result,
+        fields=",".join(fields),
+        client=client)
+    header, columns = split_report(report)
+    files = []
+    for row in zip(*columns):
+        values = dict(zip(header, row))
+        urls = values.get(fields[1], "").split(";")
+        md5s = values.get(fields[2], "").split(";")
+        sizes = values.get(fields[3], "").split(";")
+        for i, url in enumerate(urls):
+            if url == "":
+                continue
+            md5 = md5s[i] if i < len(md5s) and md5s[i] != "" else None
+            size = sizes[i] if i < len(sizes) and sizes[i] != "" else None
+            files.append({
+                "accession": values.get(accession_field, accession),
+                "url": format_file_url(url),
+                "md5": md5,
+                "bytes": int(size) if size is not None else None})
+    return files
+
+
+def compute_md5(path):
+    """Compute the md5 checksum of a file
+
+    :param path: path to the file
+
+    :return: the hexadecimal md5 checksum
+    """
+    md5 = hashlib.md5()
+    with open(path, "rb") as fd:
+        for chunk in iter(lambda: fd.read(enasearch.bufferSize), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def is_verified(path, md5=None, size=None):
+    """Check if a file was already downloaded and verified
+
+    With a md5 checksum, the file is verified if a <path>.md5 file (written
+    after a successful check) has the same checksum and is newer than the
+    file. Without checksum, only the size of the file is checked.
+
+    :param path: path to the file
+    :param md5: expected md5 checksum
+    :param size: expected size (in bytes)
+
+    :return: boolean
+    """
+    if not os.path.exists(path):
+        return False
+    if size is not None and os.path.getsize(path) != size:
+        return False
+    if md5 is None:
+        return size is not None
+    marker = path + ".md5"
+    if not os.path.exists(marker):
+        return False
+    if os.path.getmtime(marker) < os.path.getmtime(path):
+        return False
+    with open(marker) as fd:
+        return fd.read().strip() == md5
+
+
+def verify_file(path, md5):
+    """Check the md5 checksum of a file and write it to <path>.md5
+
+    The file is removed if its checksum is different from the expected one
+
+    :param path: path to the file
+    :param md5: expected md5 checksum
+    """
+    checksum = compute_md5(path)
+    if checksum != md5:
+        os.remove(path)
+        err_str = "The md5 checksum of %s (%s) is not the expected one (%s)" % (
+            path, checksum, md5)
+        raise ValueError(err_str)
+    with open(path + ".md5", "w") as fd:
+        fd.write(md5 + "\n")
+
+
+def supports_ranges(url, client):
+    """Check if the server of an URL accepts range requests
+
+    :param url: URL of a file
+    :param client: Client object used to send the request
+
+    :return: boolean
+    """
+    r = client.session.head(url, allow_redirects=True, timeout=client.timeout)
+    return r.status_code == 200 and r.headers.get("Accept-Ranges") == "bytes"
+
+
+def download_segment(url, part, start, end, client):
+    """Download a segment of a file with a range request
+
+    :param url: URL of the file
+    :param part: path to the partial file (of the size of the whole file)
+    :param start: first byte of the segment
+    :param end: last byte of the segment
+    :param client: Client object used to send the request
+    """
+    r = client.get(url, stream=True, headers={
+        "Range": "bytes=%s-%s" % (start, end),
+        "Accept-Encoding": "identity"})
+    try:
+        r.raise_for_status()
+        content_range = r.headers.get("Content-Range")
+        if r.status_code != 206 or enasearch.get_range_start(content_range) != start:
+            err_str = "Unexpected range in the response to %s" % url
+            raise IOError(err_str)
+        with open(part, "r+b") as fd:
+            fd.seek(start)
+            for chunk in r.iter_content(chunk_size=enasearch.bufferSize):
+                fd.write(chunk)
+            if fd.tell() != end + 1:
+                err_str = "Incomplete segment %s-%s of %s" % (start, end, url)
+                raise IOError(err_str)
+    finally:
+        r.close()
+
+
+def download_segments(url, path, size, client, executor, segment_size):
+    """Download a file by segments requested concurrently
+
+    The segments are written in <path>.segments.part and the downloaded
+    segments are listed in <path>.segments, so an interrupted download is
+    resumed by downloading only the missing segments. <path>.segments.part is
+    renamed into <path> once all segments are downloaded. The file is not
+    named <path>.part as the one of Client.download: this file has the full
+    size from the start and would be taken for a complete download.
+
+    :param url: URL of the file
+    :param path: path to save the file
+    :param size: size (in bytes) of the file
+    :param client: Client object used to send the requests
+    :param executor: ThreadPoolExecutor object running the segment downloads
+    :param segment_size: size (in bytes) of the segments
+    """
+    segments_file = path + ".segments"
+    part = segments_file + ".part"
+    done = set()
+    if os.path.exists(part) and os.path.exists(segments_file):
+        with open(segments_file) as fd:
+            done = set([int(line) for line in fd if line.strip()])
+    else:
+        with open(part, "wb"):
+            pass
+        with open(segments_file, "w"):
+            pass
+    with open(part, "r+b") as fd:
+        fd.truncate(size)
+    lock = threading.Lock()
+
+    def download(start):
+        end = min(start + segment_size, size) - 1
+        download_segment(url, part, start, end, client)
+        with lock:
+            with open(segments_file, "a") as fd:
+                fd.write("%s\n" % start)
+
+    futures = [
+        executor.submit(download, start)
+        for start in range(0, size, segment_size)
+        if start not in done]
+    for future in futures:
+        future.result()
+    os.replace(part, path)
+    os.remove(segments_file)
+
+
+def download_file(
+    url, path, md5=None, size=None, client=None, executor=None,
+    segment_size=segmentSize
+):
+    """Download a file, check its md5 checksum and skip it if already verified
+
+    Files larger than <segment_size> are downloaded by segments (with range
+    requests sent on <executor>) if the server supports it. Other files are
+    downloaded in one request, which is resumed if interrupted (see
+    Client.download).
+
+    :param url: URL of the file
+    :param path: path to save the file
+    :param md5: expected md5 checksum (no check if None)
+    :param size: size of the file (in bytes)
+    :param client: Client object used to send the requests (default client if None)
+    :param executor: ThreadPoolExecutor object to download the segments (a new one with <maxWorkers> threads if None)
+    :param segment_size: size (in bytes) of the segments
+
+    :return: the path to the file
+    """
+    if is_verified(path, md5, size):
+        return path
+    client = enasearch.get_client(client)
+    if size is None:
+        size = client.get_content_length(url)
+    if size is not None and size > segment_size and supports_ranges(url, client):
+        if executor is None:
+            with ThreadPoolExecutor(enasearch.maxWorkers) as executor:
+                download_segments(
+                    url, path, size, client, executor, segment_size)
+        else:
+            download_segments(url, path, size, client, executor, segment_size)
+    elif executor is None:
+        client.download(url, path)
+    else:
+        executor.submit(client.download, url, path).result()
+    if md5 is not None:
+        verify_file(path, md5)
+    return path
+
+
+def download_files(
+    accessions, directory, file_type="fastq", result="read_run",
+    client=None, max_workers=enasearch.maxWorkers, segment_size=segmentSize
+):
+    """Download the files (fastq, submitted or sra) of runs or analyses
+
+    This function
+
+    - Retrieves the file reports of the accessions (concurrently)
+    - Downloads the listed files in a directory, with at most <max_workers> requests at the same time (large files are downloaded by segments)
+    - Checks the md5 checksum of the files given in the reports
+
+    The files already downloaded and verified are skipped, so the function
+    can be run again after an interruption.
+
+    :param accessions: comma-separated string or list of accessions (run, experiment, sample, study, etc)
+    :param directory: directory to save the files (created if needed)
+    :param file_type: type of files (fastq, submitted or sra)
+    :param result: read_run for the files of runs or analysis for the files of analyses
+    :param client: Client object used to send the requests (default client if None)
+    :param max_workers: maximum number of requests at the same time
+    :param segment_size: size (in bytes) of the segments of large files
+
+    :return: list of paths to the downloaded files
+    """
+    check_file_type(file_type, result)
+    client = enasearch.get_client(client)
+    files = []
+    for accession_files in enasearch.ordered_map(
+        lambda accession: get_files(accession, file_type, result, client),
+        format_accessions(accessions),
+        max_workers
+    ):
+        files += accession_files
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    with ThreadPoolExecutor(max_workers) as executor:
+        def download(file_info):
+            path = os.path.join(
+                directory, os.path.basename(file_info["url"]))
+            return download_file(
+                url=file_info["url"],
+                path=path,
+                md5=file_info["md5"],
+                size=file_info["bytes"],
+                client=client,
+                executor=executor,
+                segment_size=segment_size)
+        return list(enasearch.ordered_map(download, files, max_workers))
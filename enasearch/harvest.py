@@ -0,0 +1,345 @@
+#!/usr/bin/env python
+
+import datetime
+import itertools
+import json
+import os
+import shutil
+import threading
+
+import enasearch
+from enasearch.records import iter_records
+from enasearch.store import get_accession_field
+
+
+dateFields = ["last_updated", "first_public"]
+harvestDisplays = ["report", "fasta", "fastq"]
+
+
+class HarvestState(object):
+    """Store of the last successful harvest of each (query, result)
+
+    The state is kept in a JSON file, rewritten atomically after each update
+
+    :param path: path to the JSON file (created at the first update)
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def get_key(self, query, result):
+        """Return the key of a (query, result) in the store
+
+        :param query: query string
+        :param result: id of the result
+
+        :return: a string
+        """
+        return json.dumps([query, result])
+
+    def load(self):
+        """Load the content of the store
+
+        :return: dictionary with the state of each harvest
+        """
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path) as fd:
+            return json.load(fd)
+
+    def get(self, query, result):
+        """Return the state of the last successful harvest of a (query, result)
+
+        :param query: query string
+        :param result: id of the result
+
+        :return: a dictionary (with the date of the harvest as last_run) or None
+        """
+        return self.load().get(self.get_key(query, result))
+
+    def set(self, query, result, state):
+        """Record the state of a successful harvest of a (query, result)
+
+        :param query: query string
+        :param result: id of the result
+        :param state: dictionary with the state (date of the harvest as last_run, etc)
+        """
+        with self.lock:
+            content = self.load()
+            content[self.get_key(query, result)] = state
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as fd:
+                json.dump(content, fd, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+def get_date_field(result):
+    """Return the date filter field used to select the updated records of a result
+
+    :param result: id of the result (partition of ENA db), accessible with get_results
+
+    :return: the first field of <dateFields> in the filter fields of the result
+    """
+    filter_fields = enasearch.get_filter_fields(result)
+    for field in dateFields:
+        if field in filter_fields and filter_fields[field]["type"] == "date":
+            return field
+    err_str = "The result %s has no date filter field (%s) to harvest it" % (
+        result, ", ".join(dateFields))
+    err_str += " incrementally"
+    raise ValueError(err_str)
+
+
+def build_incremental_query(query, date_field, since):
+    """Restrict a query to the records updated since a date
+
+    :param query: query string
+    :param date_field: date filter field (e.g. last_updated)
+    :param since: date in the format YYYY-MM-DD (included)
+
+    :return: the query string with the date condition
+    """
+    condition = "%s>=%s" % (date_field, since)
+    if query is None or query.strip() == "":
+        return condition
+    return "(%s) AND %s" % (query, condition)
+
+
+def check_key_field(key_field, header):
+    """Check that the field identifying the records is in the fields of a report
+
+    This function raises an error if the field is not in the fields
+
+    :param key_field: field identifying the records
+    :param header: list of the fields of the report
+    """
+    if key_field not in header:
+        err_str = "The field %s identifying the records is not in the" % (
+            key_field)
+        err_str += " fields of the harvest"
+        raise ValueError(err_str)
+
+
+def iter_report_file(file):
+    """Iterate over the rows of a report file
+
+    :param file: path to a TSV report with a header line
+
+    :return: a generator with the header (list of fields) and then the rows (lists of values)
+    """
+    with open(file, encoding=enasearch.defaultEncoding) as fd:
+        for line in fd:
+            line = line.rstrip("\n")
+            if line != "":
+                yield line.split("\t")
+
+
+def write_new_records(new_file, records):
+    """Write the new records of a harvest in a file as they are received
+
+    :param new_file: path to write the new records
+    :param records: iterable of (key, formatted record) tuples
+
+    :return: the set of the keys of the new records and their number
+    """
+    new_keys = set()
+    record_nb = 0
+    with open(new_file, "w", encoding=enasearch.defaultEncoding) as output:
+        for key, record in records:
+            new_keys.add(key)
+            output.write(record)
+            record_nb += 1
+    return new_keys, record_nb
+
+
+def append_file(new_file, output):
+    """Append the content of a file to an output and remove the file
+
+    :param new_file: path to the file to append
+    :param output: text file object to write to
+    """
+    with open(new_file, encoding=enasearch.defaultEncoding) as fd:
+        shutil.copyfileobj(fd, output)
+    os.remove(new_file)
+
+
+def merge_report(file, tmp_file, header, rows, key_field):
+    """Write a report with the rows of a previous report replaced or completed by new rows
+
+    The new rows are consumed as they come and written in <tmp_file>.new
+    (only their keys are kept in memory) before being merged
+
+    :param file: path to the previous report (None if there is none)
+    :param tmp_file: path to write the merged report
+    :param header: list of the fields
+    :param rows: iterable of new rows (lists of values)
+    :param key_field: field identifying the rows
+
+    :return: number of rows in the merged report
+    """
+    key_index = header.index(key_field)
+    new_file = tmp_file + ".new"
+    new_keys, row_nb = write_new_records(new_file, (
+        (row[key_index], "\t".join(row) + "\n") for row in rows))
+    try:
+        with open(tmp_file, "w", encoding=enasearch.defaultEncoding) as output:
+            output.write("\t".join(header) + "\n")
+            if file is not None:
+                old_rows = iter_report_file(file)
+                old_header = next(old_rows, None)
+                if old_header is not None and old_header != header:
+                    err_str = "The fields of %s are different from the" % file
+                    err_str += " ones of the harvest"
+                    raise ValueError(err_str)
+                for row in old_rows:
+                    if row[key_index] not in new_keys:
+                        output.write("\t".join(row) + "\n")
+                        row_nb += 1
+            append_file(new_file, output)
+    finally:
+        if os.path.exists(new_file):
+            os.remove(new_file)
+    return row_nb
+
+
+def get_sequence_key(record_id):
+    """Return the accession identifying a sequence, without its version
+
+    :param record_id: id of the sequence (e.g. ENA|A00145|A00145.1)
+
+    :return: the accession of the sequence (e.g. A00145)
+    """
+    accession = record_id.split("|")[-1]
+    base, sep, version = accession.rpartition(".")
+    if sep != "" and version.isdigit():
+        return base
+    return accession
+
+
+def merge_sequences(file, tmp_file, display, records):
+    """Write sequences of a previous file replaced or completed by new sequences
+
+    The sequences are identified by their accession without version (see
+    get_sequence_key), so a new version of a sequence replaces the previous
+    one. The new sequences are consumed as they come and written in
+    <tmp_file>.new (only their keys are kept in memory) before being merged
+
+    :param file: path to the previous file (None if there is none)
+    :param tmp_file: path to write the merged sequences
+    :param display: fasta or fastq
+    :param records: iterable of new Record objects
+
+    :return: number of sequences in the merged file
+    """
+    new_file = tmp_file + ".new"
+    new_keys, record_nb = write_new_records(new_file, (
+        (get_sequence_key(record.id), record.format(display))
+        for record in records))
+    try:
+        with open(tmp_file, "w", encoding=enasearch.defaultEncoding) as output:
+            if file is not None:
+                with open(file, "rb") as fd:
+                    for record in iter_records(fd, display):
+                        if get_sequence_key(record.id) not in new_keys:
+                            output.write(record.format(display))
+                            record_nb += 1
+            append_file(new_file, output)
+    finally:
+        if os.path.exists(new_file):
+            os.remove(new_file)
+    return record_nb
+
+
+def harvest(
+    query, result, display, file, state_file, fields=None, key_field=None,
+    free_text_search=False, client=None, page_size=None, validate=True
+):
+    """Harvest the results of a query incrementally
+
+    The date of the last successful harvest of the (query, result) is kept in
+    <state_file>. At the next harvest, the query is restricted (with the date
+    filter field of the result, last_updated or first_public) to the records
+    updated since this date, and the new or updated records are merged into
+    <file>: the previous version of each record is removed and the new one
+    added at the end. The first harvest (or a harvest with a missing file)
+    gets all the records. The records removed from ENA are not removed from
+    the file. A free text query can not be restricted to dates, so all its
+    records are requested at each harvest and replace the file.
+
+    :param query: query string, made up of filtering conditions, joined by logical ANDs, ORs and NOTs and bound by double quotes
+    :param result: id of the result (partition of ENA db), accessible with get_results
+    :param display: report, fasta or fastq
+    :param file: filepath of the harvested records
+    :param state_file: filepath of the JSON file with the state of the harvests
+    :param fields: comma-separated list of fields to return (only if display=report)
+    :param key_field: field identifying the records in a report (accession field of the result if None, see enasearch.store.get_accession_field)
+    :param free_text_search: boolean to describe the type of query
+    :param client: Client object used to send the requests (default client if None)
+    :param page_size: number of records per request (<lengthLimit> if None)
+    :param validate: boolean to check the fields, operators, values and functions of the query against the descriptors before any request (otherwise only its syntax is checked, e.g. for fields more recent than the descriptors)
+
+    :return: dictionary with the date of the harvest (last_run), the date of the previous one (since), the number of new or updated records (updated) and the number of records in the file (total)
+    """
+    if display not in harvestDisplays:
+        err_str = "The harvest is possible only for %s display" % (
+            ", ".join(harvestDisplays))
+        raise ValueError(err_str)
+    if key_field is None:
+        key_field = get_accession_field(result)
+    if fields is not None:
+        check_key_field(key_field, fields.split(","))
+    state = HarvestState(state_file)
+    today = datetime.date.today().isoformat()
+    previous = state.get(query, result)
+    since = None
+    if previous is not None and os.path.exists(file) and not free_text_search:
+        since = previous["last_run"]
+    harvest_query = query
+    if since is not None:
+        harvest_query = build_incremental_query(
+            query, get_date_field(result), since)
+    cursor = enasearch.iter_search(
+        query=harvest_query,
+        result=result,
+        display=display,
+        page_size=page_size,
+        free_text_search=free_text_search,
+        fields=fields,
+        client=client,
+        light=True,
+        validate=validate)
+    tmp_file = file + ".tmp"
+    previous_file = file if since is not None else None
+    with cursor:
+        if display == "report":
+            first = next(cursor, None)
+            records = cursor if first is None else itertools.chain(
+                [first], cursor)
+            if fields is not None:
+                header = fields.split(",")
+            elif first is not None:
+                header = list(first.keys())
+            elif previous_file is not None:
+                header = next(iter_report_file(previous_file))
+            else:
+                header = []
+            if len(header) > 0:
+                check_key_field(key_field, header)
+                rows = (
+                    [row.get(field, "") for field in header]
+                    for row in records)
+                total = merge_report(
+                    previous_file, tmp_file, header, rows, key_field)
+            else:
+                open(tmp_file, "w").close()
+                total = 0
+        else:
+            total = merge_sequences(previous_file, tmp_file, display, cursor)
+    os.replace(tmp_file, file)
+    summary = {
+        "last_run": today,
+        "since": since,
+        "updated": cursor.fetched,
+        "total": total}
+    state.set(query, result, summary)
+    return summary
@@ -0,0 +1,628 @@
+#!/usr/bin/env python
+
+import collections
+import datetime
+import math
+import operator
+import re
+from urllib.parse import quote
+from urllib.parse import unquote
+from urllib.parse import unquote_plus
+
+import enasearch
+from enasearch.table import parse_report
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+tokenRegex = re.compile(
+    r'\s*(?:(?P<string>"[^"]*")|(?P<operator><=|>=|!=|=|<|>)'
+    r'|(?P<punctuation>[(),])|(?P<word>[^\s()",=<>!]+))')
+locationRegex = re.compile(
+    r"^\s*([0-9.]+)\s*([NS])\s*([0-9.]+)\s*([EW])\s*$", re.IGNORECASE)
+keywords = ["AND", "OR", "NOT"]
+comparisonOperators = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+trueValues = ["yes", "true"]
+filterTypeNames = {
+    "number": "Number",
+    "date": "Date",
+    "text": "Text",
+    "controlled vocabulary": "Controlled vocabulary",
+    "boolean": "Boolean",
+}
+quotedFilterTypes = ["text", "controlled vocabulary"]
+numberRegex = re.compile(r"^-?[0-9]+(\.[0-9]+)?$")
+taxonomyIdRegex = re.compile(r"^[0-9]+$")
+querySafeCharacters = "()=<>!,*-_.:"
+earthRadius = 6371.0
+kmPerDegree = math.pi * earthRadius / 180
+
+Condition = collections.namedtuple(
+    "Condition", ["field", "operator", "value", "quoted"])
+Function = collections.namedtuple("Function", ["name", "args"])
+Not = collections.namedtuple("Not", ["operand"])
+And = collections.namedtuple("And", ["operands"])
+Or = collections.namedtuple("Or", ["operands"])
+
+
+def tokenize_query(query):
+    """Split a query into tokens
+
+    :param query: query string, made up of filtering conditions, joined by logical ANDs, ORs and NOTs and bound by double quotes
+
+    :return: list of (kind, text) tuples with kind being string, operator, punctuation, word or keyword
+    """
+    tokens = []
+    position = 0
+    query = query.rstrip()
+    while position < len(query):
+        match = tokenRegex.match(query, position)
+        if match is None or match.end() == position:
+            err_str = "Unexpected character in the query at position %s: %s" % (
+                position, query[position:])
+            raise ValueError(err_str)
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "word" and text.upper() in keywords:
+            kind, text = "keyword", text.upper()
+        tokens.append((kind, text))
+        position = match.end()
+    return tokens
+
+
+class QueryParser(object):
+    """Recursive descent parser of the ENA query syntax
+
+    The query is parsed into a tree of Condition (field, operator and value),
+    Function (e.g. tax_tree or geo_box1 and their arguments), Not, And and Or
+    nodes. NOT binds more tightly than AND, which binds more tightly than OR.
+
+    :param query: query string, made up of filtering conditions, joined by logical ANDs, ORs and NOTs and bound by double quotes
+    """
+    def __init__(self, query):
+        self.query = query
+        self.tokens = tokenize_query(query)
+        self.position = 0
+
+    def peek(self):
+        """Return the next token without consuming it (None at the end)"""
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def next(self, kind=None, text=None):
+        """Consume the next token, checking its kind and text if given
+
+        :param kind: expected kind of the token
+        :param text: expected text of the token
+
+        :return: the text of the token
+        """
+        token = self.peek()
+        if token is None or (kind is not None and token[0] != kind) or (
+            text is not None and token[1] != text
+        ):
+            expected = text or kind or "a token"
+            found = token[1] if token is not None else "the end of the query"
+            err_str = "Invalid query (%s): expected %s, found %s" % (
+                self.query, expected, found)
+            raise ValueError(err_str)
+        self.position += 1
+        return token[1]
+
+    def parse(self):
+        """Parse the whole query
+
+        :return: the root node of the query
+        """
+        node = self.parse_or()
+        if self.peek() is not None:
+            err_str = "Invalid query (%s): unexpected %s" % (
+                self.query, self.peek()[1])
+            raise ValueError(err_str)
+        return node
+
+    def parse_or(self):
+        operands = [self.parse_and()]
+        while self.peek() == ("keyword", "OR"):
+            self.next()
+            operands.append(self.parse_and())
+        return operands[0] if len(operands) == 1 else Or(operands)
+
+    def parse_and(self):
+        operands = [self.parse_not()]
+        while self.peek() == ("keyword", "AND"):
+            self.next()
+            operands.append(self.parse_not())
+        return operands[0] if len(operands) == 1 else And(operands)
+
+    def parse_not(self):
+        if self.peek() == ("keyword", "NOT"):
+            self.next()
+            return Not(self.parse_not())
+        return self.parse_primary()
+
+    def parse_value(self):
+        """Parse a value (quoted string or word)
+
+        :return: the value (without quotes) and a boolean indicating if it was quoted
+        """
+        token = self.peek()
+        if token is not None and token[0] == "string":
+            return self.next()[1:-1], True
+        return self.next("word"), False
+
+    def parse_primary(self):
+        if self.peek() == ("punctuation", "("):
+            self.next()
+            node = self.parse_or()
+            self.next("punctuation", ")")
+            return node
+        name = self.next("word")
+        if self.peek() == ("punctuation", "("):
+            self.next()
+            args = []
+            if self.peek() != ("punctuation", ")"):
+                args.append(self.parse_value()[0])
+                while self.peek() == ("punctuation", ","):
+                    self.next()
+                    args.append(self.parse_value()[0])
+            self.next("punctuation", ")")
+            return Function(name, args)
+        comparison = self.next("operator")
+        value, quoted = self.parse_value()
+        return Condition(name, comparison, value, quoted)
+
+
+def parse_query(query):
+    """Parse a query into a tree of nodes
+
+    :param query: query string, made up of filtering conditions, joined by logical ANDs, ORs and NOTs and bound by double quotes
+
+    :return: the root node (Condition, Function, Not, And or Or)
+    """
+    return QueryParser(query).parse()
+
+
+def get_query_functions():
+    """Return the functions (taxonomy and geospatial) usable in a query
+
+    :return: dictionary with the function names as keys and the list of their parameters as values
+    """
+    functions = {}
+    for filter_type in ["Taxonomy", "Geospatial"]:
+        for name, description in enasearch.get_filter_types()[filter_type].items():
+            functions[name] = [
+                parameter.strip() for parameter in description["parameters"]]
+    return functions
+
+
+def check_function(node):
+    """Check the name and the arguments of a function in a query
+
+    This function raises an error if the function is not a taxonomy or
+    geospatial function, if the number of arguments is not the number of
+    parameters of the function or if an argument is not a number (for the
+    geospatial functions) or a taxonomy identifier (for the taxonomy functions
+    except tax_name)
+
+    :param node: Function node
+    """
+    functions = get_query_functions()
+    if node.name not in functions:
+        err_str = "Unknown function in the query: %s" % node.name
+        raise ValueError(err_str)
+    if len(node.args) != len(functions[node.name]):
+        err_str = "The function %s expects %s arguments (%s)" % (
+            node.name, len(functions[node.name]),
+            ", ".join(functions[node.name]))
+        raise ValueError(err_str)
+    if node.name == "tax_name":
+        return
+    regex = numberRegex if node.name.startswith("geo_") else taxonomyIdRegex
+    for arg, parameter in zip(node.args, functions[node.name]):
+        if regex.match(arg.strip()) is None:
+            err_str = "Invalid %s in %s: %s" % (parameter, node.name, arg)
+            raise ValueError(err_str)
+
+
+def check_condition(node, filter_fields, result):
+    """Check the field, the operator and the value of a condition in a query
+
+    This function raises an error if the field is not a filter field of the
+    result, if the operator is not one of the operators of the type of the
+    field or if the value does not have the expected shape (number, date in
+    the format YYYY-MM-DD or boolean value)
+
+    :param node: Condition node
+    :param filter_fields: dictionary with the filter fields of the result
+    :param result: id of the result (partition of ENA db), accessible with get_results
+    """
+    if node.field not in filter_fields:
+        err_str = "The field %s is not a filter field of %s" % (
+            node.field, result)
+        raise ValueError(err_str)
+    field_type = filter_fields[node.field]["type"]
+    if field_type not in filterTypeNames:
+        err_str = "The %s field %s can be used only with the geo_*" % (
+            field_type, node.field)
+        err_str += " functions"
+        raise ValueError(err_str)
+    filter_type = enasearch.get_filter_types()[filterTypeNames[field_type]]
+    if node.operator not in filter_type["operators"]:
+        err_str = "The operator %s can not be used with the %s field %s" % (
+            node.operator, field_type, node.field)
+        err_str += " (possible operators: %s)" % (
+            ", ".join(filter_type["operators"]))
+        raise ValueError(err_str)
+    if field_type == "number" and numberRegex.match(node.value) is None:
+        err_str = "The value of %s must be a number: %s" % (
+            node.field, node.value)
+        raise ValueError(err_str)
+    if field_type == "date":
+        try:
+            datetime.datetime.strptime(node.value, "%Y-%m-%d")
+        except ValueError:
+            err_str = "The value of %s must be a date in the format" % (
+                node.field)
+            err_str += " YYYY-MM-DD: %s" % node.value
+            raise ValueError(err_str)
+    if field_type == "boolean" and node.value.lower() not in filter_type["values"]:
+        err_str = "The value of %s must be one of %s: %s" % (
+            node.field, ", ".join(filter_type["values"]), node.value)
+        raise ValueError(err_str)
+
+
+def check_node(node, filter_fields, result):
+    """Check recursively the conditions and functions of a query
+
+    :param node: Condition, Function, Not, And or Or node
+    :param filter_fields: dictionary with the filter fields of the result
+    :param result: id of the result (partition of ENA db), accessible with get_results
+    """
+    if isinstance(node, Condition):
+        check_condition(node, filter_fields, result)
+    elif isinstance(node, Function):
+        check_function(node)
+    elif isinstance(node, Not):
+        check_node(node.operand, filter_fields, result)
+    else:
+        for operand in node.operands:
+            check_node(operand, filter_fields, result)
+
+
+def format_node(node, filter_fields):
+    """Format a node of a query into a normalized query string
+
+    The keywords are upper-cased, the values of text and controlled
+    vocabulary fields (and the argument of tax_name) are enclosed in double
+    quotes (kept exactly as written), the other values are not (and are
+    stripped) and the parentheses are only kept where needed
+
+    :param node: Condition, Function, Not, And or Or node
+    :param filter_fields: dictionary with the filter fields of the result
+
+    :return: the query string (not URL-encoded)
+    """
+    if isinstance(node, Condition):
+        field_type = filter_fields.get(node.field, {}).get("type")
+        if field_type in quotedFilterTypes or (field_type is None and node.quoted):
+            value = '"%s"' % node.value
+        elif field_type == "boolean":
+            value = node.value.strip().lower()
+        else:
+            value = node.value.strip()
+        return "%s%s%s" % (node.field, node.operator, value)
+    if isinstance(node, Function):
+        if node.name == "tax_name":
+            args = ['"%s"' % arg for arg in node.args]
+        else:
+            args = [arg.strip() for arg in node.args]
+        return "%s(%s)" % (node.name, ",".join(args))
+    if isinstance(node, Not):
+        operand = format_node(node.operand, filter_fields)
+        if isinstance(node.operand, (And, Or)):
+            operand = "(%s)" % operand
+        return "NOT %s" % operand
+    operands = []
+    for operand in node.operands:
+        formatted_operand = format_node(operand, filter_fields)
+        if isinstance(node, And) and isinstance(operand, Or):
+            formatted_operand = "(%s)" % formatted_operand
+        operands.append(formatted_operand)
+    keyword = " AND " if isinstance(node, And) else " OR "
+    return keyword.join(operands)
+
+
+def validate_query(query, result):
+    """Parse and check a query for a result
+
+    This function raises an error if the query is malformed, if a field is
+    not a filter field of the result, if an operator or a value does not
+    match the type of its field (see get_filter_types) or if a taxonomy or
+    geospatial function is unknown or has invalid arguments
+
+    :param query: query string (URL-encoded or not, + being a space as in the URLs)
+    :param result: id of the result (partition of ENA db), accessible with get_results
+
+    :return: the root node of the query
+    """
+    node = parse_query(unquote_plus(query))
+    check_node(node, enasearch.get_filter_fields(result), result)
+    return node
+
+
+def compile_query(query, result, validate=True):
+    """Validate a query and return its normalized and URL-encoded form
+
+    Two queries differing only by spacing, case of the keywords, quotes,
+    superfluous parentheses or URL encoding give the same string, so the URLs
+    (and the cache keys and memoized numbers of results) are the same. The
+    compilation of a compiled query returns it unchanged. As in the URLs sent
+    before the compilation, a + in the query is a space.
+
+    :param query: query string (URL-encoded or not)
+    :param result: id of the result (partition of ENA db), accessible with get_results
+    :param validate: boolean to check the fields, operators, values and functions (see validate_query), otherwise only the syntax is checked (e.g. for fields more recent than the descriptors)
+
+    :return: the normalized URL-encoded query string
+    """
+    if validate:
+        node = validate_query(query, result)
+    else:
+        node = parse_query(unquote_plus(query))
+    formatted_query = format_node(node, enasearch.get_filter_fields(result))
+    return quote(formatted_query, safe=querySafeCharacters)
+
+
+def parse_location(value):
+    """Parse a location of a report (e.g. 9.12 N 79.7 W)
+
+    :param value: string with the location
+
+    :return: the latitude and the longitude (NaN if the location is missing or invalid)
+    """
+    match = locationRegex.match(value or "")
+    if match is None:
+        return float("nan"), float("nan")
+    latitude = float(match.group(1))
+    if match.group(2).upper() == "S":
+        latitude = -latitude
+    longitude = float(match.group(3))
+    if match.group(4).upper() == "W":
+        longitude = -longitude
+    return latitude, longitude
+
+
+def get_column(table, field):
+    """Return a column of a table as a NumPy array
+
+    :param table: dictionary with the fields as keys and the columns as values
+    :param field: field of the column
+
+    :return: a NumPy array
+    """
+    if field not in table:
+        err_str = "The field %s is not in the table to evaluate the query" % (
+            field)
+        raise ValueError(err_str)
+    return numpy.asarray(table[field])
+
+
+def match_values(column, predicate):
+    """Apply a predicate on the distinct values of a column
+
+    The column is factorized (each distinct value gets a code), the predicate
+    is applied once per distinct value and the result is broadcast to the
+    rows with a vectorized lookup, which is much faster than string operations
+    on each row for the usual metadata columns
+
+    :param column: NumPy array with the values
+    :param predicate: function taking a lower-cased string and returning a boolean
+
+    :return: a boolean NumPy array
+    """
+    codes = {}
+    indices = numpy.fromiter(
+        (codes.setdefault(value, len(codes)) for value in column),
+        dtype=numpy.int64, count=len(column))
+    matches = numpy.array(
+        [predicate(("%s" % value).lower()) for value in codes], dtype=bool)
+    return matches[indices]
+
+
+def match_text(column, value):
+    """Compare (case-insensitively) the values of a column to a text value with wildcards
+
+    :param column: NumPy array with the values
+    :param value: text value, with * at the start and/or end as wildcard
+
+    :return: a boolean NumPy array
+    """
+    pattern = value.lower()
+    if len(pattern) > 1 and pattern.startswith("*") and pattern.endswith("*"):
+        return match_values(column, lambda string: pattern[1:-1] in string)
+    if pattern.startswith("*"):
+        return match_values(column, lambda string: string.endswith(pattern[1:]))
+    if pattern.endswith("*"):
+        return match_values(column, lambda string: string.startswith(pattern[:-1]))
+    return match_values(column, lambda string: string == pattern)
+
+
+def evaluate_condition(node, table, filter_fields):
+    """Evaluate a condition on the columns of a table
+
+    :param node: Condition node
+    :param table: dictionary with the fields as keys and the columns as values
+    :param filter_fields: dictionary with the filter fields of the result
+
+    :return: a boolean NumPy array
+    """
+    column = get_column(table, node.field)
+    field_type = filter_fields.get(node.field, {}).get("type")
+    value = unquote(node.value)
+    compare = comparisonOperators[node.operator]
+    if field_type is None:
+        if column.dtype.kind in "iuf":
+            field_type = "number"
+        elif column.dtype.kind == "M":
+            field_type = "date"
+        else:
+            field_type = "text"
+    if field_type in ["number", "date"]:
+        if field_type == "number":
+            if column.dtype.kind not in "iuf":
+                column = numpy.where(column == "", "nan", column)
+            values = column.astype(numpy.float64)
+            missing = numpy.isnan(values)
+            reference = float(value)
+        else:
+            if column.dtype.kind != "M":
+                column = numpy.where(column == "", "NaT", column)
+            values = column.astype("datetime64[D]")
+            missing = numpy.isnat(values)
+            reference = numpy.datetime64(value, "D")
+        return compare(values, reference) & ~missing
+    if node.operator not in ["=", "!="]:
+        err_str = "The operator %s can not be used with the %s field %s" % (
+            node.operator, field_type, node.field)
+        raise ValueError(err_str)
+    if field_type == "boolean":
+        expected = value.lower() in trueValues
+        matches = match_values(
+            column, lambda string: (string in trueValues) == expected)
+    else:
+        matches = match_text(column, value)
+    return matches if node.operator == "=" else ~matches
+
+
+def evaluate_function(node, table):
+    """Evaluate a taxonomy or geospatial function on the columns of a table
+
+    tax_eq and tax_name are evaluated on the tax_id and scientific_name
+    columns and the geo_* functions on the location column. tax_tree and the
+    CoL functions need the taxonomy and can not be evaluated locally.
+
+    :param node: Function node
+    :param table: dictionary with the fields as keys and the columns as values
+
+    :return: a boolean NumPy array
+    """
+    check_function(node)
+    args = [unquote(arg) for arg in node.args]
+    if node.name == "tax_eq":
+        return get_column(table, "tax_id").astype(str) == args[0]
+    if node.name == "tax_name":
+        return match_text(get_column(table, "scientific_name"), args[0])
+    if not node.name.startswith("geo_"):
+        err_str = "The function %s can not be evaluated on local data" % (
+            node.name)
+        raise ValueError(err_str)
+    locations = [parse_location(value) for value in get_column(table, "location")]
+    locations = numpy.array(locations, dtype=numpy.float64).reshape(-1, 2)
+    latitudes, longitudes = locations[:, 0], locations[:, 1]
+    args = [float(arg) for arg in args]
+    with numpy.errstate(invalid="ignore"):
+        if node.name == "geo_north":
+            return latitudes >= args[0]
+        if node.name == "geo_south":
+            return latitudes <= args[0]
+        if node.name == "geo_point":
+            return (latitudes == args[0]) & (longitudes == args[1])
+        if node.name == "geo_box1":
+            in_latitudes = (latitudes >= args[0]) & (latitudes <= args[2])
+            in_longitudes = (longitudes >= args[1]) & (longitudes <= args[3])
+            return in_latitudes & in_longitudes
+        if node.name == "geo_lat":
+            return numpy.abs(latitudes - args[0]) * kmPerDegree <= args[1]
+        if node.name == "geo_box2":
+            cosine = numpy.cos(numpy.radians(args[0]))
+            latitude_distances = numpy.abs(latitudes - args[0]) * kmPerDegree
+            longitude_distances = numpy.abs(longitudes - args[1]) * kmPerDegree * cosine
+            return (latitude_distances <= args[2]) & (longitude_distances <= args[2])
+        latitudes, longitudes = numpy.radians(latitudes), numpy.radians(longitudes)
+        center_latitude, center_longitude = numpy.radians(args[:2])
+        cosines = numpy.cos(latitudes) * numpy.cos(center_latitude)
+        haversine = numpy.sin((latitudes - center_latitude) / 2) ** 2
+        haversine += cosines * numpy.sin((longitudes - center_longitude) / 2) ** 2
+        distances = 2 * earthRadius * numpy.arcsin(numpy.sqrt(haversine))
+        return distances <= args[2]
+
+
+def evaluate_node(node, table, filter_fields):
+    """Evaluate a node of a query on the columns of a table
+
+    :param node: Condition, Function, Not, And or Or node
+    :param table: dictionary with the fields as keys and the columns as values
+    :param filter_fields: dictionary with the filter fields of the result
+
+    :return: a boolean NumPy array
+    """
+    if isinstance(node, Condition):
+        return evaluate_condition(node, table, filter_fields)
+    if isinstance(node, Function):
+        return evaluate_function(node, table)
+    if isinstance(node, Not):
+        return ~evaluate_node(node.operand, table, filter_fields)
+    masks = [evaluate_node(operand, table, filter_fields) for operand in node.operands]
+    if isinstance(node, And):
+        return numpy.logical_and.reduce(masks)
+    return numpy.logical_or.reduce(masks)
+
+
+def evaluate_query(query, table, result):
+    """Evaluate a query on the columns of a table
+
+    Each condition is evaluated in one vectorized operation on a column. The
+    comparisons on text are case-insensitive and missing values do not match
+    the conditions on numbers and dates.
+
+    :param query: query string, URL-encoded or not (or root node returned by parse_query)
+    :param table: dictionary with the fields as keys and the columns (NumPy arrays or lists) as values, e.g. returned by enasearch.table.parse_report
+    :param result: id of the result (partition of ENA db), accessible with get_results
+
+    :return: a boolean NumPy array with the rows matching the query
+    """
+    if numpy is None:
+        err_str = "NumPy is needed to evaluate queries on local data"
+        err_str += " (pip install enasearch[table])"
+        raise ImportError(err_str)
+    if not isinstance(query, tuple):
+        query = parse_query(unquote_plus(query))
+    return evaluate_node(query, table, enasearch.get_filter_fields(result))
+
+
+def filter_table(query, table, result):
+    """Select the rows of a table matching a query
+
+    :param query: query string (or root node returned by parse_query)
+    :param table: dictionary with the fields as keys and the columns (NumPy arrays or lists) as values, e.g. returned by enasearch.table.parse_report
+    :param result: id of the result (partition of ENA db), accessible with get_results
+
+    :return: a dictionary with the same fields and the selected rows of each column
+    """
+    mask = evaluate_query(query, table, result)
+    return dict([
+        (field, numpy.asarray(column)[mask]) for field, column in table.items()])
+
+
+def filter_report(query, content, result):
+    """Select the rows of a report matching a query
+
+    :param query: query string (or root node returned by parse_query)
+    :param content: string (or bytes) with the TSV report
+    :param result: id of the result (partition of ENA db), accessible with get_results
+
+    :return: a dictionary with the fields as keys and the selected rows of each column as NumPy arrays
+    """
+    return filter_table(query, parse_report(content, result), result)
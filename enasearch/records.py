@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+
+import io
+
+import enasearch
+
+
+phredOffset = 33
+decodeQualityTable = bytes([(i - phredOffset) % 256 for i in range(256)])
+encodeQualityTable = bytes([(i + phredOffset) % 256 for i in range(256)])
+
+
+class Record(object):
+    """Light sequence record (alternative to BioPython SeqRecord objects)
+
+    The record stores only the id, the description, the sequence (as a
+    string) and, for FASTQ, the Phred quality scores (as bytes, one score per
+    base), so it is much smaller and faster to build than a SeqRecord object
+
+    :param id: identifier of the sequence (first word of the description)
+    :param description: title line of the sequence (without > or @)
+    :param seq: string with the sequence
+    :param quality: bytes with the Phred quality scores (None for FASTA)
+    """
+    __slots__ = ("id", "description", "seq", "quality")
+
+    def __init__(self, id, description, seq, quality=None):
+        self.id = id
+        self.description = description
+        self.seq = seq
+        self.quality = quality
+
+    def __len__(self):
+        return len(self.seq)
+
+    def __eq__(self, other):
+        if not isinstance(other, Record):
+            return NotImplemented
+        return all([
+            getattr(self, name) == getattr(other, name)
+            for name in self.__slots__])
+
+    def __repr__(self):
+        return "Record(id=%r, description=%r, seq=%r)" % (
+            self.id, self.description, self.seq)
+
+    def format(self, out_format):
+        """Format the record as a FASTA or FASTQ entry
+
+        :param out_format: fasta or fastq
+
+        :return: a string with the formatted record
+        """
+        if out_format == "fasta":
+            return ">%s\n%s\n" % (self.description, self.seq)
+        if out_format == "fastq":
+            if self.quality is None:
+                err_str = "A record without quality can not be formatted as"
+                err_str += " fastq"
+                raise ValueError(err_str)
+            quality = self.quality.translate(encodeQualityTable)
+            return "@%s\n%s\n+\n%s\n" % (
+                self.description, self.seq, quality.decode("ascii"))
+        err_str = "A record can be formatted only as fasta or fastq"
+        raise ValueError(err_str)
+
+
+def build_record(title, seq, quality, encoding):
+    """Build a Record object from the lines of an entry
+
+    :param title: bytes with the title line (without > or @ and end of line)
+    :param seq: bytes with the sequence
+    :param quality: bytes with the quality line (None for FASTA)
+    :param encoding: encoding of the title
+
+    :return: a Record object
+    """
+    description = title.decode(encoding, enasearch.decodeErrors)
+    split_description = description.split(None, 1)
+    if len(split_description) > 0:
+        record_id = split_description[0]
+    else:
+        record_id = ""
+    if quality is not None:
+        quality = quality.translate(decodeQualityTable)
+    return Record(record_id, description, seq.decode("ascii", enasearch.decodeErrors), quality)
+
+
+def iter_fasta_records(handle, encoding):
+    """Parse the FASTA entries in a buffered binary stream
+
+    :param handle: buffered binary file object
+    :param encoding: encoding of the titles
+
+    :return: a generator of Record objects
+    """
+    title = None
+    seq = []
+    for line in handle:
+        if line.startswith(b">"):
+            if title is not None:
+                yield build_record(title, b"".join(seq), None, encoding)
+            title = line[1:].rstrip()
+            seq = []
+        elif title is not None:
+            seq.append(line.strip())
+    if title is not None:
+        yield build_record(title, b"".join(seq), None, encoding)
+
+
+def iter_fastq_records(handle, encoding):
+    """Parse the FASTQ entries in a buffered binary stream
+
+    The entries are expected on 4 lines (title, sequence, + and qualities),
+    as in the FASTQ files returned by ENA
+
+    :param handle: buffered binary file object
+    :param encoding: encoding of the titles
+
+    :return: a generator of Record objects
+    """
+    for title in handle:
+        if title.strip() == b"":
+            continue
+        if not title.startswith(b"@"):
+            err_str = "A FASTQ entry must start with @: %s" % title
+            raise ValueError(err_str)
+        seq = handle.readline().rstrip()
+        handle.readline()
+        quality = handle.readline().rstrip()
+        if len(quality) != len(seq):
+            err_str = "Sequence and quality of different lengths for %s" % title
+            raise ValueError(err_str)
+        yield build_record(title[1:].rstrip(), seq, quality, encoding)
+
+
+def iter_records(fd, out_format, encoding=enasearch.defaultEncoding):
+    """Parse the sequences in a binary stream into Record objects
+
+    The stream is read as the records are consumed and closed once all the
+    records are parsed
+
+    :param fd: binary file object (e.g. the raw stream of a response)
+    :param out_format: fasta or fastq
+    :param encoding: encoding of the titles
+
+    :return: a generator of Record objects
+    """
+    if out_format == "fasta":
+        parse = iter_fasta_records
+    elif out_format == "fastq":
+        parse = iter_fastq_records
+    else:
+        err_str = "Light records can be parsed only from fasta or fastq"
+        raise ValueError(err_str)
+    with fd:
+        if isinstance(fd, io.BufferedIOBase):
+            handle = fd
+        else:
+            handle = io.BufferedReader(fd, enasearch.bufferSize)
+        for record in parse(handle, encoding):
+            yield record
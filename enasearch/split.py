@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+
+import datetime
+
+import enasearch
+
+
+splitFields = ["first_public", "last_updated", "collection_date"]
+splitStartDate = datetime.date(1980, 1, 1)
+
+
+def get_split_field(result):
+    """Return the date filter field used to split the queries on a result
+
+    :param result: id of the result (partition of ENA db), accessible with get_results
+
+    :return: the first field of <splitFields> in the filter fields of the result
+    """
+    filter_fields = enasearch.get_filter_fields(result)
+    for field in splitFields:
+        if field in filter_fields and filter_fields[field]["type"] == "date":
+            return field
+    err_str = "The result %s has no date filter field (%s) to split a query" % (
+        result, ", ".join(splitFields))
+    raise ValueError(err_str)
+
+
+def build_part_query(query, field, start, end):
+    """Restrict a query to the records with a date in a range
+
+    :param query: query string (compiled queries are kept encoded, so their values are decoded only once at the compilation of the sub-query)
+    :param field: date filter field
+    :param start: first date of the range (datetime.date or None for the records before <end> and the records without date)
+    :param end: date after the range (datetime.date or None for no upper bound)
+
+    :return: the query string restricted to the range
+    """
+    query = "(%s)" % query
+    if start is None:
+        return "%s AND NOT %s>=%s" % (query, field, end.isoformat())
+    query += " AND %s>=%s" % (field, start.isoformat())
+    if end is not None:
+        query += " AND %s<%s" % (field, end.isoformat())
+    return query
+
+
+def get_split_end_date():
+    """Return the end of the date range split by bisection
+
+    The range starts at <splitStartDate> and its length is the smallest power
+    of 2 (in days) reaching tomorrow, so the dates of the splits do not change
+    from one day to the other
+
+    :return: a datetime.date object
+    """
+    tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+    days = 1
+    while splitStartDate + datetime.timedelta(days=days) < tomorrow:
+        days *= 2
+    return splitStartDate + datetime.timedelta(days=days)
+
+
+def split_query(
+    query, result, result_nb=None, field=None, client=None,
+    max_workers=enasearch.maxWorkers, validate=True
+):
+    """Split a query into disjoint sub-queries of at most <lengthLimit> results
+
+    The query is split on the dates of a date filter field of the result. The
+    first sub-query gets the records before <splitStartDate> (and those
+    without date) and the others the records in date ranges, split by
+    bisection until each range has at most <lengthLimit> results (or is one
+    day long). The numbers of results of the ranges are requested
+    concurrently, one request per split (the number of the second half is
+    deduced from the first one). If the numbers of results of the sub-queries
+    do not add up to the number of results of the query, the query is not
+    split.
+
+    :param query: query string, made up of filtering conditions, joined by logical ANDs, ORs and NOTs and bound by double quotes
+    :param result: id of the result (partition of ENA db), accessible with get_results
+    :param result_nb: number of results for the query if already known
+    :param field: date filter field to split on (see get_split_field if None)
+    :param client: Client object used to send the requests (default client if None)
+    :param max_workers: number of requests sent at the same time
+    :param validate: boolean to check the fields, operators, values and functions of the query against the descriptors before any request (otherwise only its syntax is checked, e.g. for fields more recent than the descriptors)
+
+    :return: list of (query, number of results) tuples, in the order of the dates
+    """
+    client = enasearch.get_client(client)
+    query = enasearch.compile_search_query(False, query, result, validate)
+    if result_nb is None:
+        result_nb = enasearch.get_search_result_number(
+            False, query, result, client=client)
+    if result_nb <= enasearch.lengthLimit:
+        return [(query, result_nb)]
+    if field is None:
+        field = get_split_field(result)
+    end_date = get_split_end_date()
+
+    def build_query(date_range):
+        start, end = date_range
+        if end == end_date:
+            end = None
+        return enasearch.compile_search_query(
+            False, build_part_query(query, field, start, end), result,
+            validate)
+
+    def get_number(date_range):
+        return enasearch.get_search_result_number(
+            False, build_query(date_range), result, client=client)
+
+    def can_split(date_range, range_nb):
+        start, end = date_range
+        if start is None or range_nb <= enasearch.lengthLimit:
+            return False
+        return (end - start).days > 1
+
+    first_ranges = [(None, splitStartDate), (splitStartDate, end_date)]
+    ranges = list(zip(
+        first_ranges,
+        enasearch.ordered_map(get_number, first_ranges, max_workers)))
+    if sum([range_nb for date_range, range_nb in ranges]) != result_nb:
+        return [(query, result_nb)]
+
+    while True:
+        to_split = [
+            (date_range, range_nb) for date_range, range_nb in ranges
+            if can_split(date_range, range_nb)]
+        if len(to_split) == 0:
+            break
+        halves = {}
+        first_halves = []
+        for (start, end), range_nb in to_split:
+            middle = start + datetime.timedelta(days=(end - start).days // 2)
+            first_halves.append((start, middle))
+        first_half_nbs = enasearch.ordered_map(
+            get_number, first_halves, max_workers)
+        for ((start, end), range_nb), first_half, first_half_nb in zip(
+            to_split, first_halves, first_half_nbs
+        ):
+            halves[(start, end)] = [
+                (first_half, first_half_nb),
+                ((first_half[1], end), range_nb - first_half_nb)]
+        split_ranges = []
+        for date_range, range_nb in ranges:
+            split_ranges += halves.get(date_range, [(date_range, range_nb)])
+        ranges = split_ranges
+    return [
+        (build_query(date_range), range_nb)
+        for date_range, range_nb in ranges if range_nb > 0]
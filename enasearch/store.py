@@ -0,0 +1,387 @@
+#!/usr/bin/env python
+
+import sqlite3
+import threading
+import time
+
+import enasearch
+from enasearch.table import get_column_types
+from enasearch.table import split_report
+
+
+accessionFields = {
+    "read_experiment": "experiment_accession",
+    "read_run": "run_accession",
+    "read_study": "study_accession",
+    "analysis": "analysis_accession",
+    "analysis_study": "study_accession",
+    "study": "study_accession",
+    "taxon": "tax_id",
+}
+defaultAccessionField = "accession"
+sqliteTypes = {
+    "number": "INTEGER",
+    "float": "REAL",
+    "date": "TEXT",
+    "text": "TEXT",
+}
+indexedFilterTypes = ["number", "date", "controlled vocabulary"]
+upsertSupported = sqlite3.sqlite_version_info >= (3, 24, 0)
+
+
+def get_accession_field(result):
+    """Return the field identifying the records of a result
+
+    :param result: id of the result (partition of ENA db), accessible with get_results
+
+    :return: the name of the accession field of the result
+    """
+    return accessionFields.get(result, defaultAccessionField)
+
+
+def quote(name):
+    """Quote an identifier (table, column or index name) for SQLite
+
+    :param name: name of the identifier
+
+    :return: the quoted name
+    """
+    return '"%s"' % name.replace('"', '""')
+
+
+def format_value(value):
+    """Format a value stored in SQLite as in a ENA report
+
+    :param value: integer, float, string or None
+
+    :return: a string (empty for None)
+    """
+    if value is None:
+        return ""
+    return "%s" % value
+
+
+class ReportStore(object):
+    """Local SQLite mirror of the reports returned by ENA searches
+
+    The rows of the reports of each result are stored in a table (one row per
+    accession), with columns typed after the filter fields of the result
+    (INTEGER for numbers, REAL for latitudes and longitudes, ISO dates and
+    text as TEXT) and indexed on the accession and on the number, date and
+    controlled vocabulary filter fields. Each ingested search is recorded as
+    a snapshot (query, fields, date and accessions in the order of the
+    report), so a later search with the same query and a subset of the
+    fields is answered from the store. The snapshots are found by their
+    compiled query string only: a search with a narrower query or an
+    equivalent query compiled differently (e.g. with the conditions in
+    another order) is not answered from the rows already stored.
+
+    :param path: path to the SQLite file (created if needed, ":memory:" for a store in memory)
+    :param max_age: maximum age (in seconds) of a snapshot to answer a search (no limit if None)
+    """
+    def __init__(self, path, max_age=None):
+        self.path = path
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                "id INTEGER PRIMARY KEY, result TEXT, query TEXT,"
+                " free_text_search INTEGER, fields TEXT, fetched REAL,"
+                " UNIQUE (result, query, free_text_search))")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS snapshot_rows ("
+                "snapshot INTEGER, position INTEGER, accession TEXT,"
+                " PRIMARY KEY (snapshot, position))")
+
+    def close(self):
+        """Close the connection to the SQLite file"""
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get_table(self, result):
+        """Return the name of the table storing the rows of a result
+
+        :param result: id of the result (partition of ENA db), accessible with get_results
+
+        :return: the name of the table
+        """
+        return "report_%s" % result
+
+    def get_columns(self, result):
+        """Return the columns of the table of a result
+
+        :param result: id of the result (partition of ENA db), accessible with get_results
+
+        :return: list of the column names (empty if the table does not exist)
+        """
+        rows = self.connection.execute(
+            "PRAGMA table_info(%s)" % quote(self.get_table(result)))
+        return [row[1] for row in rows]
+
+    def add_columns(self, fields, result):
+        """Create the table of a result or add missing columns to it
+
+        The accession column is the primary key of the table and the number,
+        date and controlled vocabulary filter fields are indexed
+
+        :param fields: list of the fields to store
+        :param result: id of the result (partition of ENA db), accessible with get_results
+        """
+        table = self.get_table(result)
+        accession_field = get_accession_field(result)
+        columns = self.get_columns(result)
+        if len(columns) == 0:
+            self.connection.execute("CREATE TABLE %s (%s TEXT PRIMARY KEY)" % (
+                quote(table), quote(accession_field)))
+            columns = [accession_field]
+        new_fields = [field for field in fields if field not in columns]
+        if len(new_fields) == 0:
+            return
+        filter_fields = enasearch.get_filter_fields(result)
+        types = get_column_types(new_fields, result)
+        for field, column_type in zip(new_fields, types):
+            self.connection.execute("ALTER TABLE %s ADD COLUMN %s %s" % (
+                quote(table), quote(field), sqliteTypes[column_type]))
+            filter_type = filter_fields.get(field, {}).get("type")
+            if filter_type in indexedFilterTypes:
+                self.connection.execute("CREATE INDEX %s ON %s (%s)" % (
+                    quote("%s_%s" % (table, field)), quote(table),
+                    quote(field)))
+
+    def upsert_rows(self, result, fields, rows, accession_index):
+        """Insert rows in the table of a result or update the existing ones
+
+        The rows are upserted with ON CONFLICT with SQLite 3.24 or later, and
+        inserted if missing then updated with older versions
+
+        :param result: id of the result (partition of ENA db), accessible with get_results
+        :param fields: list of the fields of the rows
+        :param rows: list of rows (lists of values)
+        :param accession_index: index of the accession field in the fields
+        """
+        table = quote(self.get_table(result))
+        columns = ", ".join([quote(field) for field in fields])
+        values = ", ".join(["?"] * len(fields))
+        updated_indexes = [
+            i for i in range(len(fields)) if i != accession_index]
+        if upsertSupported:
+            statement = "INSERT INTO %s (%s) VALUES (%s) ON CONFLICT(%s) DO " % (
+                table, columns, values, quote(fields[accession_index]))
+            if len(updated_indexes) > 0:
+                statement += "UPDATE SET %s" % ", ".join([
+                    "%s=excluded.%s" % (quote(fields[i]), quote(fields[i]))
+                    for i in updated_indexes])
+            else:
+                statement += "NOTHING"
+            self.connection.executemany(statement, rows)
+            return
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO %s (%s) VALUES (%s)" % (
+                table, columns, values),
+            rows)
+        if len(updated_indexes) == 0:
+            return
+        self.connection.executemany(
+            "UPDATE %s SET %s WHERE %s=?" % (
+                table,
+                ", ".join(["%s=?" % quote(fields[i]) for i in updated_indexes]),
+                quote(fields[accession_index])),
+            [
+                [row[i] for i in updated_indexes] + [row[accession_index]]
+                for row in rows])
+
+    def ingest(self, query, result, content, free_text_search=False):
+        """Store the report of a search
+
+        The rows are inserted or updated (only the columns in the report) and
+        the snapshot of the search is replaced
+
+        :param query: query string of the search
+        :param result: id of the result (partition of ENA db), accessible with get_results
+        :param content: string (or bytes) with the TSV report (which must have the accession field of the result)
+        :param free_text_search: boolean to describe the type of query
+
+        :return: number of stored rows
+        """
+        fields, columns = split_report(content)
+        accession_field = get_accession_field(result)
+        if len(fields) > 0 and accession_field not in fields:
+            err_str = "The report must have the %s field to be stored" % (
+                accession_field)
+            raise ValueError(err_str)
+        if len(fields) > 0:
+            enasearch.check_returnable_fields(fields, result)
+        rows = [
+            [value if value != "" else None for value in row]
+            for row in zip(*columns)]
+        accession_index = fields.index(accession_field) if fields else None
+        with self.lock, self.connection:
+            if len(fields) > 0:
+                self.add_columns(fields, result)
+                self.upsert_rows(result, fields, rows, accession_index)
+            self.connection.execute(
+                "DELETE FROM snapshot_rows WHERE snapshot IN (SELECT id FROM"
+                " snapshots WHERE result=? AND query=? AND free_text_search=?)",
+                (result, query, int(free_text_search)))
+            self.connection.execute(
+                "DELETE FROM snapshots WHERE result=? AND query=? AND"
+                " free_text_search=?",
+                (result, query, int(free_text_search)))
+            cursor = self.connection.execute(
+                "INSERT INTO snapshots (result, query, free_text_search,"
+                " fields, fetched) VALUES (?, ?, ?, ?, ?)",
+                (result, query, int(free_text_search), ",".join(fields),
+                 time.time()))
+            self.connection.executemany(
+                "INSERT INTO snapshot_rows (snapshot, position, accession)"
+                " VALUES (?, ?, ?)",
+                [
+                    (cursor.lastrowid, position, row[accession_index])
+                    for position, row in enumerate(rows)])
+        return len(rows)
+
+    def get_snapshot(self, query, result, fields, free_text_search=False):
+        """Return the snapshot of a search if it covers the requested fields
+
+        :param query: query string of the search
+        :param result: id of the result (partition of ENA db), accessible with get_results
+        :param fields: list of the requested fields
+        :param free_text_search: boolean to describe the type of query
+
+        :return: the id of the snapshot or None if there is no snapshot covering the search
+        """
+        row = self.connection.execute(
+            "SELECT id, fields, fetched FROM snapshots WHERE result=? AND"
+            " query=? AND free_text_search=?",
+            (result, query, int(free_text_search))).fetchone()
+        if row is None:
+            return None
+        snapshot, snapshot_fields, fetched = row
+        if self.max_age is not None and time.time() - fetched > self.max_age:
+            return None
+        if not set(fields).issubset(snapshot_fields.split(",")):
+            return None
+        return snapshot
+
+    def lookup(self, query, result, fields, free_text_search=False):
+        """Answer a search from the store
+
+        :param query: query string of the search
+        :param result: id of the result (partition of ENA db), accessible with get_results
+        :param fields: list of the requested fields
+        :param free_text_search: boolean to describe the type of query
+
+        :return: a string with the TSV report (as returned by ENA) or None if the store does not cover the search
+        """
+        with self.lock:
+            snapshot = self.get_snapshot(
+                query, result, fields, free_text_search)
+            if snapshot is None:
+                return None
+            rows = self.connection.execute(
+                "SELECT %s FROM snapshot_rows JOIN %s ON %s.%s ="
+                " snapshot_rows.accession WHERE snapshot=? ORDER BY position" % (
+                    ", ".join(["%s.%s" % (
+                        quote(self.get_table(result)), quote(field))
+                        for field in fields]),
+                    quote(self.get_table(result)),
+                    quote(self.get_table(result)),
+                    quote(get_accession_field(result))),
+                (snapshot,)).fetchall()
+        lines = ["\t".join(fields)]
+        lines += ["\t".join([format_value(value) for value in row]) for row in rows]
+        return "\n".join(lines) + "\n"
+
+    def select(self, result, fields=None, where=None, parameters=()):
+        """Query the stored rows of a result with a SQL condition
+
+        :param result: id of the result (partition of ENA db), accessible with get_results
+        :param fields: comma-separated list of fields to return (all stored fields if None)
+        :param where: SQL condition on the fields (e.g. "read_count > ?")
+        :param parameters: values of the parameters in the condition
+
+        :return: a string with the TSV report of the matching rows
+        """
+        with self.lock:
+            columns = self.get_columns(result)
+            if fields is None:
+                fields = columns
+            else:
+                fields = fields.split(",")
+                missing = [field for field in fields if field not in columns]
+                if len(missing) > 0:
+                    err_str = "The fields %s are not stored for %s" % (
+                        ", ".join(missing), result)
+                    raise ValueError(err_str)
+            if len(columns) == 0:
+                return ""
+            statement = "SELECT %s FROM %s" % (
+                ", ".join([quote(field) for field in fields]),
+                quote(self.get_table(result)))
+            if where is not None:
+                statement += " WHERE %s" % where
+            rows = self.connection.execute(statement, parameters).fetchall()
+        lines = ["\t".join(fields)]
+        lines += ["\t".join([format_value(value) for value in row]) for row in rows]
+        return "\n".join(lines) + "\n"
+
+    def search_data(
+        self, query, result, fields=None, free_text_search=False,
+        client=None, max_workers=enasearch.maxWorkers, validate=True
+    ):
+        """Search ENA data as a report, using the store when it covers the search
+
+        On a miss, all the results of the search are requested to ENA (by
+        pages of at most <lengthLimit> records, concurrently) with the
+        accession field of the result added if needed, and stored
+
+        :param query: query string, made up of filtering conditions, joined by logical ANDs, ORs and NOTs and bound by double quotes
+        :param result: id of the result (partition of ENA db), accessible with get_results
+        :param fields: comma-separated list of fields to return (all returnable fields of the result if None)
+        :param free_text_search: boolean to describe the type of query
+        :param client: Client object used to send the requests on a miss (default client if None)
+        :param max_workers: number of pages of results requested at the same time
+        :param validate: boolean to check the fields, operators, values and functions of the query against the descriptors before any request (otherwise only its syntax is checked, e.g. for fields more recent than the descriptors)
+
+        :return: a string with the TSV report
+        """
+        query = enasearch.compile_search_query(
+            free_text_search, query, result, validate)
+        if fields is None:
+            fields = enasearch.get_returnable_fields(result)
+        else:
+            fields = fields.split(",")
+        enasearch.check_returnable_fields(fields, result)
+        content = self.lookup(query, result, fields, free_text_search)
+        if content is not None:
+            return content
+        accession_field = get_accession_field(result)
+        requested_fields = list(fields)
+        if accession_field not in requested_fields:
+            requested_fields.insert(0, accession_field)
+        client = enasearch.get_client(client)
+        result_nb = enasearch.get_search_result_number(
+            free_text_search, query, result, client=client)
+        urls = [
+            enasearch.build_search_url(
+                free_text_search=free_text_search,
+                query=query,
+                result=result,
+                display="report",
+                offset=offset,
+                length=length,
+                fields=",".join(requested_fields))
+            for offset, length in enasearch.get_search_windows(result_nb)]
+        report = b"".join(enasearch.merge_report_contents(
+            enasearch.ordered_map(client.fetch, urls, max_workers)))
+        if report == b"":
+            report = "\t".join(requested_fields).encode("utf-8") + b"\n"
+        self.ingest(query, result, report, free_text_search)
+        return self.lookup(query, result, fields, free_text_search)
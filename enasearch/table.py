@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+
+import array
+import datetime
+
+import enasearch
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def get_column_types(fields, result):
+    """Return the type of the columns of a report
+
+    The types are extracted from the filter fields of the result: number and
+    latlon_value fields are numbers, date fields are dates and all other
+    fields (including the returnable fields which are not filter fields) are
+    text
+
+    :param fields: list of the fields in the report
+    :param result: id of the result (partition of ENA db), accessible with get_results
+
+    :return: list with the type (number, float, date or text) of each field
+    """
+    filter_fields = enasearch.get_filter_fields(result)
+    types = []
+    for field in fields:
+        field_type = filter_fields.get(field, {}).get("type")
+        if field_type == "number":
+            types.append("number")
+        elif field_type == "latlon_value":
+            types.append("float")
+        elif field_type == "date":
+            types.append("date")
+        else:
+            types.append("text")
+    return types
+
+
+def split_report(content):
+    """Split a report into its header and its columns
+
+    When all the rows have as many cells as the header (the usual case, checked
+    with the number of tabs), the whole report is split in a single pass and
+    each column is a slice of the list of cells. Otherwise, the rows are split
+    one by one, the empty lines are skipped, the short rows are padded with
+    empty cells and the extra cells are dropped.
+
+    :param content: string (or bytes) with the TSV report returned by ENA
+
+    :return: the list of fields and the list of columns (lists of strings)
+    """
+    if isinstance(content, bytes):
+        content = content.decode(
+            enasearch.defaultEncoding, enasearch.decodeErrors)
+    if content == "":
+        return [], []
+    header, sep, body = content.partition("\n")
+    fields = header.split("\t")
+    field_nb = len(fields)
+    if body != "" and not body.endswith("\n"):
+        body += "\n"
+    lines = body.split("\n")[:-1]
+    tab_nbs = set([line.count("\t") for line in lines])
+    if tab_nbs <= set([field_nb - 1]) and (field_nb > 1 or "" not in lines):
+        cells = "\t".join(lines).split("\t") if len(lines) > 0 else []
+        return fields, [cells[i::field_nb] for i in range(field_nb)]
+    columns = [[] for field in fields]
+    for line in lines:
+        if line == "":
+            continue
+        row = line.split("\t")
+        row.extend([""] * (field_nb - len(row)))
+        for column, value in zip(columns, row):
+            column.append(value)
+    return fields, columns
+
+
+def format_numpy_column(values, column_type):
+    """Convert a column into a NumPy array given its type
+
+    Missing values are NaN in the float arrays and NaT in the date arrays.
+    Number columns are int64 arrays if there is no missing nor decimal value.
+
+    :param values: list of strings
+    :param column_type: number, float, date or text
+
+    :return: a NumPy array
+    """
+    if column_type == "text":
+        return numpy.array(values, dtype=object)
+    strings = numpy.array(values, dtype=str)
+    missing = strings == ""
+    if column_type == "date":
+        return numpy.where(missing, "NaT", strings).astype("datetime64[D]")
+    if column_type == "number" and not missing.any():
+        try:
+            return strings.astype(numpy.int64)
+        except ValueError:
+            pass
+    return numpy.where(missing, "nan", strings).astype(numpy.float64)
+
+
+def parse_date(value):
+    """Parse a date in the format YYYY-MM-DD
+
+    :param value: string with the date
+
+    :return: a datetime.date object or None if the value is empty
+    """
+    if value == "":
+        return None
+    return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def format_python_column(values, column_type):
+    """Convert a column into a Python array or list given its type
+
+    Missing values are NaN in the float arrays and None in the date lists.
+    Number columns are int64 arrays if there is no missing nor decimal value.
+
+    :param values: list of strings
+    :param column_type: number, float, date or text
+
+    :return: an array (numbers) or a list (dates and text)
+    """
+    if column_type == "text":
+        return list(values)
+    if column_type == "date":
+        return [parse_date(value) for value in values]
+    if column_type == "number" and "" not in values:
+        try:
+            return array.array("q", [int(value) for value in values])
+        except ValueError:
+            pass
+    return array.array("d", [
+        float(value) if value != "" else float("nan") for value in values])
+
+
+def parse_report(content, result, use_numpy=True):
+    """Parse a TSV report into typed columns
+
+    The type of each column is given by the type of the filter field in the
+    result description (see get_column_types). With NumPy (if installed and
+    use_numpy is True), each column is converted in one vectorized operation
+    into a int64, float64, datetime64[D] or object array. Without NumPy, the
+    numbers are stored in Python arrays and the other columns in lists. A
+    column with values not matching its type is kept as text.
+
+    :param content: string (or bytes) with the TSV report returned by ENA
+    :param result: id of the result (partition of ENA db), accessible with get_results
+    :param use_numpy: boolean to use NumPy arrays if NumPy is available
+
+    :return: a dictionary with the fields (in the order of the report) as keys and the columns as values
+    """
+    fields, columns = split_report(content)
+    types = get_column_types(fields, result)
+    if use_numpy and numpy is not None:
+        format_column = format_numpy_column
+    else:
+        format_column = format_python_column
+    table = {}
+    for field, values, column_type in zip(fields, columns, types):
+        try:
+            table[field] = format_column(values, column_type)
+        except ValueError:
+            table[field] = format_column(values, "text")
+    return table
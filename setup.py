@@ -10,6 +10,7 @@ setup(
     keywords="api api-client ena",
     url="https://github.com/bebatut/enasearch",
     packages=find_packages(),
+    python_requires=">=3.7",
     entry_points={
         'console_scripts': [
             'enasearch = enasearch.__main__:main'
@@ -22,15 +23,16 @@ setup(
         "Intended Audience :: Developers",
         "Operating System :: OS Independent",
         "Topic :: Scientific/Engineering",
-        "Programming Language :: Python :: 2",
-        "Programming Language :: Python :: 2.7",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.4",
-        "Programming Language :: Python :: 3.5",
-        "Programming Language :: Python :: 3.6"
+        "Programming Language :: Python :: 3 :: Only",
+        "Programming Language :: Python :: 3.7",
+        "Programming Language :: Python :: 3.8",
+        "Programming Language :: Python :: 3.9"
     ],
     extras_require={
-        'testing': ["pytest"],
+        'testing': ["pytest", "aiohttp"],
+        'aio': ["aiohttp"],
+        'table': ["numpy"],
     },
     setup_requires=['pytest-runner'],
     tests_require=['pytest'],
@@ -46,5 +48,5 @@ setup(
         'Sphinx',
         'sphinx_rtd_theme'],
     include_package_data=True,
-    package_data={'enasearch_data': ['enasearch_data/*.p']}
+    package_data={'enasearch_data': ['descriptors.sqlite']}
 )
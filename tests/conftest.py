@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs
+from urllib.parse import unquote
+from urllib.parse import urlparse
+
+import pytest
+
+import enasearch
+
+
+class FileHandler(BaseHTTPRequestHandler):
+    """Handler serving the files of the server, with range requests if enabled"""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def send(self, code, content, headers):
+        self.send_response(code)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(content)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((
+            self.command, self.path, self.headers.get("Range")))
+        with server.lock:
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            time.sleep(server.delay)
+            self.respond()
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def respond(self):
+        server = self.server
+        if any([failure in self.path for failure in server.failures]):
+            self.send(500, b"", {})
+            return
+        if self.path not in server.files:
+            if server.handler is None:
+                self.send(404, b"", {})
+            else:
+                code, content = server.handler(self.path)
+                self.send(code, content, {})
+            return
+        content = server.files[self.path]
+        size = len(content)
+        range_header = self.headers.get("Range")
+        if not server.ranges or range_header is None:
+            headers = {"Accept-Ranges": "bytes"} if server.ranges else {}
+            self.send(200, content, headers)
+            return
+        start, end = range_header.split("=")[1].split("-")
+        start = int(start)
+        end = int(end) if end != "" else size - 1
+        if start >= size:
+            self.send(416, b"", {"Content-Range": "bytes */%s" % size})
+            return
+        end = min(end, size - 1)
+        self.send(206, content[start:end + 1], {
+            "Accept-Ranges": "bytes",
+            "Content-Range": "bytes %s-%s/%s" % (start, end, size)})
+
+
+@pytest.fixture
+def file_server():
+    """Local HTTP server serving the files in its <files> dictionary (path: bytes)
+
+    The requests are recorded in <requests> as (method, path, Range header)
+    tuples and the range requests are supported unless <ranges> is False. The
+    requests with a path containing a string of <failures> get a 500 response
+    and the paths not in <files> are given to <handler> (a function returning
+    the status code and the content) if it is set. Each response is delayed
+    by <delay> seconds and the maximum number of requests handled at the same
+    time is kept in <max_active>
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FileHandler)
+    server.files = {}
+    server.requests = []
+    server.ranges = True
+    server.failures = []
+    server.handler = None
+    server.delay = 0
+    server.lock = threading.Lock()
+    server.active = 0
+    server.max_active = 0
+    server.url = "http://127.0.0.1:%s" % server.server_port
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def format_search_records(records, display, fields):
+    """Format the records returned by the fake ENA server for a display"""
+    if display == "fasta":
+        return "".join([">%s\nACGT\n" % r["accession"] for r in records])
+    if display == "fastq":
+        return "".join(["@%s\nACGT\n+\nIIII\n" % r["accession"] for r in records])
+    if display == "xml":
+        entries = "".join(['<entry accession="%s"/>' % r["accession"] for r in records])
+        return '<?xml version="1.0" encoding="UTF-8"?><ROOT>%s</ROOT>' % entries
+    lines = ["\t".join(fields)]
+    lines += ["\t".join([r.get(field, "") for field in fields]) for r in records]
+    return "\n".join(lines) + "\n"
+
+
+class FakeEna(object):
+    """Handler of a file_server answering the search, retrieve and file report requests as ENA
+
+    The records of a search are the dictionaries (with at least an accession
+    key) listed in <searches> for its (decoded) query
+    """
+    def __init__(self):
+        self.searches = {}
+
+    def __call__(self, path):
+        url = urlparse(path)
+        parameters = dict([
+            (key, values[0])
+            for key, values in parse_qs(url.query, keep_blank_values=True).items()])
+        if url.path.endswith("/search"):
+            records = self.searches.get(unquote(parameters["query"]), [])
+            if "resultcount" in parameters:
+                content = "Number of results: {:,}\nTime taken: 0 seconds".format(
+                    len(records))
+                return 200, content.encode("utf-8")
+            offset = int(parameters.get("offset", 0))
+            length = int(parameters.get("length", len(records)))
+            content = format_search_records(
+                records[offset:offset + length], parameters["display"],
+                parameters.get("fields", "accession").split(","))
+            return 200, content.encode("utf-8")
+        if url.path.endswith("/filereport"):
+            fields = parameters["fields"].split(",")
+            record = {fields[0]: parameters["accession"]}
+            record.update([(field, "10") for field in fields[1:]])
+            content = format_search_records([record], "report", fields)
+            return 200, content.encode("utf-8")
+        if "/view/" in url.path:
+            view = unquote(path.split("/view/")[1])
+            ids = view.split("&")[0].split(",")
+            display = view.split("&display=")[1].split("&")[0]
+            records = [{"accession": "ENA|%s|%s.1" % (i, i)} for i in ids]
+            return 200, format_search_records(records, display, []).encode("utf-8")
+        return 404, b""
+
+
+@pytest.fixture
+def ena_server(file_server, monkeypatch):
+    """file_server answering as ENA (see FakeEna), used as base URL of enasearch
+
+    The memoized numbers of results are cleared before and after the test
+    """
+    file_server.handler = FakeEna()
+    file_server.searches = file_server.handler.searches
+    monkeypatch.setattr(enasearch, "baseUrl", file_server.url + "/ena/")
+    enasearch.clear_memoized_search_result_numbers()
+    yield file_server
+    enasearch.clear_memoized_search_result_numbers()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+import asyncio
+import os
+import aiohttp
+import pytest
+import enasearch
+from enasearch import aio
+
+
+def test_client():
+    """Test Client class"""
+    async def run():
+        async with aio.Client(max_concurrency=5, limit_per_host=2) as client:
+            session = client.get_session()
+            assert session.connector.limit_per_host == 2
+            assert client.semaphore._value == 5
+        assert session.closed
+    asyncio.run(run())
+
+
+def test_get_client():
+    """Test get_client function"""
+    async def run():
+        client = aio.Client()
+        assert aio.get_client(client) is client
+        default_client = aio.get_client()
+        assert aio.get_client() is default_client
+    asyncio.run(run())
+
+
+def test_get_search_result_number():
+    """Test get_search_result_number function"""
+    async def run():
+        async with aio.Client() as client:
+            return await aio.get_search_result_number(
+                free_text_search=False,
+                query="tax_eq(10090)",
+                result="assembly",
+                client=client)
+    assert asyncio.run(run()) == 19
+
+
+def test_retrieve_run_report():
+    """Test retrieve_filereport function with several concurrent reports"""
+    exp_fields = ["run_accession", "fastq_ftp", "fastq_md5", "fastq_bytes"]
+
+    async def run():
+        async with aio.Client(max_concurrency=2) as client:
+            return await asyncio.gather(*[
+                aio.retrieve_filereport(
+                    accession="SRX017289",
+                    result="read_run",
+                    fields=",".join(exp_fields),
+                    client=client)
+                for i in range(3)])
+    reports = asyncio.run(run())
+    assert len(reports) == 3
+    for report in reports:
+        assert report.split("\n")[0].split("\t") == exp_fields
+
+
+def test_raw(ena_server):
+    """Test retrieve_data, search_data and retrieve_filereport functions with raw option"""
+    ena_server.searches["tax_eq(10090)"] = [{"accession": "seq1"}]
+    report_url = enasearch.build_filereport_url("SRX017289", "read_run", "run_accession")
+    ena_server.files[report_url[len(ena_server.url):]] = b"run_accession\ncaf\xe9\n"
+
+    async def run():
+        async with aio.Client() as client:
+            return [
+                await aio.retrieve_data("A00145", "fasta", client=client, raw=True),
+                await aio.retrieve_data("A00145", "fasta", client=client, light=True),
+                await aio.search_data(
+                    False, "tax_eq(10090)", "sequence_release", "fasta",
+                    client=client, raw=True),
+                await aio.retrieve_filereport(
+                    "SRX017289", "read_run", "run_accession", client=client, raw=True),
+                await aio.retrieve_filereport(
+                    "SRX017289", "read_run", "run_accession", client=client)]
+    results = asyncio.run(run())
+    assert results[0] == b">ENA|A00145|A00145.1\nACGT\n"
+    assert results[1][0].id == "ENA|A00145|A00145.1"
+    assert results[2] == b">seq1\nACGT\n"
+    assert results[3] == b"run_accession\ncaf\xe9\n"
+    assert results[4] == u"run_accession\ncaf\ufffd\n"
+
+
+def test_ordered_map():
+    """Test ordered_map function"""
+    running = []
+    max_running = []
+
+    async def function(item):
+        running.append(item)
+        max_running.append(len(running))
+        await asyncio.sleep(0.01 * (5 - item))
+        running.remove(item)
+        return item * 2
+
+    async def run():
+        return [result async for result in aio.ordered_map(function, range(5), 2)]
+    assert asyncio.run(run()) == [0, 2, 4, 6, 8]
+    assert max(max_running) == 2
+
+
+def test_search_all_data(tmpdir, ena_server, monkeypatch):
+    """Test search_all_data function with several pages"""
+    monkeypatch.setattr(enasearch, "lengthLimit", 2)
+    ena_server.searches["tax_eq(10090)"] = [{"accession": "seq%d" % i} for i in range(9)]
+    ena_server.delay = 0.05
+    file = str(tmpdir.join("sequences.fasta"))
+
+    async def run(**kwargs):
+        async with aio.Client() as client:
+            return await aio.search_all_data(
+                False, "tax_eq(10090)", "sequence_release", "fasta",
+                client=client, max_workers=2, **kwargs)
+    records = asyncio.run(run(light=True))
+    assert [record.id for record in records] == ["seq%d" % i for i in range(9)]
+    pages = [path for method, path, byte_range in ena_server.requests if "offset=" in path]
+    assert len(pages) == 5
+    # at most max_workers pages are in flight
+    assert ena_server.max_active == 2
+    asyncio.run(run(download="txt", file=file))
+    with open(file) as fd:
+        assert fd.read() == "".join([">seq%d\nACGT\n" % i for i in range(9)])
+    ena_server.failures.append("offset=4")
+    with pytest.raises(aiohttp.ClientResponseError):
+        asyncio.run(run(download="txt", file=file))
+
+
+def test_retrieve_taxons(ena_server):
+    """Test retrieve_taxons function with light records"""
+    async def run():
+        async with aio.Client() as client:
+            return await aio.retrieve_taxons(
+                "6543", "fasta", client=client, light=True)
+    records = asyncio.run(run())
+    assert isinstance(records[0], enasearch.records.Record)
+    assert records[0].id == "ENA|Taxon:6543|Taxon:6543.1"
+
+
+def test_download(tmpdir, file_server):
+    """Test download function of Client with resumed and complete files"""
+    content = b"ACGT" * 1000
+    file_server.files["/file.fastq"] = content
+    url = file_server.url + "/file.fastq"
+    file = str(tmpdir.join("file.fastq"))
+
+    async def run():
+        async with aio.Client() as client:
+            await client.download(url, file)
+    asyncio.run(run())
+    with open(file, "rb") as fd:
+        assert fd.read() == content
+    # a complete file is not downloaded again
+    del file_server.requests[:]
+    asyncio.run(run())
+    assert [r[0] for r in file_server.requests] == ["HEAD"]
+    # an interrupted download is resumed from the end of the partial file
+    os.remove(file)
+    with open(file + ".part", "wb") as fd:
+        fd.write(content[:1500])
+    del file_server.requests[:]
+    asyncio.run(run())
+    with open(file, "rb") as fd:
+        assert fd.read() == content
+    assert file_server.requests[-1] == ("GET", "/file.fastq", "bytes=1500-")
+    assert not os.path.exists(file + ".part")
+
+
+def test_aclose():
+    """Test aclose function"""
+    async def run():
+        session = aio.get_client().get_session()
+        await aio.aclose()
+        assert session.closed
+        assert asyncio.get_running_loop() not in aio.default_clients
+    asyncio.run(run())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+import os
+import time
+import enasearch
+from enasearch import cache
+
+
+def test_normalize_url():
+    """Test normalize_url function"""
+    url_a = "HTTP://www.EBI.ac.uk/ena/data/warehouse/search?query=a&result=b"
+    url_b = "http://www.ebi.ac.uk/ena/data/warehouse/search?result=b&query=a"
+    assert cache.normalize_url(url_a) == cache.normalize_url(url_b)
+    url = "http://www.ebi.ac.uk/ena/data/view/A00145&header=false&display=fasta"
+    assert cache.normalize_url(url) == "http://www.ebi.ac.uk/ena/data/view/A00145?display=fasta&header=false"
+
+
+def test_get_endpoint_type():
+    """Test get_endpoint_type function"""
+    base = "http://www.ebi.ac.uk/ena/data/"
+    assert cache.get_endpoint_type(base + "view/A00145&display=xml") == "view"
+    assert cache.get_endpoint_type(base + "warehouse/search?query=a&result=b") == "search"
+    assert cache.get_endpoint_type(base + "search?query=a&result=b&resultcount") == "resultcount"
+    assert cache.get_endpoint_type(base + "warehouse/filereport?accession=a") == "filereport"
+
+
+def test_disk_cache(tmpdir):
+    """Test DiskCache class"""
+    url = "http://www.ebi.ac.uk/ena/data/view/A00145&display=fasta"
+    disk_cache = cache.DiskCache(str(tmpdir))
+    assert disk_cache.get(url) is None
+    disk_cache.set(url, b">A00145\nACGT\n")
+    assert disk_cache.get(url) == b">A00145\nACGT\n"
+    assert disk_cache.get(url.replace("&display=fasta", "&display=xml")) is None
+    output = str(tmpdir.join("output.fasta"))
+    assert disk_cache.get_file(url, output)
+    with open(output, "rb") as fd:
+        assert fd.read() == b">A00145\nACGT\n"
+    # expired entry
+    disk_cache.ttl["view"] = 0
+    path = disk_cache.get_path(url)
+    os.utime(path, (time.time(), time.time() - 10))
+    assert disk_cache.get(url) is None
+    disk_cache.clear()
+    assert disk_cache.get_entries() == []
+
+
+def test_disk_cache_eviction(tmpdir):
+    """Test the eviction of the least recently used entries of DiskCache"""
+    url = "http://www.ebi.ac.uk/ena/data/view/%s&display=fasta"
+    disk_cache = cache.DiskCache(str(tmpdir), max_bytes=10 ** 6)
+    for i in range(3):
+        disk_cache.set(url % i, os.urandom(1000))
+        path = disk_cache.get_path(url % i)
+        os.utime(path, (time.time() - 100 + i, time.time()))
+    # access to the first entry which becomes the most recently used
+    assert disk_cache.get(url % 0) is not None
+    size = os.path.getsize(disk_cache.get_path(url % 0))
+    disk_cache.max_bytes = 2 * size + 10
+    disk_cache.set(url % 3, os.urandom(1000))
+    assert disk_cache.get(url % 1) is None
+    assert disk_cache.get(url % 2) is None
+    assert disk_cache.get(url % 0) is not None
+    assert disk_cache.get(url % 3) is not None
+
+
+def test_disk_cache_replace(tmpdir):
+    """Test the size of DiskCache when an entry is replaced"""
+    url = "http://www.ebi.ac.uk/ena/data/view/%s&display=fasta"
+    disk_cache = cache.DiskCache(str(tmpdir))
+    disk_cache.set(url % 0, os.urandom(1000))
+    disk_cache.set(url % 1, os.urandom(1000))
+    for i in range(5):
+        disk_cache.set(url % 0, os.urandom(100 * i))
+    assert disk_cache.size == sum([e[1] for e in disk_cache.get_entries()])
+
+
+def test_download_not_cached(tmpdir, file_server):
+    """Test that the files downloaded by a client are not stored in its cache"""
+    file_server.files["/file.fastq"] = b"@r\nACGT\n+\nIIII\n"
+    disk_cache = cache.DiskCache(str(tmpdir.join("cache")))
+    client = enasearch.Client(cache=disk_cache)
+    file = str(tmpdir.join("file.fastq"))
+    client.download(file_server.url + "/file.fastq", file)
+    with open(file, "rb") as fd:
+        assert fd.read() == b"@r\nACGT\n+\nIIII\n"
+    assert disk_cache.get_entries() == []
+    client.close()
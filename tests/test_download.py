@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import enasearch
+from enasearch import download
+
+
+def test_check_file_type():
+    """Test check_file_type function"""
+    download.check_file_type("fastq", "read_run")
+    download.check_file_type("submitted", "analysis")
+    with pytest.raises(ValueError):
+        download.check_file_type("bam", "read_run")
+    with pytest.raises(ValueError):
+        download.check_file_type("fastq", "analysis")
+
+
+def test_format_accessions():
+    """Test format_accessions function"""
+    assert download.format_accessions("SRR1, SRR2,") == ["SRR1", "SRR2"]
+    assert download.format_accessions(["SRR1"]) == ["SRR1"]
+
+
+def test_format_file_url():
+    """Test format_file_url function"""
+    url = "ftp.sra.ebi.ac.uk/vol1/fastq/SRR000/SRR000001/SRR000001_1.fastq.gz"
+    assert download.format_file_url(url) == "http://" + url
+    assert download.format_file_url("https://" + url) == "https://" + url
+
+
+def test_verify_file(tmpdir):
+    """Test verify_file and is_verified functions"""
+    path = str(tmpdir.join("SRR1_1.fastq"))
+    content = b"@r1\nACGT\n+\nIIII\n"
+    md5 = hashlib.md5(content).hexdigest()
+    with open(path, "wb") as fd:
+        fd.write(content)
+    assert download.compute_md5(path) == md5
+    assert not download.is_verified(path, md5, len(content))
+    assert download.is_verified(path, None, len(content))
+    assert not download.is_verified(path, None, len(content) + 1)
+    download.verify_file(path, md5)
+    assert download.is_verified(path, md5, len(content))
+    assert not download.is_verified(path, "0" * 32, len(content))
+    assert download.download_file("http://localhost/SRR1_1.fastq", path, md5) == path
+    with pytest.raises(ValueError):
+        download.verify_file(path, "0" * 32)
+    assert not os.path.exists(path)
+
+
+def test_supports_ranges(file_server):
+    """Test supports_ranges function"""
+    file_server.files["/SRR1_1.fastq"] = b"ACGT"
+    client = enasearch.Client()
+    assert download.supports_ranges(file_server.url + "/SRR1_1.fastq", client)
+    assert not download.supports_ranges(file_server.url + "/SRR2_1.fastq", client)
+    file_server.ranges = False
+    assert not download.supports_ranges(file_server.url + "/SRR1_1.fastq", client)
+    client.close()
+
+
+def test_download_segments(tmpdir, file_server):
+    """Test download_segments and download_file functions"""
+    content = b"".join([b"@r%d\nACGT\n+\nIIII\n" % i for i in range(1000)])
+    md5 = hashlib.md5(content).hexdigest()
+    file_server.files["/SRR1_1.fastq"] = content
+    url = file_server.url + "/SRR1_1.fastq"
+    path = str(tmpdir.join("SRR1_1.fastq"))
+    client = enasearch.Client()
+    with ThreadPoolExecutor(4) as executor:
+        download.download_segments(url, path, len(content), client, executor, 1000)
+        with open(path, "rb") as fd:
+            assert fd.read() == content
+        assert not os.path.exists(path + ".segments.part")
+        assert not os.path.exists(path + ".segments")
+        ranges = sorted([byte_range for method, request_path, byte_range in file_server.requests])
+        assert len(ranges) == (len(content) + 999) // 1000
+        assert "bytes=0-999" in ranges
+        assert "bytes=%s-%s" % (len(content) // 1000 * 1000, len(content) - 1) in ranges
+        # an interrupted download gets only the missing segments
+        os.remove(path)
+        with open(path + ".segments.part", "wb") as fd:
+            fd.write(content[:2000])
+        with open(path + ".segments", "w") as fd:
+            fd.write("0\n1000\n")
+        del file_server.requests[:]
+        download.download_segments(url, path, len(content), client, executor, 1000)
+        with open(path, "rb") as fd:
+            assert fd.read() == content
+        ranges = [byte_range for method, request_path, byte_range in file_server.requests]
+        assert "bytes=0-999" not in ranges
+        assert "bytes=1000-1999" not in ranges
+        assert "bytes=2000-2999" in ranges
+        # download_file uses the segments for the large files and checks them
+        os.remove(path)
+        del file_server.requests[:]
+        assert download.download_file(
+            url, path, md5, client=client, executor=executor,
+            segment_size=1000) == path
+        assert download.is_verified(path, md5, len(content))
+        assert len([method for method, request_path, byte_range in file_server.requests if method == "GET"]) > 1
+        # an interrupted segmented download (with its full size) is not taken
+        # for a complete download by Client.download
+        os.remove(path)
+        os.remove(path + ".md5")
+        with open(path + ".segments.part", "wb") as fd:
+            fd.write(b"\0" * len(content))
+        with open(path + ".segments", "w") as fd:
+            fd.write("0\n")
+        download.download_file(
+            url, path, md5, client=client, executor=executor,
+            segment_size=len(content))
+        assert download.is_verified(path, md5, len(content))
+    # without range support, the file is downloaded in one request
+    os.remove(path)
+    os.remove(path + ".md5")
+    file_server.ranges = False
+    del file_server.requests[:]
+    download.download_file(url, path, md5, client=client, segment_size=1000)
+    assert [method for method, request_path, byte_range in file_server.requests] == ["HEAD", "HEAD", "GET"]
+    client.close()
@@ -1,5 +1,15 @@
 #!/usr/bin/env python
+import gzip
+import io
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from collections import OrderedDict
 from pprint import pprint
+import pytest
+import requests
 import enasearch
 
 
@@ -247,3 +257,572 @@ def test_retrieve_analysis_report():
         fields=",".join(exp_fields),
         file=None)
     assert cmp(report.split("\n")[0].split("\t"), exp_fields)
+
+
+def test_client():
+    """Test Client class"""
+    client = enasearch.Client(
+        pool_maxsize=20,
+        keep_alive=False,
+        headers={"User-Agent": "enasearch-test"},
+        timeout=30)
+    adapter = client.session.get_adapter(enasearch.baseUrl)
+    assert adapter._pool_maxsize == 20
+    assert client.session.headers["Connection"] == "close"
+    assert client.session.headers["User-Agent"] == "enasearch-test"
+    assert client.timeout == 30
+    client.close()
+
+
+def test_get_range():
+    """Test get_range_start and get_range_total functions"""
+    assert enasearch.get_range_start("bytes 100-999/1000") == 100
+    assert enasearch.get_range_total("bytes 100-999/1000") == 1000
+    assert enasearch.get_range_total("bytes */1000") == 1000
+    assert enasearch.get_range_start("bytes */1000") is None
+    assert enasearch.get_range_start(None) is None
+    assert enasearch.get_range_total("bytes 0-9/*") is None
+
+
+def test_client_download(tmpdir, file_server):
+    """Test download method of Client class"""
+    content = b"".join([b"@r%d\nACGT\n+\nIIII\n" % i for i in range(1000)])
+    file_server.files["/SRR1_1.fastq"] = content
+    url = file_server.url + "/SRR1_1.fastq"
+    file = str(tmpdir.join("SRR1_1.fastq"))
+    part = file + ".part"
+    client = enasearch.Client()
+    assert client.get_content_length(url) == len(content)
+    # the content is written to the partial file, renamed once complete
+    client.download(url, file, chunk_size=100)
+    with open(file, "rb") as fd:
+        assert fd.read() == content
+    assert not os.path.exists(part)
+    # a complete file is not downloaded again
+    del file_server.requests[:]
+    client.download(url, file)
+    assert [method for method, path, byte_range in file_server.requests] == ["HEAD"]
+    # an interrupted download is resumed with a range request
+    os.remove(file)
+    with open(part, "wb") as fd:
+        fd.write(content[:1000])
+    del file_server.requests[:]
+    client.download(url, file)
+    assert file_server.requests == [("GET", "/SRR1_1.fastq", "bytes=1000-")]
+    with open(file, "rb") as fd:
+        assert fd.read() == content
+    assert not os.path.exists(part)
+    # a complete partial file gets a 416 response and is renamed
+    os.rename(file, part)
+    client.download(url, file)
+    with open(file, "rb") as fd:
+        assert fd.read() == content
+    assert not os.path.exists(part)
+    # a larger partial file is downloaded again
+    os.rename(file, part)
+    with open(part, "ab") as fd:
+        fd.write(b"garbage")
+    client.download(url, file)
+    with open(file, "rb") as fd:
+        assert fd.read() == content
+    # without range support, the whole content replaces the partial file
+    file_server.ranges = False
+    os.remove(file)
+    with open(part, "wb") as fd:
+        fd.write(content[:1000])
+    client.download(url, file)
+    with open(file, "rb") as fd:
+        assert fd.read() == content
+    # without resume, the file is downloaded again
+    del file_server.requests[:]
+    client.download(url, file, resume=False)
+    assert [method for method, path, byte_range in file_server.requests] == ["GET"]
+    client.close()
+
+
+def test_get_client():
+    """Test get_client function"""
+    default_client = enasearch.get_default_client()
+    assert enasearch.get_client() is default_client
+    assert enasearch.get_default_client() is default_client
+    client = enasearch.Client()
+    assert enasearch.get_client(client) is client
+    enasearch.set_default_client(client)
+    assert enasearch.get_client() is client
+    enasearch.set_default_client(None)
+    assert enasearch.get_client() is not client
+
+
+def test_build_search_url():
+    """Test build_search_url function"""
+    url = enasearch.build_search_url(
+        free_text_search=False,
+        query="tax_eq(10090)",
+        result="assembly",
+        display="report",
+        offset=10,
+        length=20,
+        fields="accession")
+    assert url.startswith(enasearch.baseUrl + "data/warehouse/search?")
+    assert "&offset=10" in url and "&length=20" in url
+    assert "&fields=accession" in url
+
+
+def test_parse_search_result_number():
+    """Test parse_search_result_number function"""
+    nb = enasearch.parse_search_result_number(
+        "Number of results: 17,123\nTime taken: 0 seconds")
+    assert nb == 17123
+
+
+def test_get_search_windows():
+    """Test get_search_windows function"""
+    assert enasearch.get_search_windows(0) == []
+    assert enasearch.get_search_windows(12) == [(None, None)]
+    windows = enasearch.get_search_windows(2 * enasearch.lengthLimit + 5)
+    assert windows == [
+        (0, enasearch.lengthLimit),
+        (enasearch.lengthLimit, enasearch.lengthLimit),
+        (2 * enasearch.lengthLimit, 5)]
+
+
+def test_format_taxon_ids():
+    """Test format_taxon_ids function"""
+    assert enasearch.format_taxon_ids("6543,Human") == "Taxon:6543,Taxon:Human"
+    assert enasearch.format_taxon_ids([6543, "Human"]) == "Taxon:6543,Taxon:Human"
+
+
+def test_split_ids():
+    """Test format_ids and split_ids functions"""
+    assert enasearch.format_ids("A00145,A00146") == ["A00145", "A00146"]
+    ids = enasearch.format_ids(("A%05d" % i for i in range(10)))
+    batches = enasearch.split_ids(ids, 20)
+    assert batches == ["A00000,A00001,A00002", "A00003,A00004,A00005", "A00006,A00007,A00008", "A00009"]
+    assert enasearch.split_ids(["A00145", "LONGIDENTIFIER"], 10) == ["A00145", "LONGIDENTIFIER"]
+
+
+def test_merge_xml_contents():
+    """Test merge_xml_contents function"""
+    contents = [
+        b'<?xml version="1.0" encoding="UTF-8"?><ROOT request="A1"><entry accession="A1"/></ROOT>',
+        b'<?xml version="1.0" encoding="UTF-8"?><ROOT request="A2"><entry accession="A2"/></ROOT>']
+    merged = enasearch.format_content(enasearch.merge_xml_contents(contents), "xml")
+    assert merged["ROOT"]["@request"] == "A1"
+    assert [e["@accession"] for e in merged["ROOT"]["entry"]] == ["A1", "A2"]
+
+
+def test_retrieve_data_batches(tmpdir, ena_server):
+    """Test retrieve_data function with ids split in batches"""
+    client = enasearch.Client()
+    ids = ["A%05d" % i for i in range(300)]
+    max_length = enasearch.urlLengthLimit - len(enasearch.build_retrieve_url("", "fasta"))
+    batch_nb = len(enasearch.split_ids(ids, max_length))
+    assert batch_nb > 1
+    data = enasearch.retrieve_data(ids=ids, display="fasta", client=client)
+    assert [seq.id.split("|")[1] for seq in data] == ids
+    paths = [path for method, path, byte_range in ena_server.requests]
+    assert len(paths) == batch_nb
+    assert max([len(ena_server.url) + len(path) for path in paths]) <= enasearch.urlLengthLimit
+    stream = enasearch.retrieve_data(ids=ids, display="fasta", client=client, stream=True)
+    assert [seq.id.split("|")[1] for seq in stream] == ids
+    file = str(tmpdir.join("data.fasta.gz"))
+    enasearch.retrieve_data(ids=ids, display="fasta", download="gzip", file=file, client=client)
+    with gzip.open(file, "rt") as fd:
+        assert fd.read().count(">") == 300
+    xml = enasearch.retrieve_data(ids=ids, display="xml", client=client)
+    assert len(xml["ROOT"]["entry"]) == 300
+    with pytest.raises(ValueError):
+        enasearch.retrieve_data(ids=ids, display="fasta", offset=0, client=client)
+    # a failed batch raises an error
+    ena_server.failures.append("A00299")
+    with pytest.raises(requests.exceptions.HTTPError):
+        enasearch.retrieve_data(ids=ids, display="fasta", client=client)
+    client.close()
+
+
+def test_ordered_map():
+    """Test ordered_map function"""
+    def square(x):
+        time.sleep(0.01 * (x % 3))
+        return x * x
+    assert list(enasearch.ordered_map(square, range(20), 4)) == [
+        x * x for x in range(20)]
+    assert list(enasearch.ordered_map(square, range(5), 1)) == [
+        0, 1, 4, 9, 16]
+
+
+def test_memoize_search_result_number(monkeypatch):
+    """Test memoize_search_result_number function"""
+    monkeypatch.setattr(enasearch, "search_result_numbers", OrderedDict())
+    assert enasearch.get_memoized_search_result_number(
+        False, "tax_eq(0)", "assembly") is None
+    enasearch.memoize_search_result_number(False, "tax_eq(0)", "assembly", 42)
+    assert enasearch.get_memoized_search_result_number(
+        False, "tax_eq(0)", "assembly") == 42
+    assert enasearch.get_memoized_search_result_number(
+        True, "tax_eq(0)", "assembly") is None
+    # no request is sent for a memoized number
+    nb = enasearch.get_search_result_number(
+        free_text_search=False,
+        query="tax_eq(0)",
+        result="assembly")
+    assert nb == 42
+    # the expired numbers are forgotten
+    monkeypatch.setattr(enasearch, "resultNumberTTL", -1)
+    assert enasearch.get_memoized_search_result_number(
+        False, "tax_eq(0)", "assembly") is None
+    assert len(enasearch.search_result_numbers) == 0
+    enasearch.memoize_search_result_number(False, "tax_eq(1)", "assembly", 1)
+    enasearch.memoize_search_result_number(False, "tax_eq(2)", "assembly", 2)
+    assert len(enasearch.search_result_numbers) == 0
+    # beyond the maximum size, the oldest numbers are forgotten
+    monkeypatch.setattr(enasearch, "resultNumberTTL", 60)
+    monkeypatch.setattr(enasearch, "resultNumberMaxSize", 2)
+    for i in range(5):
+        enasearch.memoize_search_result_number(False, "tax_eq(%d)" % i, "assembly", i)
+    enasearch.memoize_search_result_number(False, "tax_eq(3)", "assembly", 3)
+    assert [key[1] for key in enasearch.search_result_numbers] == ["tax_eq(4)", "tax_eq(3)"]
+
+
+def test_request_url_with_cache(tmpdir):
+    """Test request_url function with a client using a cache"""
+    from enasearch.cache import DiskCache
+    client = enasearch.Client(cache=DiskCache(str(tmpdir)))
+    url = enasearch.build_retrieve_url(ids="A00145", display="fasta")
+    client.cache.set(url, b">ENA|A00145|A00145.1 test\nACGT\n")
+    data = enasearch.retrieve_data(ids="A00145", display="fasta", client=client)
+    assert [seq.id for seq in data] == ["ENA|A00145|A00145.1"]
+
+
+def test_iter_seq_content():
+    """Test iter_seq_content function"""
+    fd = io.BytesIO(b"@read1\nACGT\n+\nIIII\n@read2\nTTGA\n+\nIIHH\n")
+    records = enasearch.iter_seq_content(fd, "fastq")
+    assert next(records).id == "read1"
+    assert next(records).id == "read2"
+    assert list(records) == []
+    assert fd.closed
+
+
+def test_compile_search_query():
+    """Test compile_search_query function"""
+    assert enasearch.compile_search_query(True, "kinase+homo+sapiens", "sequence_update") == "kinase+homo+sapiens"
+    assert enasearch.compile_search_query(False, "tax_eq(10090)  and dataclass=STD", "coding_release") == "tax_eq(10090)%20AND%20dataclass=%22STD%22"
+    assert enasearch.compile_search_query(False, "tax_eq(10090) AND new_field=1", "coding_release", validate=False) == "tax_eq(10090)%20AND%20new_field=1"
+    # the query is checked before any request
+    with pytest.raises(ValueError):
+        enasearch.search_data(
+            free_text_search=False,
+            query="tax_eq(10090) AND read_count>10",
+            result="coding_release",
+            display="fasta")
+
+
+def test_iter_search_data():
+    """Test iter_search_data function"""
+    search_data = enasearch.iter_search_data(
+        free_text_search=False,
+        query="tax_tree(7147) AND dataclass=STD",
+        result="coding_release",
+        display="fasta",
+        offset=0,
+        length=20)
+    assert len([seq.id for seq in search_data]) == 20
+
+
+def test_write_search_pages(tmpdir):
+    """Test write_search_pages function"""
+    from enasearch.cache import DiskCache
+    client = enasearch.Client(cache=DiskCache(str(tmpdir.join("cache"))))
+    urls = []
+    for i in range(3):
+        url = enasearch.build_search_url(
+            free_text_search=False,
+            query="tax_eq(10090)",
+            result="assembly",
+            display="fasta",
+            offset=i * 2,
+            length=2)
+        client.cache.set(url, b">seq%d\nACGT\n>seq%d\nACGT\n" % (2 * i, 2 * i + 1))
+        urls.append(url)
+    for max_workers in [1, 3]:
+        file = str(tmpdir.join("results_%s.fasta.gz" % max_workers))
+        enasearch.write_search_pages(urls, file, "gzip", 1, client, max_workers)
+        with gzip.open(file, "rt") as fd:
+            content = fd.read()
+        assert content.count(">") == 6
+        assert content.index(">seq1\n") < content.index(">seq4\n")
+
+
+def test_lazy_descriptors():
+    """Test that the descriptors and parsers are loaded at the first use"""
+    statement = "; ".join([
+        "import sys",
+        "import enasearch",
+        "assert enasearch.descriptors == {}",
+        "assert 'Bio' not in sys.modules",
+        "enasearch.get_results(verbose=False)",
+        "assert set(enasearch.descriptors) == set(['results', 'filters'])",
+        "assert 'geo_box1' in enasearch.filter_types['Geospatial']"])
+    subprocess.check_call([sys.executable, "-c", statement])
+
+
+def test_get_registry():
+    """Test get_registry function"""
+    registry = enasearch.get_registry()
+    assert registry is enasearch.get_registry()
+    assert "read_run" in registry.results
+    assert "fastq_ftp" in registry.returnable_fields["read_run"]
+    assert "first_public" in registry.filter_fields["read_run"]
+    assert "read_run" in registry.field_results["fastq_ftp"]
+    assert "fasta" in registry.display_options
+
+
+def test_get_field_results():
+    """Test get_field_results function"""
+    assert "read_run" in enasearch.get_field_results("fastq_ftp")
+    assert enasearch.get_field_results("not_a_field") == frozenset()
+
+
+def test_check_returnable_fields():
+    """Test check_returnable_fields function"""
+    enasearch.check_returnable_fields(
+        ["run_accession", "fastq_ftp"], "read_run")
+    with pytest.raises(ValueError):
+        enasearch.check_returnable_fields(
+            ["run_accession", "not_a_field"], "read_run")
+    with pytest.raises(ValueError):
+        enasearch.check_returnable_fields(["run_accession"], "not_a_result")
+
+
+def test_check_sortable_fields():
+    """Test check_sortable_fields function"""
+    enasearch.check_sortable_fields("first_public,accession", "sequence_release")
+    enasearch.check_sortable_fields(["first_public"], "sequence_release")
+    with pytest.raises(ValueError):
+        enasearch.check_sortable_fields("not_a_field", "sequence_release")
+
+
+def test_load_descriptor(tmpdir):
+    """Test open_descriptors and load_descriptor functions"""
+    connection = enasearch.open_descriptors(
+        enasearch.get_data(enasearch.descriptorsFile))
+    display_options = enasearch.load_descriptor(connection, "display_options")
+    assert "fasta" in display_options
+    with pytest.raises(ValueError):
+        enasearch.load_descriptor(connection, "not_a_descriptor")
+    connection.close()
+    # corrupted descriptor and unsupported schema version
+    filepath = str(tmpdir.join("descriptors.sqlite"))
+    connection = sqlite3.connect(filepath)
+    with connection:
+        connection.execute("CREATE TABLE metadata (key TEXT, value TEXT)")
+        connection.execute("INSERT INTO metadata VALUES ('schema_version', ?)", (
+            str(enasearch.descriptorsSchemaVersion),))
+        connection.execute(
+            "CREATE TABLE descriptors (name TEXT, checksum TEXT, data TEXT)")
+        connection.execute(
+            "INSERT INTO descriptors VALUES ('display_options', '0', '{}')")
+    connection.close()
+    connection = enasearch.open_descriptors(filepath)
+    with pytest.raises(ValueError):
+        enasearch.load_descriptor(connection, "display_options")
+    connection.close()
+    connection = sqlite3.connect(filepath)
+    with connection:
+        connection.execute("UPDATE metadata SET value = '0'")
+    connection.close()
+    with pytest.raises(ValueError):
+        enasearch.open_descriptors(filepath)
+
+
+def test_format_content():
+    """Test format_content function with bytes and strings"""
+    xml = b'<?xml version="1.0" encoding="UTF-8"?><ROOT><RUN accession="SRR1"/></ROOT>'
+    assert enasearch.format_content(xml, "xml")["ROOT"]["RUN"]["@accession"] == "SRR1"
+    fasta = b">seq1 \xc3\xa9\nACGT\n>seq2\nTTGA\n"
+    records = enasearch.format_content(fasta, "fasta")
+    assert [seq.id for seq in records] == ["seq1", "seq2"]
+    assert records[0].description == u"seq1 \xe9"
+    records = enasearch.format_content(fasta.decode("utf-8"), "fasta")
+    assert [seq.id for seq in records] == ["seq1", "seq2"]
+    assert enasearch.format_content(b"a\tb\n", "report") == "a\tb\n"
+    assert enasearch.format_content(b"a\xe9", "text", "latin-1") == u"a\xe9"
+    # the invalid bytes are replaced
+    assert enasearch.format_content(b"caf\xe9\n", "text") == u"caf\ufffd\n"
+    fasta = b">seq1 caf\xe9\nACGT\n"
+    assert enasearch.format_content(fasta, "fasta")[0].description == u"seq1 caf\ufffd"
+    assert enasearch.format_content(fasta, "fasta", light=True)[0].description == u"seq1 caf\ufffd"
+
+
+def test_iter_xml_content():
+    """Test iter_xml_content function"""
+    content = b"""<?xml version="1.0" encoding="UTF-8"?>
+<RUN_SET>
+<RUN accession="SRR1"><TITLE>run 1</TITLE><LINK>a</LINK><LINK>b</LINK></RUN>
+<RUN accession="SRR2"><IDENTIFIERS><PRIMARY_ID>SRR2</PRIMARY_ID></IDENTIFIERS></RUN>
+<SAMPLE accession="SRS1"/>
+</RUN_SET>"""
+    records = list(enasearch.iter_xml_content(io.BytesIO(content)))
+    assert len(records) == 3
+    assert records[0] == {"RUN": {
+        "@accession": "SRR1", "TITLE": "run 1", "LINK": ["a", "b"]}}
+    assert records[1]["RUN"]["IDENTIFIERS"]["PRIMARY_ID"] == "SRR2"
+    assert records[2] == {"SAMPLE": {"@accession": "SRS1"}}
+    # same content as with the whole document parsed with xmltodict
+    document = enasearch.format_content(content, "xml")["RUN_SET"]
+    assert [dict(r["RUN"]) for r in records[:2]] == [dict(r) for r in document["RUN"]]
+
+
+def test_merge_report_contents():
+    """Test merge_report_contents function"""
+    contents = [b"run_accession\tread_count\nSRR1\t10\n", b"", b"run_accession\tread_count\nSRR2\t20\nSRR3\t30"]
+    merged = b"".join(enasearch.merge_report_contents(contents))
+    assert merged == b"run_accession\tread_count\nSRR1\t10\nSRR2\t20\nSRR3\t30\n"
+    with pytest.raises(ValueError):
+        list(enasearch.merge_report_contents([b"a\nb\n", b"c\nd\n"]))
+
+
+def test_retrieve_filereports(tmpdir, ena_server):
+    """Test retrieve_run_reports function"""
+    client = enasearch.Client()
+    accessions = ["SRR%d" % i for i in range(10)]
+    report = enasearch.retrieve_run_reports(
+        accessions=accessions,
+        fields="run_accession,read_count",
+        client=client,
+        max_workers=3)
+    assert len(ena_server.requests) == len(accessions)
+    lines = report.splitlines()
+    assert lines[0] == "run_accession\tread_count"
+    assert [line.split("\t")[0] for line in lines[1:]] == accessions
+    columns = enasearch.retrieve_run_reports(
+        accessions=",".join(accessions),
+        fields="run_accession,read_count",
+        client=client,
+        columnar=True)
+    assert sum(columns["read_count"]) == 100
+    lines = enasearch.retrieve_run_reports(
+        accessions=accessions[:2],
+        fields="run_accession,read_count",
+        client=client,
+        stream=True)
+    assert list(lines) == ["run_accession\tread_count\n", "SRR0\t10\n", "SRR1\t10\n"]
+    file = str(tmpdir.join("runs.tsv"))
+    enasearch.retrieve_run_reports(
+        accessions=accessions,
+        fields="run_accession,read_count",
+        file=file,
+        client=client)
+    with open(file) as fd:
+        assert fd.read() == report
+    ena_server.failures.append("accession=SRR5")
+    with pytest.raises(requests.exceptions.HTTPError):
+        enasearch.retrieve_run_reports(
+            accessions=accessions,
+            fields="run_accession,read_count",
+            client=client)
+    client.close()
+
+
+def test_iter_search(ena_server):
+    """Test iter_search function"""
+    client = enasearch.Client()
+    ena_server.searches["tax_eq(10090)"] = [
+        {"accession": "seq%d" % i, "description": "sequence %d" % i} for i in range(5)]
+    cursor = enasearch.iter_search(
+        query="tax_eq(10090)",
+        result="sequence_release",
+        display="fasta",
+        page_size=2,
+        client=client)
+    assert cursor.total == 5
+    assert next(cursor).id == "seq0"
+    assert cursor.fetched == 2
+    assert [seq.id for seq in cursor] == ["seq1", "seq2", "seq3", "seq4"]
+    assert cursor.progress == 1.0
+    pages = [path for method, path, byte_range in ena_server.requests if "resultcount" not in path]
+    assert ["offset=%s" % offset in path for path, offset in zip(pages, [0, 2, 4])] == [True] * 3
+    with enasearch.iter_search(
+        query="tax_eq(10090)",
+        result="sequence_release",
+        display="report",
+        page_size=3,
+        fields="accession,description",
+        client=client,
+        prefetch=False
+    ) as cursor:
+        assert [row["description"] for row in cursor] == ["sequence %d" % i for i in range(5)]
+    # an error on a page is raised while iterating
+    ena_server.failures.append("offset=2")
+    cursor = enasearch.iter_search(
+        query="tax_eq(10090)",
+        result="sequence_release",
+        display="fasta",
+        page_size=2,
+        client=client)
+    assert [next(cursor).id, next(cursor).id] == ["seq0", "seq1"]
+    with pytest.raises(requests.exceptions.HTTPError):
+        next(cursor)
+    cursor.close()
+    with pytest.raises(ValueError):
+        enasearch.iter_search("tax_eq(10090)", "sequence_release", "text", client=client)
+    client.close()
+
+
+def test_write_search_pages_with_checkpoint(tmpdir, ena_server, monkeypatch):
+    """Test write_search_pages_with_checkpoint function"""
+    monkeypatch.setattr(enasearch, "lengthLimit", 2)
+    client = enasearch.Client()
+    ena_server.searches["tax_eq(10090)"] = [{"accession": "seq%d" % i} for i in range(6)]
+    file = str(tmpdir.join("results.fasta.gz"))
+    checkpoint = str(tmpdir.join("results.checkpoint"))
+
+    def search(max_workers):
+        enasearch.search_all_data(
+            free_text_search=False,
+            query="tax_eq(10090)",
+            result="assembly",
+            display="fasta",
+            download="gzip",
+            file=file,
+            client=client,
+            max_workers=max_workers,
+            checkpoint=checkpoint)
+
+    # the search fails on the last page after writing the first ones
+    ena_server.failures.append("offset=4")
+    with pytest.raises(requests.exceptions.HTTPError):
+        search(1)
+    assert os.path.exists(checkpoint)
+    with open(file, "ab") as fd:
+        fd.write(b"partial")
+    # the new search requests only the last page and replaces the partial one
+    del ena_server.failures[:]
+    del ena_server.requests[:]
+    search(2)
+    assert [path for method, path, byte_range in ena_server.requests if "offset=" in path] == [
+        enasearch.build_search_url(
+            free_text_search=False, query="tax_eq(10090)", result="assembly",
+            display="fasta", offset=4, length=2)[len(ena_server.url):]]
+    with gzip.open(file, "rt") as fd:
+        assert fd.read() == "".join([">seq%d\nACGT\n" % i for i in range(6)])
+    assert not os.path.exists(checkpoint)
+    # a checkpoint of other pages is not used
+    urls = ["%s/page%d" % (ena_server.url, i) for i in range(3)]
+    enasearch.save_search_checkpoint(checkpoint, {"urls": urls, "download": "gzip"}, [10])
+    assert enasearch.load_search_checkpoint(checkpoint, {"urls": urls[:2], "download": "gzip"}, file) == []
+    # search without results
+    file = str(tmpdir.join("empty.fasta.gz"))
+    enasearch.search_all_data(
+        free_text_search=False,
+        query="tax_eq(0)",
+        result="assembly",
+        display="fasta",
+        download="gzip",
+        file=file,
+        client=client,
+        checkpoint=checkpoint)
+    assert os.path.exists(file)
+    assert not os.path.exists(checkpoint)
+    client.close()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+import datetime
+import json
+import pytest
+import enasearch
+from enasearch import harvest
+from enasearch.cache import DiskCache
+
+
+def set_report_page(
+    client, query, content, free_text_search=False,
+    fields="run_accession,read_count"
+):
+    """Put a page of report in the cache of a client"""
+    row_nb = len(content.splitlines()) - 1
+    query = enasearch.compile_search_query(free_text_search, query, "read_run")
+    enasearch.memoize_search_result_number(
+        free_text_search, query, "read_run", row_nb)
+    if row_nb == 0:
+        return
+    url = enasearch.build_search_url(
+        free_text_search=free_text_search,
+        query=query,
+        result="read_run",
+        display="report",
+        offset=0,
+        length=row_nb,
+        fields=fields)
+    client.cache.set(url, content.encode("utf-8"))
+
+
+def test_get_date_field():
+    """Test get_date_field function"""
+    assert harvest.get_date_field("read_run") == "last_updated"
+    assert harvest.get_date_field("sample") == "first_public"
+    with pytest.raises(ValueError):
+        harvest.get_date_field("assembly")
+
+
+def test_build_incremental_query():
+    """Test build_incremental_query function"""
+    query = harvest.build_incremental_query(
+        "tax_eq(10090) OR tax_eq(9606)", "last_updated", "2017-01-01")
+    assert query == "(tax_eq(10090) OR tax_eq(9606)) AND last_updated>=2017-01-01"
+    assert harvest.build_incremental_query("", "first_public", "2017-01-01") == "first_public>=2017-01-01"
+
+
+def test_get_sequence_key():
+    """Test get_sequence_key function"""
+    assert harvest.get_sequence_key("ENA|A00145|A00145.1") == "A00145"
+    assert harvest.get_sequence_key("A00145.2") == "A00145"
+    assert harvest.get_sequence_key("SRR000001.1") == "SRR000001"
+    assert harvest.get_sequence_key("ENA|A00145|A00145") == "A00145"
+
+
+def test_merge_sequences(tmpdir):
+    """Test merge_sequences function"""
+    file = str(tmpdir.join("sequences.fasta"))
+    tmp_file = file + ".tmp"
+    with open(file, "w") as fd:
+        fd.write(">ENA|A00145|A00145.1 first\nACGT\n>ENA|A00146|A00146.1 second\nGGCC\n")
+    records = [enasearch.records.Record("ENA|A00145|A00145.2", "ENA|A00145|A00145.2 first", "ACGTA")]
+    assert harvest.merge_sequences(file, tmp_file, "fasta", records) == 2
+    with open(tmp_file) as fd:
+        assert fd.read() == ">ENA|A00146|A00146.1 second\nGGCC\n>ENA|A00145|A00145.2 first\nACGTA\n"
+
+
+def test_merge_report(tmpdir):
+    """Test merge_report function with a generator of rows"""
+    file = str(tmpdir.join("runs.tsv"))
+    tmp_file = file + ".tmp"
+    with open(file, "w") as fd:
+        fd.write("run_accession\tread_count\nSRR1\t10\nSRR2\t20\n")
+    rows = (row for row in [["SRR2", "25"], ["SRR3", "30"]])
+    assert harvest.merge_report(file, tmp_file, ["run_accession", "read_count"], rows, "run_accession") == 3
+    assert list(rows) == []
+    with open(tmp_file) as fd:
+        assert fd.read() == "run_accession\tread_count\nSRR1\t10\nSRR2\t25\nSRR3\t30\n"
+    assert not tmpdir.join("runs.tsv.tmp.new").exists()
+    with pytest.raises(ValueError):
+        harvest.merge_report(file, tmp_file, ["run_accession"], iter([["SRR4"]]), "run_accession")
+    assert not tmpdir.join("runs.tsv.tmp.new").exists()
+
+
+def test_harvest(tmpdir):
+    """Test harvest function"""
+    client = enasearch.Client(cache=DiskCache(str(tmpdir.join("cache"))))
+    file = str(tmpdir.join("runs.tsv"))
+    state_file = str(tmpdir.join("state.json"))
+    query = "tax_eq(10090)"
+    set_report_page(
+        client, query, "run_accession\tread_count\nSRR1\t10\nSRR2\t20\n")
+    summary = harvest.harvest(
+        query=query,
+        result="read_run",
+        display="report",
+        file=file,
+        state_file=state_file,
+        fields="run_accession,read_count",
+        client=client)
+    today = datetime.date.today().isoformat()
+    assert summary == {"last_run": today, "since": None, "updated": 2, "total": 2}
+    with open(state_file) as fd:
+        assert json.load(fd)[json.dumps([query, "read_run"])]["last_run"] == today
+    delta_query = "(tax_eq(10090)) AND last_updated>=%s" % today
+    set_report_page(
+        client, delta_query, "run_accession\tread_count\nSRR2\t25\nSRR3\t30\n")
+    summary = harvest.harvest(
+        query=query,
+        result="read_run",
+        display="report",
+        file=file,
+        state_file=state_file,
+        fields="run_accession,read_count",
+        client=client)
+    assert summary["since"] == today
+    assert summary["updated"] == 2
+    assert summary["total"] == 3
+    with open(file) as fd:
+        assert fd.read() == "run_accession\tread_count\nSRR1\t10\nSRR2\t25\nSRR3\t30\n"
+    with pytest.raises(ValueError):
+        harvest.harvest(query, "read_run", "xml", file, state_file, client=client)
+    # a free text query is harvested again in full
+    set_report_page(
+        client, "mouse", "run_accession\tread_count\nSRR4\t40\n",
+        free_text_search=True)
+    for i in range(2):
+        summary = harvest.harvest(
+            query="mouse",
+            result="read_run",
+            display="report",
+            file=file,
+            state_file=state_file,
+            fields="run_accession,read_count",
+            free_text_search=True,
+            client=client)
+        assert summary["since"] is None
+        assert summary["total"] == 1
+    with open(file) as fd:
+        assert fd.read() == "run_accession\tread_count\nSRR4\t40\n"
+    # the records are identified by their accession, not by the first field
+    with pytest.raises(ValueError):
+        harvest.harvest(
+            query, "read_run", "report", str(tmpdir.join("reads.tsv")),
+            state_file, fields="read_count", client=client)
+    enasearch.clear_memoized_search_result_numbers()
+
+
+def test_harvest_all_fields(tmpdir):
+    """Test harvest function without fields"""
+    client = enasearch.Client(cache=DiskCache(str(tmpdir.join("cache"))))
+    file = str(tmpdir.join("runs.tsv"))
+    state_file = str(tmpdir.join("state.json"))
+    query = "tax_eq(10090)"
+    set_report_page(
+        client, query,
+        "study_accession\trun_accession\nPRJ1\tSRR1\nPRJ1\tSRR2\n",
+        fields=None)
+    harvest.harvest(query, "read_run", "report", file, state_file, client=client)
+    delta_query = "(tax_eq(10090)) AND last_updated>=%s" % (
+        datetime.date.today().isoformat())
+    set_report_page(
+        client, delta_query, "study_accession\trun_accession\nPRJ1\tSRR2\n",
+        fields=None)
+    summary = harvest.harvest(
+        query, "read_run", "report", file, state_file, client=client)
+    assert summary["total"] == 2
+    with open(file) as fd:
+        assert fd.read() == "study_accession\trun_accession\nPRJ1\tSRR1\nPRJ1\tSRR2\n"
+    enasearch.clear_memoized_search_result_numbers()
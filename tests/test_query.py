@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+import pytest
+from enasearch import query
+
+
+report = "\t".join(["accession", "base_count", "first_public", "description", "environmental_sample", "location", "tax_id", "scientific_name"]) + "\n"
+report += "\t".join(["A1", "100", "2017-01-10", "Mouse chromosome 1", "false", "9.12 N 79.7 W", "10090", "Mus musculus"]) + "\n"
+report += "\t".join(["A2", "2000", "2016-05-01", "mouse mitochondrion", "true", "35 N 100 E", "10090", "Mus musculus"]) + "\n"
+report += "\t".join(["A3", "", "", "Human contig", "false", "", "9606", "Homo sapiens"]) + "\n"
+
+
+def test_parse_query():
+    """Test parse_query function"""
+    node = query.parse_query('tax_tree(7147) AND (dataclass=STD or NOT description="*mouse*")')
+    assert node == query.And([
+        query.Function("tax_tree", ["7147"]),
+        query.Or([
+            query.Condition("dataclass", "=", "STD", False),
+            query.Not(query.Condition("description", "=", "*mouse*", True))])])
+    assert query.parse_query("geo_box1(-20, 10, 20, 50)") == query.Function("geo_box1", ["-20", "10", "20", "50"])
+    assert query.parse_query("a=1 OR b=2 AND c=3") == query.Or([
+        query.Condition("a", "=", "1", False),
+        query.And([query.Condition("b", "=", "2", False), query.Condition("c", "=", "3", False)])])
+    for invalid_query in ["tax_eq(9606", "base_count>", "a=1 b=2", "a=1 AND", "a!1"]:
+        with pytest.raises(ValueError):
+            query.parse_query(invalid_query)
+
+
+def test_parse_location():
+    """Test parse_location function"""
+    assert query.parse_location("9.12 N 79.7 W") == (9.12, -79.7)
+    assert query.parse_location("35 S 100 E") == (-35, 100)
+
+
+def test_filter_report():
+    """Test filter_report function"""
+    pytest.importorskip("numpy")
+
+    def accessions(query_string):
+        return list(query.filter_report(query_string, report, "sequence_release")["accession"])
+    assert accessions("base_count>=100") == ["A1", "A2"]
+    assert accessions("base_count!=100") == ["A2"]
+    assert accessions("first_public<2017-01-01") == ["A2"]
+    assert accessions('description="mouse*"') == ["A1", "A2"]
+    assert accessions('description="*contig"') == ["A3"]
+    assert accessions("environmental_sample=yes") == ["A2"]
+    assert accessions("tax_eq(9606) OR NOT base_count>150") == ["A1", "A3"]
+    assert accessions('tax_name("Mus%20musculus") AND first_public>2016-12-31') == ["A1"]
+    assert accessions("geo_north(20)") == ["A2"]
+    assert accessions("geo_box1(0, -80, 10, -79)") == ["A1"]
+    assert accessions("geo_circ(35, 100, 10)") == ["A2"]
+    with pytest.raises(ValueError):
+        accessions("tax_tree(10090)")
+    with pytest.raises(ValueError):
+        accessions("tax_eq(10090, 9606)")
+    with pytest.raises(ValueError):
+        accessions('description>"mouse"')
+    with pytest.raises(ValueError):
+        accessions("read_count>10")
+
+
+def test_validate_query():
+    """Test validate_query function"""
+    query.validate_query('base_count>=100 AND first_public<2017-01-01 AND description="*mouse*"', "sequence_release")
+    query.validate_query('environmental_sample=Yes AND NOT tax_tree(10090) OR geo_box1(-20, 10, 20, 50)', "sequence_release")
+    invalid_queries = [
+        "read_count>100",
+        'description>"mouse"',
+        "base_count>many",
+        "first_public>=2017-13-01",
+        "environmental_sample=maybe",
+        "location=10",
+        "tax_eq(Mus)",
+        "tax_tree(10090, 9606)",
+        "geo_north(north)",
+        "unknown_function(1)"]
+    for invalid_query in invalid_queries:
+        with pytest.raises(ValueError):
+            query.validate_query(invalid_query, "sequence_release")
+
+
+def test_compile_query():
+    """Test compile_query function"""
+    compiled_query = query.compile_query('((tax_tree(7147)) and dataclass = STD)', "coding_release")
+    assert compiled_query == "tax_tree(7147)%20AND%20dataclass=%22STD%22"
+    assert query.compile_query(compiled_query, "coding_release") == compiled_query
+    assert query.compile_query('tax_name("Homo%20sapiens") AND (dataclass="STD" OR NOT base_count>10)', "coding_release") == (
+        "tax_name(%22Homo%20sapiens%22)%20AND%20(dataclass=%22STD%22%20OR%20NOT%20base_count>10)")
+    # the quoted values are kept as written
+    assert query.compile_query('tissue_lib="  lambda  gt11 "', "sequence_release") == "tissue_lib=%22%20%20lambda%20%20gt11%20%22"
+    assert query.compile_query('tax_name(" Homo sapiens")', "sequence_release") == "tax_name(%22%20Homo%20sapiens%22)"
+    assert query.compile_query('tax_eq(" 9606 ") AND environmental_sample=Yes', "sequence_release") == "tax_eq(9606)%20AND%20environmental_sample=yes"
+    # + is a space, as in the URLs
+    compiled_query = query.compile_query('description="protein+kinase"', "sequence_release")
+    assert compiled_query == "description=%22protein%20kinase%22"
+    assert query.compile_query(compiled_query, "sequence_release") == compiled_query
+    # without validation, only the syntax is checked
+    with pytest.raises(ValueError):
+        query.compile_query('scientific_name="Homo sapiens"', "read_run")
+    assert query.compile_query('scientific_name="Homo sapiens"', "read_run", validate=False) == "scientific_name=%22Homo%20sapiens%22"
+    with pytest.raises(ValueError):
+        query.compile_query('scientific_name="Homo sapiens" AND', "read_run", validate=False)
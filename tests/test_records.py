@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+import io
+import pytest
+import enasearch
+from enasearch import records
+
+
+fastq = b"@SRR1.1 read 1\nACGT\n+\nII#!\n@SRR1.2\nTTGA\n+SRR1.2\nABCD\n"
+fasta = b">ENA|A00145|A00145.1 B.taurus\nACGT\nTT\n>seq2\n\nGGCC\n"
+
+
+def test_iter_records_fastq():
+    """Test iter_records function with FASTQ"""
+    reads = list(records.iter_records(io.BytesIO(fastq), "fastq"))
+    assert len(reads) == 2
+    assert reads[0].id == "SRR1.1"
+    assert reads[0].description == "SRR1.1 read 1"
+    assert reads[0].seq == "ACGT"
+    assert list(reads[0].quality) == [40, 40, 2, 0]
+    assert len(reads[1]) == 4
+    assert "".join([r.format("fastq") for r in reads]) == fastq.decode().replace("+SRR1.2", "+")
+
+
+def test_iter_records_fasta():
+    """Test iter_records function with FASTA"""
+    seqs = list(records.iter_records(io.BytesIO(fasta), "fasta"))
+    assert [s.id for s in seqs] == ["ENA|A00145|A00145.1", "seq2"]
+    assert [s.seq for s in seqs] == ["ACGTTT", "GGCC"]
+    assert seqs[0].quality is None
+    assert seqs[1].format("fasta") == ">seq2\nGGCC\n"
+    with pytest.raises(ValueError):
+        seqs[1].format("fastq")
+
+
+def test_iter_records_errors():
+    """Test iter_records function with invalid content"""
+    with pytest.raises(ValueError):
+        list(records.iter_records(io.BytesIO(b"ACGT\n"), "fastq"))
+    with pytest.raises(ValueError):
+        list(records.iter_records(io.BytesIO(b"@a\nACGT\n+\nII\n"), "fastq"))
+    with pytest.raises(ValueError):
+        list(records.iter_records(io.BytesIO(fasta), "xml"))
+
+
+def test_format_content_light():
+    """Test format_content function with light records"""
+    reads = enasearch.format_content(fastq, "fastq", light=True)
+    seqrecords = enasearch.format_content(fastq, "fastq")
+    assert [r.id for r in reads] == [r.id for r in seqrecords]
+    assert [r.seq for r in reads] == [str(r.seq) for r in seqrecords]
+    assert [list(r.quality) for r in reads] == [
+        r.letter_annotations["phred_quality"] for r in seqrecords]
+    seqs = enasearch.format_content(fasta.decode(), "fasta", light=True)
+    assert seqs == list(records.iter_records(io.BytesIO(fasta), "fasta"))
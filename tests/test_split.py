@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+import datetime
+import pytest
+import enasearch
+from enasearch import query
+from enasearch import split
+
+
+def test_get_split_field():
+    """Test get_split_field function"""
+    assert split.get_split_field("read_run") == "first_public"
+    assert split.get_split_field("study") == "last_updated"
+    with pytest.raises(ValueError):
+        split.get_split_field("assembly")
+
+
+def test_build_part_query():
+    """Test build_part_query function"""
+    start = datetime.date(2017, 1, 1)
+    end = datetime.date(2017, 2, 1)
+    assert split.build_part_query("tax_eq(10090)", "first_public", None, start) == "(tax_eq(10090)) AND NOT first_public>=2017-01-01"
+    assert split.build_part_query("tax_eq(10090)", "first_public", start, end) == "(tax_eq(10090)) AND first_public>=2017-01-01 AND first_public<2017-02-01"
+    assert split.build_part_query("tax_eq(10090)", "first_public", start, None) == "(tax_eq(10090)) AND first_public>=2017-01-01"
+    # the escaped values of a compiled query are decoded only once
+    compiled_query = enasearch.compile_search_query(False, 'description="C%2B%2B"', "sequence_release")
+    assert compiled_query == "description=%22C%2B%2B%22"
+    part_query = split.build_part_query(compiled_query, "first_public", start, end)
+    assert enasearch.compile_search_query(False, part_query, "sequence_release") == (
+        "description=%22C%2B%2B%22%20AND%20first_public>=2017-01-01%20AND%20first_public<2017-02-01")
+
+
+def test_get_split_end_date():
+    """Test get_split_end_date function"""
+    end_date = split.get_split_end_date()
+    assert end_date > datetime.date.today()
+    days = (end_date - split.splitStartDate).days
+    assert days & (days - 1) == 0
+
+
+def test_split_query(monkeypatch):
+    """Test split_query function"""
+    pytest.importorskip("numpy")
+    dates = ["2001-01-01", "2001-01-01", "2001-01-01", "2005-06-01", "2010-03-01", "", "2016-12-31"]
+    table = {
+        "tax_id": ["10090"] * len(dates),
+        "first_public": dates}
+
+    def get_search_result_number(free_text_search, query_string, result, client=None):
+        return int(query.evaluate_query(query_string, table, result).sum())
+
+    monkeypatch.setattr(enasearch, "get_search_result_number", get_search_result_number)
+    monkeypatch.setattr(enasearch, "lengthLimit", 2)
+    parts = split.split_query("tax_eq(10090)", "sequence_release", max_workers=1)
+    assert sum([part_nb for part_query, part_nb in parts]) == len(dates)
+    # the records of one day can not be split
+    assert [part_nb for part_query, part_nb in parts] == [1, 3, 2, 1]
+    assert parts[0][0] == "tax_eq(10090)%20AND%20NOT%20first_public>=1980-01-01"
+    masks = [query.evaluate_query(part_query, table, "sequence_release") for part_query, part_nb in parts]
+    assert sum([mask.astype(int) for mask in masks]).tolist() == [1] * len(dates)
+    monkeypatch.setattr(enasearch, "lengthLimit", 10)
+    assert split.split_query("tax_eq(10090)", "sequence_release") == [("tax_eq(10090)", len(dates))]
+    # a value with an escaped + is kept in all the sub-queries
+    table["description"] = ["C++"] * (len(dates) - 1) + ["C"]
+    monkeypatch.setattr(enasearch, "lengthLimit", 2)
+    parts = split.split_query('description="C%2B%2B"', "sequence_release", max_workers=1)
+    assert sum([part_nb for part_query, part_nb in parts]) == len(dates) - 1
+    assert len(parts) > 1
+    assert all(["description=%22C%2B%2B%22" in part_query for part_query, part_nb in parts])
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+import pytest
+import requests
+import enasearch
+from enasearch import store
+
+
+report = "run_accession\tread_count\tfirst_public\nSRR1\t10\t2017-01-01\nSRR2\t\t2017-02-01\n"
+
+
+def test_get_accession_field():
+    """Test get_accession_field function"""
+    assert store.get_accession_field("read_run") == "run_accession"
+    assert store.get_accession_field("sample") == "accession"
+
+
+def test_ingest(tmpdir):
+    """Test ingest and lookup functions"""
+    with store.ReportStore(str(tmpdir.join("store.sqlite"))) as report_store:
+        assert report_store.ingest("tax_eq(10090)", "read_run", report) == 2
+        assert report_store.lookup("tax_eq(10090)", "read_run", ["read_count", "run_accession"]) == "read_count\trun_accession\n10\tSRR1\n\tSRR2\n"
+        assert report_store.lookup("tax_eq(10090)", "read_run", ["base_count"]) is None
+        assert report_store.lookup("tax_eq(9606)", "read_run", ["read_count"]) is None
+        row = report_store.connection.execute(
+            'SELECT typeof(read_count) FROM report_read_run WHERE run_accession="SRR1"').fetchone()
+        assert row == ("integer",)
+        indexes = [row[1] for row in report_store.connection.execute(
+            "PRAGMA index_list(report_read_run)")]
+        assert "report_read_run_read_count" in indexes
+        assert "report_read_run_first_public" in indexes
+        with pytest.raises(ValueError):
+            report_store.ingest("tax_eq(10090)", "read_run", "read_count\n10\n")
+    with store.ReportStore(str(tmpdir.join("store.sqlite")), max_age=-1) as report_store:
+        assert report_store.lookup("tax_eq(10090)", "read_run", ["read_count"]) is None
+
+
+def test_ingest_without_upsert(monkeypatch):
+    """Test ingest function with a SQLite version without ON CONFLICT"""
+    monkeypatch.setattr(store, "upsertSupported", False)
+    with store.ReportStore(":memory:") as report_store:
+        report_store.ingest("tax_eq(10090)", "read_run", report)
+        updated = "run_accession\tread_count\nSRR2\t20\nSRR3\t30\n"
+        assert report_store.ingest("tax_eq(9606)", "read_run", updated) == 2
+        assert report_store.select(
+            "read_run", fields="run_accession,read_count,first_public") == (
+            "run_accession\tread_count\tfirst_public\n"
+            "SRR1\t10\t2017-01-01\nSRR2\t20\t2017-02-01\nSRR3\t30\t\n")
+
+
+def test_select(tmpdir):
+    """Test select function"""
+    with store.ReportStore(":memory:") as report_store:
+        report_store.ingest("tax_eq(10090)", "read_run", report)
+        assert report_store.select(
+            "read_run",
+            fields="run_accession",
+            where="first_public >= ?",
+            parameters=("2017-02-01",)) == "run_accession\nSRR2\n"
+        with pytest.raises(ValueError):
+            report_store.select("read_run", fields="base_count")
+
+
+def test_search_data(ena_server, monkeypatch):
+    """Test search_data function of ReportStore"""
+    monkeypatch.setattr(enasearch, "lengthLimit", 2)
+    client = enasearch.Client()
+    ena_server.searches["tax_eq(10090)"] = [
+        {"accession": "SRR%d" % i, "run_accession": "SRR%d" % i, "read_count": "%d" % (10 * i)}
+        for i in range(5)]
+    with store.ReportStore(":memory:") as report_store:
+        # the pages are requested (with the accession field) and stored
+        content = report_store.search_data(
+            "tax_eq(10090)", "read_run", fields="read_count", client=client,
+            max_workers=2)
+        assert content == "read_count\n0\n10\n20\n30\n40\n"
+        pages = [path for method, path, byte_range in ena_server.requests if "offset=" in path]
+        assert len(pages) == 3
+        assert all(["fields=run_accession,read_count" in path for path in pages])
+        # a search covered by the store sends no request
+        del ena_server.requests[:]
+        content = report_store.search_data(
+            "tax_eq(10090)", "read_run", fields="run_accession,read_count",
+            client=client)
+        assert content.splitlines()[1] == "SRR0\t0"
+        assert ena_server.requests == []
+        # a failed page raises an error and stores nothing
+        ena_server.failures.append("offset=2")
+        with pytest.raises(requests.exceptions.HTTPError):
+            report_store.search_data(
+                "tax_eq(10090)", "read_run", fields="run_accession,first_public",
+                client=client)
+        assert report_store.lookup(
+            enasearch.compile_search_query(False, "tax_eq(10090)", "read_run"),
+            "read_run", ["first_public"]) is None
+    client.close()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+import array
+import datetime
+import math
+import pytest
+import enasearch
+from enasearch import table
+
+
+report = (
+    "run_accession\tbase_count\tread_count\tfirst_public\tfastq_bytes\n"
+    "SRR1\t1000\t10\t2017-01-02\t12;14\n"
+    "SRR2\t2000\t\t\t16\n"
+    "SRR3\t3000\t30\t2018-03-04\n")
+
+
+def test_get_column_types():
+    """Test get_column_types function"""
+    fields = ["run_accession", "base_count", "first_public", "fastq_bytes"]
+    types = table.get_column_types(fields, "read_run")
+    assert types == ["text", "number", "date", "text"]
+
+
+def test_split_report():
+    """Test split_report function"""
+    fields, columns = table.split_report(report.encode("utf-8"))
+    assert fields[0] == "run_accession"
+    assert columns[0] == ["SRR1", "SRR2", "SRR3"]
+    assert columns[4] == ["12;14", "16", ""]
+    fields, columns = table.split_report("a\tb\n1\t2\n3\t4")
+    assert columns == [["1", "3"], ["2", "4"]]
+    # rows with a wrong number of cells are not shifted into other columns
+    fields, columns = table.split_report("run_accession\tread_count\nSRR1\t10\tEXTRA\nSRR2\n")
+    assert columns == [["SRR1", "SRR2"], ["10", ""]]
+    fields, columns = table.split_report("run_accession\tread_count\nSRR1\t10\n\nSRR2\t20\n")
+    assert columns == [["SRR1", "SRR2"], ["10", "20"]]
+    fields, columns = table.split_report("run_accession\n")
+    assert fields == ["run_accession"]
+    assert columns == [[]]
+    fields, columns = table.split_report(b"run_accession\tdescription\nSRR1\tcaf\xe9\n")
+    assert columns == [["SRR1"], [u"caf\ufffd"]]
+
+
+def test_parse_report_numpy():
+    """Test parse_report function with NumPy"""
+    numpy = pytest.importorskip("numpy")
+    columns = table.parse_report(report, "read_run")
+    assert list(columns) == [
+        "run_accession", "base_count", "read_count", "first_public",
+        "fastq_bytes"]
+    assert columns["base_count"].dtype == numpy.int64
+    assert columns["base_count"].sum() == 6000
+    assert columns["read_count"].dtype == numpy.float64
+    assert numpy.isnan(columns["read_count"][1])
+    assert columns["first_public"].dtype == numpy.dtype("datetime64[D]")
+    assert numpy.isnat(columns["first_public"][1])
+    assert columns["first_public"][2] == numpy.datetime64("2018-03-04")
+    assert list(columns["run_accession"]) == ["SRR1", "SRR2", "SRR3"]
+    columns = table.parse_report("base_count\n12\nNA\n", "read_run")
+    assert list(columns["base_count"]) == ["12", "NA"]
+
+
+def test_parse_report_python():
+    """Test parse_report function without NumPy"""
+    columns = table.parse_report(report, "read_run", use_numpy=False)
+    assert columns["base_count"] == array.array("q", [1000, 2000, 3000])
+    assert columns["read_count"].typecode == "d"
+    assert math.isnan(columns["read_count"][1])
+    assert columns["first_public"] == [
+        datetime.date(2017, 1, 2), None, datetime.date(2018, 3, 4)]
+    assert columns["fastq_bytes"] == ["12;14", "16", ""]
+
+
+def test_check_columnar_options():
+    """Test columnar option of search_data"""
+    with pytest.raises(ValueError):
+        enasearch.search_data(
+            free_text_search=False,
+            query="tax_tree(7147)",
+            result="read_run",
+            display="fasta",
+            columnar=True)
+    with pytest.raises(ValueError):
+        enasearch.retrieve_run_report(
+            accession="SRX017289",
+            file="report.tsv",
+            columnar=True)